@@ -0,0 +1,238 @@
+import struct
+
+from paging import pagedmemory, pagedview
+
+_STATE = struct.Struct("<HHI")	# Window size, windows, store size
+_WINDOW = struct.Struct("<IB")	# Bank or _RAM, writable
+_RAM = 0xFFFFFFFF
+
+class bankedmemory(pagedmemory):
+	"""
+	Bank switched memory
+	====================
+	A 64 KB address space backed by RAM, with windows of 4 KB or 8 KB that
+	can show a bank of a larger store instead, e.g. a cartridge image of
+	several hundred KB. Switching a bank replaces the entries of the window
+	in the page table (see `paging`), no bytes are copied.
+
+	Writes to banks mapped read only and to control registers go to
+	`writeFault`. A control register calls its function with the memory,
+	the address and the value, which usually switches a bank the way the
+	mapper of the hardware does.
+
+	`Data` shows the address space as mapped at the moment, `Ram` is the RAM
+	under it. Pass the memory to the cpu when creating it, `cpu(ram=...)`.
+
+	Attributes
+	----------
+	Store : bytearray
+		Banks, bank n starts at n times the window size.
+
+	Ram : bytearray
+		RAM seen where no bank is mapped.
+
+	listeners : list
+		Functions called with the window and the bank (None for RAM) after every switch.
+
+	Methods
+	-------
+	mapBank(window, bank, writable)
+		Show a bank of the store in a window.
+
+	unmapBank(window)
+		Show RAM in a window again.
+
+	bank(window)
+		Bank shown in a window.
+
+	addRegister(start, end, function)
+		Call a function on writes to the addresses from start up to end.
+
+	removeRegister(start, end)
+		Remove a control register.
+
+	readState()
+		Banks mapped, RAM and store as bytes.
+
+	writeState(state)
+		Map the banks and load the RAM and store of a saved state.
+	"""
+
+	def __init__(self, store, window=0x2000):
+		"""
+		Parameters
+		----------
+		store : bytes or int
+			Contents of the banks, or their size in bytes to start with zeros.
+
+		window : int, optional
+			Window size, 0x1000 or 0x2000 (default is 0x2000).
+		"""
+		if window not in (0x1000, 0x2000):
+			raise ValueError("Window size must be 0x1000 or 0x2000, not {:#x}".format(window))
+		self.Store = bytearray(store)
+		self._storeView = memoryview(self.Store)
+		self._window = window
+		self._registers = dict()
+		self._registerPages = set()
+		self._bankPages = dict()	# bank to the views of its pages, made on the first switch to it
+		self.listeners = list()
+		pagedmemory.__init__(self)
+		pass
+
+	def memoryClear(self):
+		"Clear RAM and show it in every window"
+		pagedmemory.memoryClear(self)
+		self.Ram = self.Data
+		ram = memoryview(self.Ram)
+		self._ramPages = [ram[page << 8:(page + 1) << 8] for page in range(0x100)]
+		self._banks = [None] * (0x10000 // self._window)
+		self._writable = list(self._ramPages)	# Page a write fault writes to, None when read only
+		self.Read = list(self._ramPages)
+		self.Write = list(self._ramPages)
+		self.Data = pagedview(self)
+		for page in range(0x100):
+			self._refresh(page)
+		pass
+
+	def _refresh(self, page):
+		"Let writes to a page go straight to it unless it is read only or holds a control register"
+		if self._writable[page] is None or page in self._registerPages:
+			self.Write[page] = None
+		else:
+			self.Write[page] = self._writable[page]
+
+	def mapBank(self, window, bank, writable=False):
+		"""
+		Show a bank of the store in a window.
+
+		Parameters
+		----------
+		window : int
+			Window number, the window starts at window times the window size.
+
+		bank : int
+			Bank number in the store.
+
+		writable : bool, optional
+			Writes change the bank, otherwise they are ignored (default is False).
+		"""
+		start = bank * self._window
+		if start < 0 or start + self._window > len(self.Store):
+			raise ValueError("Bank {} is outside of the {} byte store".format(bank, len(self.Store)))
+		if bank not in self._bankPages:
+			self._bankPages[bank] = [self._storeView[address:address + 0x100] for address in range(start, start + self._window, 0x100)]
+		views = self._bankPages[bank]
+		first = window * self._window >> 8
+		last = first + len(views)
+		self.Read[first:last] = views
+		self._writable[first:last] = views if writable else [None] * len(views)
+		for page in range(first, last):
+			self._refresh(page)
+		self._banks[window] = bank
+		for listener in self.listeners:
+			listener(window, bank)
+		pass
+
+	def unmapBank(self, window):
+		"""
+		Show RAM in a window again.
+
+		Parameters
+		----------
+		window : int
+			Window number.
+		"""
+		first = window * self._window >> 8
+		last = first + (self._window >> 8)
+		self.Read[first:last] = self._ramPages[first:last]
+		self._writable[first:last] = self._ramPages[first:last]
+		for page in range(first, last):
+			self._refresh(page)
+		self._banks[window] = None
+		for listener in self.listeners:
+			listener(window, None)
+		pass
+
+	def bank(self, window):
+		"Bank shown in a window, None for RAM"
+		return self._banks[window]
+
+	def readState(self):
+		"Banks mapped, RAM and store as bytes. Control registers and listeners are code, set them up again on the memory restored into"
+		windows = b"".join(
+			_WINDOW.pack(_RAM if bank is None else bank, self._writable[window * self._window >> 8] is not None)
+			for window, bank in enumerate(self._banks)
+		)
+		return _STATE.pack(self._window, len(self._banks), len(self.Store)) + windows + bytes(self.Ram) + bytes(self.Store)
+
+	def writeState(self, state):
+		"Map the banks and load the RAM and store of a state from readState"
+		window, count, size = _STATE.unpack_from(state, 0)
+		if window != self._window:
+			raise ValueError("State has {:#x} byte windows, the memory {:#x}".format(window, self._window))
+		offset = _STATE.size + count * _WINDOW.size
+		self.Ram[:] = state[offset:offset+0x10000]
+		store = state[offset+0x10000:offset+0x10000+size]
+		if size == len(self.Store):
+			self.Store[:] = store
+		else:
+			# The mapped views keep the old store alive until every window is mapped again below
+			self.Store = bytearray(store)
+			self._storeView = memoryview(self.Store)
+			self._bankPages = dict()
+		for number in range(count):
+			bank, writable = _WINDOW.unpack_from(state, _STATE.size + number * _WINDOW.size)
+			if bank == _RAM:
+				self.unmapBank(number)
+			else:
+				self.mapBank(number, bank, bool(writable))
+		pass
+
+	def addRegister(self, start, end, function):
+		"""
+		Call a function on writes to the addresses from start up to end,
+		instead of writing the memory under them.
+
+		Parameters
+		----------
+		start : int
+			First address of the register.
+
+		end : int
+			Address after the last address of the register.
+
+		function : callable
+			Called with the memory, the address and the value, e.g.
+			`lambda memory, address, value: memory.mapBank(4, value & 0x3F)`.
+		"""
+		for address in range(start, end):
+			self._registers[address] = function
+		self._registerPages = {address >> 8 for address in self._registers}
+		for page in range(start >> 8, ((end - 1) >> 8) + 1):
+			self._refresh(page)
+		pass
+
+	def removeRegister(self, start, end):
+		"Write the memory under the addresses from start up to end again"
+		for address in range(start, end):
+			self._registers.pop(address, None)
+		self._registerPages = {address >> 8 for address in self._registers}
+		for page in range(start >> 8, ((end - 1) >> 8) + 1):
+			self._refresh(page)
+		pass
+
+	def writeFault(self, address, value):
+		"Write to a page without a direct write entry, a control register, a read only bank or a page next to them"
+		function = self._registers.get(address)
+		if function is not None:
+			function(self, address, value)
+			return
+		page = self._writable[address >> 8]
+		if page is not None:
+			page[address & 0xFF] = value
+			self.Dirty[address >> 8] = 1
+
+	def _pokePage(self, page):
+		"Page to write to through Data, banks mapped read only included"
+		return self.Read[page]
@@ -0,0 +1,343 @@
+import hashlib
+import json
+import os
+
+from cpu import cpu
+from snapshot import snapshot
+
+class resultcache:
+	"""
+	Result cache
+	============
+	Job results on disk, one JSON file per key. Reading a result marks it as
+	recently used, and once the files take more than `limit` bytes the least
+	recently used ones are removed.
+
+	Methods
+	-------
+	get(key)
+		Stored result of a key.
+
+	put(key, result)
+		Store the result of a key.
+
+	clear()
+		Remove every stored result.
+	"""
+
+	def __init__(self, path, limit=64*1024*1024):
+		"""
+		Parameters
+		----------
+		path : str
+			Directory of the cache, created if missing.
+
+		limit : int, optional
+			Most bytes the stored results may take (default is 64 MiB).
+		"""
+		self._path = path
+		self._limit = limit
+		os.makedirs(path, exist_ok=True)
+		self._size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.name.endswith(".json"))
+		if self._size > limit:
+			self._evict()
+		pass
+
+	def _file(self, key):
+		"""
+		Path of the file holding the result of a key.
+		"""
+		return os.path.join(self._path, key + ".json")
+
+	def get(self, key):
+		"""
+		Stored result of a key.
+
+		Parameters
+		----------
+		key : str
+			Job key.
+
+		Returns
+		-------
+		dict
+			The result, None if it is not stored.
+		"""
+		try:
+			with open(self._file(key)) as file:
+				result = json.load(file)
+		except (OSError, ValueError):
+			return None
+		os.utime(self._file(key))
+		return result
+
+	def put(self, key, result):
+		"""
+		Store the result of a key. The file is replaced in one step, so a
+		concurrent reader never sees it half written.
+
+		Parameters
+		----------
+		key : str
+			Job key.
+
+		result : dict
+			Result, must be JSON serialisable.
+		"""
+		path = self._file(key)
+		try:
+			self._size -= os.path.getsize(path)
+		except OSError:
+			pass
+		with open(path + ".tmp", "w") as file:
+			json.dump(result, file)
+		os.replace(path + ".tmp", path)
+		self._size += os.path.getsize(path)
+		if self._size > self._limit:
+			self._evict()
+		pass
+
+	def _evict(self):
+		"""
+		Remove the least recently used results until the cache fits its limit.
+		"""
+		entries = [entry for entry in os.scandir(self._path) if entry.name.endswith(".json")]
+		entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+		self._size = sum(entry.stat().st_size for entry in entries)
+		for entry in entries:
+			if self._size <= self._limit:
+				break
+			self._size -= entry.stat().st_size
+			os.remove(entry.path)
+		pass
+
+	def clear(self):
+		"""
+		Remove every stored result.
+		"""
+		for entry in os.scandir(self._path):
+			if entry.name.endswith(".json"):
+				os.remove(entry.path)
+		self._size = 0
+		pass
+
+# Modules a result depends on: the cpu and its engines, the memories, the bus,
+# the snapshots jobs start from and the counters every result holds
+_ENGINE_MODULES = ("cpu", "generator", "variants", "memory", "paging", "banking", "sparse", "bus", "snapshot", "counters")
+
+def engineVersion(variant="6502", engine="run"):
+	"""
+	Version of the emulator a result depends on, a hash of the source of
+	the modules in `_ENGINE_MODULES`. Changes to the other modules, e.g. the
+	tools and the debuggers, keep the cached results.
+
+	Parameters
+	----------
+	variant : str, optional
+		Cpu variant (default is "6502").
+
+	engine : str, optional
+		"run" for the register-in-locals core or "step" (default is "run").
+
+	Returns
+	-------
+	str
+		Hex digest.
+	"""
+	digest = hashlib.sha256("{} {}".format(variant, engine).encode())
+	directory = os.path.dirname(os.path.abspath(__file__))
+	for name in _ENGINE_MODULES:
+		digest.update(name.encode() + b"\0")
+		with open(os.path.join(directory, name + ".py"), "rb") as file:
+			digest.update(file.read())
+	return digest.hexdigest()
+
+class batch:
+	"""
+	Batch runner
+	============
+	Runs jobs, each a binary loaded at an address and run from an initial
+	state for a budget of clock cycles. A job is keyed by the hash of its
+	binary, its initial state, its budget, the regions it collects and the
+	emulator version. When the cache holds a result for the key, the job is
+	not run again.
+
+	A job is a dict:
+
+	"binary" : bytes or str
+		The binary or the path of it, optional with a snapshot.
+
+	"snapshot" : str, optional
+		Path of a `snapshot` the cpu starts from, e.g. a booted firmware,
+		before the binary and state are applied (default is a cleared machine).
+
+	"address" : int, optional
+		Load address (default is 0x0000).
+
+	"state" : dict, optional
+		Initial values of registers and flags by name in `cpu._STATE`, e.g. {"_PC": 0x0200}.
+
+	"cycles" : int, optional
+		Budget in clock cycles (default is running until the cpu halts).
+
+	"regions" : dict, optional
+		Memory regions to return, name to (start, end).
+
+	"variant" : str, optional
+		Cpu variant (default is "6502").
+
+	"engine" : str, optional
+		"run" or "step" (default is "run").
+
+	A result holds the final registers and flags in "state", the regions as
+	hex in "memory", the counters in "counters" and whether it came from the
+	cache in "cached".
+
+	Methods
+	-------
+	key(job)
+		Cache key of a job.
+
+	runJob(job)
+		Result of one job.
+
+	run(jobs)
+		Results of several jobs.
+	"""
+
+	def __init__(self, cache=None):
+		"""
+		Parameters
+		----------
+		cache : resultcache, optional
+			Where results are kept between runs (default is running every job).
+		"""
+		self._cache = cache
+		self._versions = dict()
+		self._snapshots = dict()	# path to the loaded snapshot and the hash of its file
+		self.hits = 0
+		self.misses = 0
+		pass
+
+	def _binary(self, job):
+		"""
+		Bytes of the binary of a job.
+		"""
+		binary = job.get("binary", b"")
+		if isinstance(binary, str):
+			with open(binary, "rb") as file:
+				return file.read()
+		return bytes(binary)
+
+	def _snapshot(self, path):
+		"""
+		Snapshot of a path and the hash of its file, loaded once.
+		"""
+		if path not in self._snapshots:
+			with open(path, "rb") as file:
+				digest = hashlib.sha256(file.read()).hexdigest()
+			self._snapshots[path] = (snapshot.load(path), digest)
+		return self._snapshots[path]
+
+	def key(self, job, binary=None):
+		"""
+		Cache key of a job.
+
+		Parameters
+		----------
+		job : dict
+			The job.
+
+		binary : bytes, optional
+			Contents of the binary, read from the job when not given.
+
+		Returns
+		-------
+		str
+			Hex digest.
+		"""
+		variant, engine = job.get("variant", "6502"), job.get("engine", "run")
+		if (variant, engine) not in self._versions:
+			self._versions[variant, engine] = engineVersion(variant, engine)
+		binary = self._binary(job) if binary is None else binary
+		description = [
+			hashlib.sha256(binary).hexdigest(),
+			job.get("address", 0),
+			sorted(job.get("state", {}).items()),
+			job.get("cycles"),
+			sorted((name, list(region)) for name, region in job.get("regions", {}).items()),
+			self._versions[variant, engine]
+		]
+		if "snapshot" in job:
+			description.append(self._snapshot(job["snapshot"])[1])
+		return hashlib.sha256(json.dumps(description).encode()).hexdigest()
+
+	def _execute(self, job, binary):
+		"""
+		Run a job on a new cpu.
+		"""
+		CPU = cpu(variant=job.get("variant"))
+		if "snapshot" in job:
+			self._snapshot(job["snapshot"])[0].restore(CPU)
+		CPU._memory.load(job.get("address", 0), binary)
+		for name, value in job.get("state", {}).items():
+			if name not in CPU._STATE:
+				raise ValueError("Unknown register {!r}".format(name))
+			setattr(CPU, name, value)
+		CPU.counters.reset()
+		cycles = job.get("cycles")
+		if job.get("engine", "run") == "run":
+			CPU.run(cycles=cycles)
+		else:
+			stop = None if cycles is None else CPU._cycles + cycles
+			while (stop is None or CPU._cycles < stop) and CPU.step():
+				pass
+		return {
+			"state": {name: int(value) for name, value in zip(CPU._STATE, CPU.readState())},
+			"memory": {name: bytes(CPU._memory.Data[start:end]).hex() for name, (start, end) in job.get("regions", {}).items()},
+			"counters": CPU.counters.sample()
+		}
+
+	def runJob(self, job):
+		"""
+		Result of one job, from the cache when it holds one.
+
+		Parameters
+		----------
+		job : dict
+			The job.
+
+		Returns
+		-------
+		dict
+			The result.
+		"""
+		binary = self._binary(job)
+		key = self.key(job, binary) if self._cache is not None else None
+		result = self._cache.get(key) if key is not None else None
+		if result is not None:
+			self.hits += 1
+			result["cached"] = True
+			return result
+		self.misses += 1
+		result = self._execute(job, binary)
+		if key is not None:
+			self._cache.put(key, result)
+		result["cached"] = False
+		return result
+
+	def run(self, jobs):
+		"""
+		Results of several jobs, only the jobs without a cached result are run.
+
+		Parameters
+		----------
+		jobs : list
+			The jobs.
+
+		Returns
+		-------
+		list
+			Results in the order of the jobs.
+		"""
+		return [self.runJob(job) for job in jobs]
@@ -0,0 +1,336 @@
+import ast
+import re
+
+_TOKEN = re.compile(r"\s*(?:(\$[0-9A-Fa-f]+)|(%[01]+)|(\d+\.?\d*(?:[eE][+-]?\d+)?)|([A-Za-z_]\w*)|(==|!=|<=|>=|<<|>>|[-+*/%&|^~<>()\[\]]))")
+
+# Names of the expression language and what they read
+_NAMES = {
+	"a": "cpu._Acc", "x": "cpu._Reg_X", "y": "cpu._Reg_Y", "sp": "cpu._SP", "pc": "cpu._PC",
+	"n": "cpu._PS_n", "v": "cpu._PS_v", "b": "cpu._PS_b", "d": "cpu._PS_d",
+	"i": "cpu._PS_i", "z": "cpu._PS_z", "c": "cpu._PS_c",
+	"cycles": "cpu._cycles", "mem": "mem", "address": "address", "value": "value",
+	"and": "and", "or": "or", "not": "not"
+}
+
+_ALLOWED = (
+	ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd, ast.Invert,
+	ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.BitAnd, ast.BitOr, ast.BitXor, ast.LShift, ast.RShift,
+	ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+	ast.Constant, ast.Name, ast.Attribute, ast.Subscript, ast.Load
+)
+
+def compileCondition(text: str):
+	"""
+	Compile a condition to a python function.
+
+	Registers are A, X, Y, SP and PC, flags are N, V, B, D, I, Z and C, and
+	`cycles` is the cycle count. `mem[address]` reads a byte of memory, without
+	going through devices on the bus. Watch points also set `address` and
+	`value` to the accessed address and the byte read or written. Numbers are
+	decimal, $ hexadecimal or % binary. Operators are those of python:
+	and, or, not, comparisons and arithmetic and bitwise operators.
+
+	Parameters
+	----------
+	text : str
+		The condition, e.g. "A == $40 and mem[$00FE] > 3 and cycles > 1e6".
+
+	Returns
+	-------
+	function
+		Called with the cpu, its memory data, the address and the value, returns the result of the condition.
+	"""
+	source = []
+	position = 0
+	text = text.strip()
+	while position < len(text):
+		match = _TOKEN.match(text, position)
+		if match is None:
+			raise ValueError("Unexpected {!r} in condition {!r}".format(text[position:].strip()[:1], text))
+		hexadecimal, binary, number, name, operator = match.groups()
+		if hexadecimal:
+			source.append(str(int(hexadecimal[1:], 16)))
+		elif binary:
+			source.append(str(int(binary[1:], 2)))
+		elif number:
+			source.append(number)
+		elif name:
+			if name.lower() not in _NAMES:
+				raise ValueError("Unknown name {!r} in condition {!r}".format(name, text))
+			source.append(_NAMES[name.lower()])
+		else:
+			source.append(operator)
+		position = match.end()
+
+	try:
+		tree = ast.parse(" ".join(source), mode="eval")
+	except SyntaxError:
+		raise ValueError("Invalid condition {!r}".format(text)) from None
+	for node in ast.walk(tree):
+		if not isinstance(node, _ALLOWED):
+			raise ValueError("Invalid condition {!r}".format(text))
+		if isinstance(node, ast.Subscript) and not (isinstance(node.value, ast.Name) and node.value.id == "mem"):
+			raise ValueError("Only mem can be indexed in condition {!r}".format(text))
+		if isinstance(node, ast.Subscript):
+			# Addresses wrap around like on the bus
+			node.slice = ast.BinOp(left=node.slice, op=ast.BitAnd(), right=ast.Constant(0xFFFF))
+
+	namespace = dict()
+	exec(compile("def condition(cpu, mem, address=None, value=None):\n\treturn " + ast.unparse(tree), "<condition>", "exec"), namespace)
+	return namespace["condition"]
+
+class breakpoints:
+	"""
+	Conditional breakpoints and watch points
+	========================================
+	Stops or calls a function when the program counter reaches an address or
+	a memory range is accessed, if a condition holds. Conditions are compiled
+	once by `compileCondition`, see there for the language.
+
+	Breakpoints are checked by the run loop, `cpu.run(breaks=...)` stops
+	before the instruction on a breakpoint address, so the cpu runs on its
+	fastest engine and only returns to python on those addresses. Guest
+	memory is left as it is. Traps take precedence over a breakpoint on the
+	same address.
+
+	Watch points hook the memory reads or writes of the cpu and look the
+	accessed page up in a table, the cpu runs on `step()` while any are set.
+	Reads include instruction fetches.
+
+	Methods
+	-------
+	addBreakpoint(address, condition, action)
+		Stop or call a function when the program counter reaches an address.
+
+	removeBreakpoint(address)
+		Remove a breakpoint.
+
+	addWatch(start, end, condition, access, action)
+		Stop or call a function when a memory range is read or written.
+
+	removeWatch(start, end, access)
+		Remove a watch point.
+
+	run(cycles)
+		Run until a breakpoint or watch point stops the cpu.
+	"""
+
+	def __init__(self, cpu):
+		"""
+		Parameters
+		----------
+		cpu : cpu
+			The cpu to run.
+		"""
+		self._cpu = cpu
+		self._breakpoints = dict()	# address to (condition, action)
+		self._watches = dict()		# (start, end, access) to (condition, action)
+		self._pages = {"read": [None] * 0x100, "write": [None] * 0x100}
+		self._hooked = False
+		self._hit = None
+		self._stopped = None		# breakpoint address the cpu stopped on
+		self.hits = dict()			# breakpoint address or watch key to times triggered
+		pass
+
+	def addBreakpoint(self, address: int, condition=None, action=None):
+		"""
+		Stop or call a function when the program counter reaches an address and the condition holds.
+
+		Parameters
+		----------
+		address : int
+			Address of the instruction.
+
+		condition : str, optional
+			Condition, see `compileCondition` (default is always).
+
+		action : callable, optional
+			Called with the cpu, the address and None instead of stopping (default is stopping).
+		"""
+		self._breakpoints[address] = (compileCondition(condition) if condition else None, action)
+		pass
+
+	def removeBreakpoint(self, address: int):
+		"""
+		Remove a breakpoint.
+		"""
+		self._breakpoints.pop(address, None)
+		pass
+
+	def addWatch(self, start: int, end: int, condition=None, access="write", action=None):
+		"""
+		Stop or call a function when an address from start up to end is accessed and the condition holds.
+		A write stops before the byte is written, a read after it is read.
+
+		Parameters
+		----------
+		start : int
+			First address of the range.
+
+		end : int
+			Address after the last address of the range.
+
+		condition : str, optional
+			Condition, `address` and `value` are the accessed address and byte (default is always).
+
+		access : str, optional
+			"read" or "write" (default is "write").
+
+		action : callable, optional
+			Called with the cpu, the address and the value instead of stopping (default is stopping).
+		"""
+		if access not in self._pages:
+			raise ValueError("Unknown access {!r}, expected read or write".format(access))
+		self._watches[(start, end, access)] = (compileCondition(condition) if condition else None, action)
+		self._index()
+		pass
+
+	def removeWatch(self, start: int, end: int, access="write"):
+		"""
+		Remove a watch point.
+		"""
+		self._watches.pop((start, end, access), None)
+		self._index()
+		pass
+
+	def _index(self):
+		"""
+		Rebuild the watch points per page and hook the memory methods of the cpu while there are any.
+		"""
+		for access, pages in self._pages.items():
+			pages[:] = [None] * 0x100
+			for key, (condition, action) in self._watches.items():
+				start, end, kind = key
+				if kind != access:
+					continue
+				for page in range(start >> 8, ((end - 1) >> 8) + 1):
+					if pages[page & 0xFF] is None:
+						pages[page & 0xFF] = list()
+					pages[page & 0xFF].append((start, end, condition, action, key))
+		if self._watches and not self._hooked:
+			self._hook()
+		elif not self._watches and self._hooked:
+			self._unhook()
+		pass
+
+	def _fire(self, key, address, value, action):
+		"""
+		Count a hit and call its action, or stop when it has none.
+		"""
+		self.hits[key] = self.hits.get(key, 0) + 1
+		if action is not None:
+			action(self._cpu, address, value)
+		elif self._hit is None:
+			self._hit = (key, address, value)
+		pass
+
+	def _check(self, pages, address, value):
+		"""
+		Trigger the watch points of an access.
+		"""
+		for start, end, condition, action, key in pages[(address >> 8) & 0xFF]:
+			if start <= address < end and (condition is None or condition(self._cpu, self._cpu._memory.Data, address, value)):
+				self._fire(key, address, value, action)
+		pass
+
+	def _hook(self):
+		"""
+		Hook the memory methods of the cpu.
+		"""
+		CPU = self._cpu
+		readPages, writePages = self._pages["read"], self._pages["write"]
+		check = self._check
+
+		def watchReadByte(readByte):
+			def watchReadByte(address):
+				value = readByte(address)
+				if readPages[(address >> 8) & 0xFF] is not None:
+					check(readPages, address, value)
+				return value
+			return watchReadByte
+
+		def watchReadWord(readWord):
+			def watchReadWord(address):
+				value = readWord(address)
+				for offset in (0, 1):
+					if readPages[((address + offset) >> 8) & 0xFF] is not None:
+						check(readPages, address + offset, (value >> (offset * 8)) & 0xFF)
+				return value
+			return watchReadWord
+
+		def watchWriteByte(writeByte):
+			def watchWriteByte(address, value):
+				if writePages[(address >> 8) & 0xFF] is not None:
+					check(writePages, address, value & 0xFF)
+				writeByte(address, value)
+			return watchWriteByte
+
+		def watchWriteWord(writeWord):
+			def watchWriteWord(address, value):
+				for offset in (0, 1):
+					if writePages[((address + offset) >> 8) & 0xFF] is not None:
+						check(writePages, address + offset, (value >> (offset * 8)) & 0xFF)
+				writeWord(address, value)
+			return watchWriteWord
+
+		CPU.addHook(self, "readByte", watchReadByte)
+		CPU.addHook(self, "readWord", watchReadWord)
+		CPU.addHook(self, "writeByte", watchWriteByte)
+		CPU.addHook(self, "writeWord", watchWriteWord)
+		self._hooked = True
+		pass
+
+	def _unhook(self):
+		"""
+		Remove the hooks on the memory methods of the cpu.
+		"""
+		self._cpu.removeHook(self)
+		self._hooked = False
+		pass
+
+	def run(self, cycles=None):
+		"""
+		Run until a breakpoint or watch point stops the cpu, the cpu halts or
+		`cycles` have elapsed. Running again continues past the breakpoint the
+		cpu stopped on.
+
+		Parameters
+		----------
+		cycles : int, optional
+			Stop once this many clock cycles have elapsed (default is no limit).
+
+		Returns
+		-------
+		tuple
+			(breakpoint address, program counter, None) or ((start, end, access), address, value)
+			for what stopped the cpu, None when it halted or ran out of cycles.
+		"""
+		CPU = self._cpu
+		stop = (1 << 62) if cycles is None else CPU._cycles + cycles
+		resume = self._stopped if self._stopped == CPU._PC else None
+		self._stopped = None
+		self._hit = None
+		while CPU._cycles < stop:
+			address = CPU._PC
+			if address in self._breakpoints:
+				condition, action = self._breakpoints[address]
+				if address != resume and (condition is None or condition(CPU, CPU._memory.Data, address)):
+					self._fire(address, address, None, action)
+					if self._hit is not None:
+						self._stopped = address
+						return self._hit
+				resume = None
+				if not CPU.step():
+					break
+			elif self._watches:
+				resume = None
+				if not CPU.step():
+					break
+			else:
+				resume = None
+				CPU.run(cycles=stop - CPU._cycles, breaks={address for address in self._breakpoints if address not in CPU._traps})
+				if CPU._PC not in self._breakpoints:
+					break
+			if self._hit is not None:
+				return self._hit
+		return None
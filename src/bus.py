@@ -0,0 +1,139 @@
+"""
+Device bus
+==========
+A cpu with devices attached (`cpu.attachDevice`) becomes a subclass whose
+memory methods check a table of 256 pages first. Pages without a device
+go straight to the memory methods of the base class, pages with one look
+the device up per address. The run loop is generated for the subclass,
+so devices are served from `run()` and only accesses to device pages pay
+for the lookup.
+
+Devices are called with `cpu._cycles` up to date, also from the run loop.
+They must not change the registers of the cpu from `read` or `write`, the
+run loop keeps those in local variables.
+"""
+
+from generator import generateCore
+
+class bussed:
+	"""
+	Memory methods of a cpu with devices. `busClass` mixes it into a cpu class.
+	"""
+
+	def readByte(self, address: int):
+		"""
+		Read 1 byte from the device or the memory at the address.
+
+		Parameters
+		----------
+		address : int
+			Address in memory.
+
+		Returns
+		-------
+		int
+			1 byte value on the specified address.
+		"""
+		# One expression, so the run loop inlines the memory read and only calls out for device pages
+		return self._readMemory(address) if self._portPages[address >> 8] is None else self._readPort(address, self._cycles)
+
+	def readWord(self, address: int):
+		"""
+		Read 2 bytes from the devices or the memory at the address.
+
+		Parameters
+		----------
+		address : int
+			Address in memory.
+
+		Returns
+		-------
+		int
+			2 byte value on the specified address.
+		"""
+		return self.readByte(address) + self.readByte(address+1)*0x0100
+
+	def writeByte(self, address: int, value: int):
+		"""
+		Write 1 byte to the device or the memory at the address.
+
+		Parameters
+		----------
+		address : int
+			Address in memory.
+
+		value : int
+			1 byte value to write to the address.
+		"""
+		if self._portPages[address >> 8] is None:
+			self._writeMemory(address, value)
+		else:
+			self._writePort(address, value, self._cycles)
+		pass
+
+	def writeWord(self, address: int, value: int):
+		"""
+		Write 2 bytes to the devices or the memory at the address.
+
+		Parameters
+		----------
+		address : int
+			Address in memory.
+
+		value : int
+			2 byte value to write to the address.
+		"""
+		self.writeByte(address, value)
+		self.writeByte(address+1, value >> 8)
+		pass
+
+	def _readPort(self, address: int, cycles: int):
+		"""
+		Read from the device on a device page, or the memory where the page has none.
+		"""
+		device = self._ports.get(address)
+		if device is None:
+			return self._readMemory(address)
+		self._cycles = cycles
+		return device.read(address) & 0xFF
+
+	def _writePort(self, address: int, value: int, cycles: int):
+		"""
+		Write to the device on a device page, or the memory where the page has none.
+		"""
+		device = self._ports.get(address)
+		if device is None:
+			self._writeMemory(address, value)
+		else:
+			self._cycles = cycles
+			device.write(address, value & 0xFF)
+		pass
+
+_CLASSES = dict()
+
+def busClass(base):
+	"""
+	Cpu class that serves attached devices, made once per base class.
+
+	Parameters
+	----------
+	base : type
+		Cpu class, variant or paged class.
+
+	Returns
+	-------
+	type
+		Subclass of base with the memory methods of `bussed` and a run loop generated for them.
+	"""
+	if issubclass(base, bussed):
+		return base
+	if base not in _CLASSES:
+		cls = type("bussed" + base.__name__, (bussed, base), {
+			"__doc__": base.__doc__,
+			"_base": base,
+			"_readMemory": base.readByte,
+			"_writeMemory": base.writeByte
+		})
+		cls._runCore = generateCore(cls)
+		_CLASSES[base] = cls
+	return _CLASSES[base]
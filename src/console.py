@@ -0,0 +1,252 @@
+import os
+import sys
+import threading
+from collections import deque
+
+class console:
+	"""
+	Character I/O device
+	====================
+	Three ports on the cpu bus: an output port, an input port and a status
+	register. Characters written to the output port are collected in a buffer
+	and written to the host in large blocks. Input arrives in blocks from a
+	file, a pipe or an asyncio queue and is handed out a byte at a time, so
+	the guest polling the status register never touches the host.
+
+	Ports
+	-----
+	base + 0
+		Output, writing sends a character.
+
+	base + 1
+		Input, reading takes the next character, 0 when there is none.
+
+	base + 2
+		Status, bit 0 is set while input is available, bit 1 while output is
+		accepted (always) and bit 2 once the input source has ended.
+
+	Methods
+	-------
+	feed(data)
+		Queue input bytes.
+
+	inputFrom(file)
+		Queue input read from a file or pipe on a background thread.
+
+	inputQueue(queue)
+		Coroutine queueing input taken from an asyncio queue.
+
+	flush()
+		Write buffered output to the host.
+
+	close()
+		Flush output and detach from the cpu.
+
+	readState()
+		Pending input as bytes, for snapshots.
+
+	writeState(state)
+		Replace pending input with a state from `readState`.
+	"""
+
+	_OUTPUT = 0
+	_INPUT = 1
+	_STATUS = 2
+
+	_STATUS_INPUT = 0b001
+	_STATUS_OUTPUT = 0b010
+	_STATUS_END = 0b100
+
+	def __init__(self, cpu, base=0xF000, output=None, bufferSize=0x2000):
+		"""
+		Parameters
+		----------
+		cpu : cpu
+			The cpu to attach the ports to.
+
+		base : int, optional
+			Address of the output port, the input port and status follow it (default is 0xF000).
+
+		output : file, optional
+			Binary file output is written to (default is the standard output).
+
+		bufferSize : int, optional
+			Output is written to the host once this many bytes are buffered (default is 0x2000).
+		"""
+		self._cpu = cpu
+		self._base = base
+		self._output = sys.stdout.buffer if output is None else output
+		self._bufferSize = bufferSize
+		self._buffer = bytearray()
+		self._input = b""
+		self._position = 0
+		self._chunks = deque()
+		self._ended = False
+		cpu.attachDevice(self, base, base+3)
+		pass
+
+	def read(self, address: int):
+		"""
+		Bus read of a port.
+		"""
+		port = address - self._base
+		if port == self._INPUT:
+			if self._position >= len(self._input) and not self._next():
+				return 0
+			value = self._input[self._position]
+			self._position += 1
+			return value
+		if port == self._STATUS:
+			status = self._STATUS_OUTPUT
+			if self._position < len(self._input) or self._next():
+				status |= self._STATUS_INPUT
+			elif self._ended:
+				status |= self._STATUS_END
+			return status
+		return 0
+
+	def write(self, address: int, value: int):
+		"""
+		Bus write of a port.
+		"""
+		if address - self._base == self._OUTPUT:
+			self._buffer.append(value)
+			if len(self._buffer) >= self._bufferSize:
+				self.flush()
+		pass
+
+	def _next(self):
+		"""
+		Take the next input block, returns False when there is none.
+		"""
+		# Guest is waiting for input, show what it printed so far
+		if self._buffer:
+			self.flush()
+		while self._chunks:
+			chunk = self._chunks.popleft()
+			if chunk is None:
+				self._ended = True
+				continue
+			if chunk:
+				self._input = chunk
+				self._position = 0
+				return True
+		return False
+
+	def feed(self, data):
+		"""
+		Queue input bytes, None marks the end of input. Safe to call from any thread.
+
+		Parameters
+		----------
+		data : bytes or str
+			Input, str is encoded as latin-1.
+		"""
+		if isinstance(data, str):
+			data = data.encode("latin-1")
+		self._chunks.append(None if data is None else bytes(data))
+		pass
+
+	def inputFrom(self, file):
+		"""
+		Queue input read from a file or pipe on a background thread, block by block.
+
+		Parameters
+		----------
+		file : file or int
+			Binary file object or file descriptor.
+
+		Returns
+		-------
+		threading.Thread
+			The reading thread, it ends with the input.
+		"""
+		if isinstance(file, int):
+			read = lambda: os.read(file, 0x10000)
+		elif hasattr(file, "read1"):
+			read = lambda: file.read1(0x10000)
+		else:
+			read = lambda: file.read(0x10000)
+
+		def pump():
+			data = read()
+			while data:
+				self.feed(data)
+				data = read()
+			self.feed(None)
+
+		thread = threading.Thread(target=pump, name="console input", daemon=True)
+		thread.start()
+		return thread
+
+	async def inputQueue(self, queue):
+		"""
+		Queue input taken from an asyncio queue until it yields None.
+
+		Parameters
+		----------
+		queue : asyncio.Queue
+			Queue of bytes or str blocks.
+		"""
+		while True:
+			data = await queue.get()
+			self.feed(data)
+			if data is None:
+				break
+		pass
+
+	def flush(self):
+		"""
+		Write buffered output to the host.
+		"""
+		if self._buffer:
+			self._output.write(self._buffer)
+			self._buffer = bytearray()
+		if hasattr(self._output, "flush"):
+			self._output.flush()
+		pass
+
+	def readState(self):
+		"""
+		Pending input as bytes, for snapshots. Output is flushed first, it is
+		not part of the state.
+
+		Returns
+		-------
+		bytes
+			A byte set to 1 once the input has ended, then the input not read yet.
+		"""
+		self.flush()
+		pending = [self._input[self._position:]]
+		ended = self._ended
+		for chunk in list(self._chunks):
+			if chunk is None:
+				ended = True
+			else:
+				pending.append(chunk)
+		return bytes([ended]) + b"".join(pending)
+
+	def writeState(self, state):
+		"""
+		Replace pending input with a state from `readState`.
+
+		Parameters
+		----------
+		state : bytes
+			The state.
+		"""
+		self._input = bytes(state[1:])
+		self._position = 0
+		self._chunks.clear()
+		self._ended = False
+		if state[0]:
+			self._chunks.append(None)
+		pass
+
+	def close(self):
+		"""
+		Flush output and detach the ports from the cpu.
+		"""
+		self.flush()
+		self._cpu.detachDevice(self)
+		pass
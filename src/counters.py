@@ -0,0 +1,231 @@
+import json
+import os
+
+class counters:
+	"""
+	Performance counters
+	====================
+	Counts the work of the guest as it runs. The instruction, branch, page
+	crossing, interrupt and stack counters are kept by the cpu itself on every
+	engine and cost about one addition per event. Memory reads and writes per
+	region have to see every access, so they are only counted after `watch`,
+	and `run()` uses `step()` while they are.
+
+	Page crossings are indexed addresses whose page differs from the base
+	address and taken branches to another page, the events that cost a
+	penalty cycle on hardware. The cycle count is the sum of the base cycles
+	of the instructions, it includes neither that penalty nor the one of
+	taken branches, so it is not cycle-accurate.
+
+	The stack depth is measured from the stack pointer at `reset` and again
+	from every stack pointer written by TXS or `cpu.writeState`, the deepest
+	stack of those is reported.
+
+	Methods
+	-------
+	sample()
+		Read every counter.
+
+	reset()
+		Start counting from zero.
+
+	watch(regions)
+		Count memory reads and writes per region.
+
+	unwatch()
+		Stop counting memory reads and writes.
+
+	saveJSON(path)
+		Write a sample as JSON.
+
+	prometheus(labels)
+		A sample in the Prometheus text format.
+
+	savePrometheus(path, labels)
+		Write a sample in the Prometheus text format.
+	"""
+
+	_PREFIX = "emu6502_"
+
+	def __init__(self, cpu):
+		"""
+		Parameters
+		----------
+		cpu : cpu
+			The cpu to count.
+		"""
+		self._cpu = cpu
+		self._regions = dict()
+		self.reset()
+		pass
+
+	def reset(self):
+		"""
+		Start counting from zero. The stack depth is measured from the current stack pointer.
+		"""
+		CPU = self._cpu
+		CPU._retired = 0
+		CPU._branchesTaken = 0
+		CPU._branchesNotTaken = 0
+		CPU._pageCrosses = 0
+		CPU._interrupts = 0
+		CPU._stackTop = CPU._stackLow = CPU._SP
+		CPU._stackDepth = 0
+		self._cycles = CPU._cycles
+		for counts in self._regions.values():
+			counts[:] = [0, 0]
+		pass
+
+	def sample(self):
+		"""
+		Read every counter.
+
+		Returns
+		-------
+		dict
+			Counter values, memory counts as {region: {"reads": int, "writes": int}}.
+		"""
+		CPU = self._cpu
+		return {
+			"instructions": CPU._retired,
+			"cycles": CPU._cycles - self._cycles,
+			"branchesTaken": CPU._branchesTaken,
+			"branchesNotTaken": CPU._branchesNotTaken,
+			"pageCrosses": CPU._pageCrosses,
+			"interrupts": CPU._interrupts,
+			"maxStackDepth": max(CPU._stackDepth, CPU._stackTop - min(CPU._stackLow, CPU._SP)),
+			"memory": {name: {"reads": counts[0], "writes": counts[1]} for name, counts in self._regions.items()}
+		}
+
+	def watch(self, regions):
+		"""
+		Count memory reads and writes per region. Reads include instruction fetches.
+
+		Parameters
+		----------
+		regions : dict
+			Region name to (start, end), from start up to end. Later regions win where they overlap.
+		"""
+		self.unwatch()
+		CPU = self._cpu
+		self._regions = {name: [0, 0] for name in regions}
+		owner = [None] * 0x10000
+		for name, (start, end) in regions.items():
+			owner[start:end] = [self._regions[name]] * (end - start)
+
+		def countReadByte(readByte):
+			def countReadByte(address):
+				counts = owner[address & 0xFFFF]
+				if counts is not None:
+					counts[0] += 1
+				return readByte(address)
+			return countReadByte
+
+		def countReadWord(readWord):
+			def countReadWord(address):
+				for a in (address, address+1):
+					counts = owner[a & 0xFFFF]
+					if counts is not None:
+						counts[0] += 1
+				return readWord(address)
+			return countReadWord
+
+		def countWriteByte(writeByte):
+			def countWriteByte(address, value):
+				counts = owner[address & 0xFFFF]
+				if counts is not None:
+					counts[1] += 1
+				writeByte(address, value)
+			return countWriteByte
+
+		def countWriteWord(writeWord):
+			def countWriteWord(address, value):
+				for a in (address, address+1):
+					counts = owner[a & 0xFFFF]
+					if counts is not None:
+						counts[1] += 1
+				writeWord(address, value)
+			return countWriteWord
+
+		CPU.addHook(self, "readByte", countReadByte)
+		CPU.addHook(self, "readWord", countReadWord)
+		CPU.addHook(self, "writeByte", countWriteByte)
+		CPU.addHook(self, "writeWord", countWriteWord)
+		pass
+
+	def unwatch(self):
+		"""
+		Stop counting memory reads and writes. The counts are kept until `reset` or `watch`.
+		"""
+		self._cpu.removeHook(self)
+		pass
+
+	def saveJSON(self, path):
+		"""
+		Write a sample as JSON.
+
+		Parameters
+		----------
+		path : str
+			Path of the JSON file.
+		"""
+		with open(path, "w") as file:
+			json.dump(self.sample(), file, indent="\t")
+		pass
+
+	def prometheus(self, labels=None):
+		"""
+		A sample in the Prometheus text format.
+
+		Parameters
+		----------
+		labels : dict, optional
+			Labels added to every metric, e.g. {"instance": "worker-3"}.
+
+		Returns
+		-------
+		str
+			Metric families with HELP and TYPE lines.
+		"""
+		sample = self.sample()
+		labels = dict(labels or {})
+
+		def metric(name, kind, description, values):
+			lines = ["# HELP {}{} {}".format(self._PREFIX, name, description), "# TYPE {}{} {}".format(self._PREFIX, name, kind)]
+			for extra, value in values:
+				pairs = ",".join('{}="{}"'.format(key, str(text).replace("\\", "\\\\").replace('"', '\\"')) for key, text in {**labels, **extra}.items())
+				lines.append("{}{}{} {}".format(self._PREFIX, name, "{" + pairs + "}" if pairs else "", value))
+			return lines
+
+		lines = []
+		lines += metric("instructions_total", "counter", "Instructions executed.", [({}, sample["instructions"])])
+		lines += metric("cycles_total", "counter", "Base clock cycles of the instructions executed, without page crossing and branch penalties.", [({}, sample["cycles"])])
+		lines += metric("branches_total", "counter", "Branches executed.", [
+			({"outcome": "taken"}, sample["branchesTaken"]),
+			({"outcome": "not_taken"}, sample["branchesNotTaken"])
+		])
+		lines += metric("page_crosses_total", "counter", "Indexed addresses and taken branches crossing a page.", [({}, sample["pageCrosses"])])
+		lines += metric("interrupts_total", "counter", "IRQ and NMI serviced.", [({}, sample["interrupts"])])
+		lines += metric("stack_depth_max", "gauge", "Deepest stack in bytes.", [({}, sample["maxStackDepth"])])
+		if sample["memory"]:
+			lines += metric("memory_reads_total", "counter", "Memory reads per region.", [({"region": name}, counts["reads"]) for name, counts in sample["memory"].items()])
+			lines += metric("memory_writes_total", "counter", "Memory writes per region.", [({"region": name}, counts["writes"]) for name, counts in sample["memory"].items()])
+		return "\n".join(lines) + "\n"
+
+	def savePrometheus(self, path, labels=None):
+		"""
+		Write a sample in the Prometheus text format. The file is replaced in
+		one step, so a collector never reads it half written.
+
+		Parameters
+		----------
+		path : str
+			Path of the metrics file.
+
+		labels : dict, optional
+			Labels added to every metric.
+		"""
+		with open(path + ".tmp", "w") as file:
+			file.write(self.prometheus(labels))
+		os.replace(path + ".tmp", path)
+		pass
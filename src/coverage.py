@@ -0,0 +1,277 @@
+import json
+import struct
+from cpu import cpu
+from disassembler import BRANCHES, disassemble, instructions
+
+class coverage:
+	"""
+	Code coverage collector
+	=======================
+	Runs a cpu while marking executed addresses, the taken and not taken sides
+	of every branch and the opcodes used. Opcodes map to the (instruction,
+	addressing mode) pairs of `_instructions` and the `xxxFunction` lists.
+	Collections from many runs and processes can be merged through files.
+
+	Attributes
+	----------
+	executed : bytearray
+		1 on every address an instruction was executed from.
+
+	taken : bytearray
+		1 on every branch address where the branch was taken.
+
+	notTaken : bytearray
+		1 on every branch address where the branch was not taken.
+
+	opcodes : bytearray
+		1 on every opcode that was executed.
+
+	Methods
+	-------
+	step()
+		Execute and record one instruction.
+
+	execute()
+		Execute and record until the cpu halts, on the run loop.
+
+	merge(other)
+		Add the coverage of another collector.
+
+	save(path)
+		Store coverage to a file.
+
+	load(path)
+		Merge a stored coverage file into this collector.
+
+	report(symbols)
+		Summary as a dict ready for JSON.
+
+	saveJSON(path, symbols)
+		Write the report as JSON.
+
+	annotate(data, start, end, symbols)
+		Disassembly of a range, marked with the coverage.
+	"""
+
+	_MAGIC = b"EMUC"
+	_VERSION = 1
+	_CLS = cpu
+
+	def __init__(self, cpu=None, size=0x10000, cls=None):
+		"""
+		Parameters
+		----------
+		cpu : cpu, optional
+			The cpu to run, not needed for merging and reporting.
+
+		size : int, optional
+			Size of the address space (default is 0x10000).
+
+		cls : type, optional
+			Cpu class the opcodes are decoded with in reports (default is the class of `cpu`, the 6502 without one).
+		"""
+		self._cpu = cpu
+		self._cls = cls if cls is not None else type(cpu) if cpu is not None else self._CLS
+		self.executed = bytearray(size)
+		self.taken = bytearray(size)
+		self.notTaken = bytearray(size)
+		self.opcodes = bytearray(0x100)
+		pass
+
+	def step(self):
+		"""
+		Execute and record one instruction.
+
+		Returns
+		-------
+		bool
+			False if the current instruction is not implemented, otherwise True.
+		"""
+		CPU = self._cpu
+		address = CPU._PC
+		opCode = CPU._memory.Data[address]
+		if opCode == CPU._TRAP_OPCODE and address in CPU._traps:
+			opCode = CPU._traps[address][2]
+		branches = CPU._branchesTaken
+		if not CPU.step():
+			return False
+		self.executed[address] = 1
+		self.opcodes[opCode] = 1
+		if opCode in BRANCHES:
+			# The counter tells the sides apart, a taken branch with offset 0 also ends on address + 2
+			if CPU._branchesTaken == branches:
+				self.notTaken[address] = 1
+			else:
+				self.taken[address] = 1
+		return True
+
+	def execute(self):
+		"""
+		Execute and record until the cpu halts. Runs on `cpu.run`, whose run loop marks the coverage.
+		"""
+		self._cpu.run(cover=self)
+		pass
+
+	def merge(self, other):
+		"""
+		Add the coverage of another collector.
+
+		Parameters
+		----------
+		other : coverage
+			Collector to merge.
+		"""
+		for name in ("executed", "taken", "notTaken", "opcodes"):
+			mine = getattr(self, name)
+			theirs = getattr(other, name)
+			merged = int.from_bytes(mine, "little") | int.from_bytes(theirs, "little")
+			mine[:] = merged.to_bytes(len(mine), "little")
+		pass
+
+	def save(self, path):
+		"""
+		Store coverage to a file.
+
+		Parameters
+		----------
+		path : str
+			Path of the coverage file.
+		"""
+		with open(path, "wb") as file:
+			file.write(self._MAGIC + struct.pack("<BI", self._VERSION, len(self.executed)))
+			for bitmap in (self.executed, self.taken, self.notTaken, self.opcodes):
+				file.write(bitmap)
+		pass
+
+	def load(self, path):
+		"""
+		Merge a stored coverage file into this collector.
+
+		Parameters
+		----------
+		path : str
+			Path of the coverage file.
+		"""
+		with open(path, "rb") as file:
+			data = file.read()
+		if data[:4] != self._MAGIC:
+			raise ValueError("{} is not a coverage file".format(path))
+		version, size = struct.unpack_from("<BI", data, 4)
+		if version != self._VERSION or size != len(self.executed):
+			raise ValueError("Coverage file {} does not match this collector".format(path))
+		other = coverage(size=size)
+		offset = 9
+		for bitmap in (other.executed, other.taken, other.notTaken):
+			bitmap[:] = data[offset:offset+size]
+			offset += size
+		other.opcodes[:] = data[offset:offset+0x100]
+		self.merge(other)
+		pass
+
+	def report(self, symbols=None):
+		"""
+		Summary as a dict ready for JSON.
+
+		Parameters
+		----------
+		symbols : symbols, optional
+			Symbol table, adds the "symbol" of every branch (default is addresses only).
+
+		Returns
+		-------
+		dict
+			Executed address ranges, branch sides and (instruction, addressing mode) pairs.
+		"""
+		ranges = list()
+		start = None
+		for address, flag in enumerate(self.executed):
+			if flag and start is None:
+				start = address
+			elif not flag and start is not None:
+				ranges.append([start, address-1])
+				start = None
+		if start is not None:
+			ranges.append([start, len(self.executed)-1])
+
+		branches = dict()
+		for address in range(len(self.executed)):
+			if self.taken[address] or self.notTaken[address]:
+				branches["{:04X}".format(address)] = {
+					"taken": bool(self.taken[address]),
+					"notTaken": bool(self.notTaken[address])
+				}
+				if symbols is not None:
+					branches["{:04X}".format(address)]["symbol"] = symbols.name(address)
+
+		pairs = dict()
+		for opCode, (mnemonic, mode) in instructions(cls=self._cls).items():
+			pairs["{} {}".format(mnemonic, mode)] = bool(self.opcodes[opCode])
+
+		return {
+			"addresses": sum(self.executed),
+			"ranges": ranges,
+			"branches": branches,
+			"branchSides": sum(self.taken) + sum(self.notTaken),
+			"pairs": pairs,
+			"pairsCovered": sum(pairs.values()),
+			"pairsTotal": len(pairs)
+		}
+
+	def saveJSON(self, path, symbols=None):
+		"""
+		Write the report as JSON.
+
+		Parameters
+		----------
+		path : str
+			Path of the JSON file.
+
+		symbols : symbols, optional
+			Symbol table, see `report` (default is addresses only).
+		"""
+		with open(path, "w") as file:
+			json.dump(self.report(symbols), file, indent="\t")
+		pass
+
+	def annotate(self, data, start: int, end: int, symbols=None):
+		"""
+		Disassembly of a range, marked with the coverage.
+		Executed instructions are marked with `*`, branches with the sides taken.
+
+		Parameters
+		----------
+		data : bytes
+			Memory the code is in.
+
+		start : int
+			First address to disassemble.
+
+		end : int
+			Last address to disassemble.
+
+		symbols : symbols, optional
+			Symbol table, labels the lines at symbols and names address operands (default is addresses only).
+
+		Returns
+		-------
+		str
+			One line per instruction.
+		"""
+		lines = list()
+		labels = symbols.labels() if symbols is not None else None
+		address = start
+		while address <= end:
+			text, size = disassemble(data, address, self._cls, symbols=symbols)
+			if symbols is not None and address in labels:
+				lines.append("{}:".format(labels[address]))
+			mark = "*" if self.executed[address] else " "
+			sides = ""
+			if data[address] in BRANCHES and self.executed[address]:
+				sides = "  ; " + {
+					(1, 1): "taken, not taken",
+					(1, 0): "taken only",
+					(0, 1): "not taken only"
+				}.get((self.taken[address], self.notTaken[address]), "")
+			lines.append("{} {:04X}  {}{}".format(mark, address, text, sides))
+			address += size
+		return "\n".join(lines)
@@ -1,4 +1,6 @@
 from memory import memory
+from counters import counters
+from generator import generateCore, generateHandlers
 
 class cpu:
 	"""
@@ -47,6 +49,12 @@ class cpu:
 	_PS_n : bool
 		Negative Flag, set if the result of the last opration had bit 7 set to a one.
 
+	_cycles : int
+		Clock cycles elapsed since the cpu was created.
+
+	counters : counters
+		Performance counters of the guest, sampled with `counters.sample()`.
+
 	Methods
 	-------
 	readByte(address)
@@ -67,9 +75,45 @@ class cpu:
 	writeStatus(status)
 		Write processor status to each flags.
 
+	readState()
+		Read every register, flag and the cycle count.
+
+	writeState(state)
+		Write every register, flag and the cycle count.
+
 	execute()
 		Start code execution. Execution stops when the current instruction is not implemented.
 
+	step()
+		Execute one instruction.
+
+	run(cycles)
+		Start code execution on the register-in-locals core.
+
+	irq()
+		Assert an interrupt request. Ignored when the interrupt disable flag is set.
+
+	nmi()
+		Assert a non-maskable interrupt.
+
+	registerTrap(address, function, cycles)
+		Run a native python function instead of the guest routine at the address.
+
+	removeTrap(address)
+		Remove a trap and restore the original opcode.
+
+	attachDevice(device, start, end)
+		Map the reads and writes of an address range to a device.
+
+	detachDevice(device)
+		Unmap a device and restore plain memory access.
+
+	addHook(owner, name, wrap)
+		Wrap a method of this cpu for a tool.
+
+	removeHook(owner, names)
+		Remove the hooks of a tool.
+
 	_readIndirectX()
 		Indexed indirect addressing mode. It adds the X registor with the second byte of the instruction, returns it as an address.
 
@@ -101,7 +145,7 @@ class cpu:
 		Relitive addressing mode. Returns the second byte in the instruction as an offset to the program counter.
 	"""
 
-	_memory = memory()
+	_memory = None	# Set per instance
 
 	_PC = int()
 	_SP = int()
@@ -118,16 +162,69 @@ class cpu:
 	_PS_z = bool()	# Zero Flag
 	_PS_c = bool()	# Carry Flag
 
+	_cycles = int()	# Elapsed clock cycles
+
+	_retired = int()			# Instructions executed
+	_branchesTaken = int()		# Branches taken
+	_branchesNotTaken = int()	# Branches not taken
+	_pageCrosses = int()		# Indexed addresses and taken branches crossing a page
+	_interrupts = int()			# IRQ and NMI serviced
+	_stackLow = int()			# Lowest stack pointer
+	_stackTop = int()			# Stack pointer the stack depth is measured from
+	_stackDepth = int()			# Deepest stack before the stack pointer was last written
+
+	_TRAP_OPCODE = 0x02	# Unimplemented opcode used to mark trapped addresses
+
+	_STATE = ("_PC", "_SP", "_Acc", "_Reg_X", "_Reg_Y", "_PS_n", "_PS_v", "_PS_b", "_PS_d", "_PS_i", "_PS_z", "_PS_c", "_cycles")
+
+	_VARIANT = "6502"	# Name of the processor variant
+
 	debug = False
 
-	def __init__(self, debug=False):
+	def __new__(cls, debug=False, variant=None, ram=None):
+		if variant is not None:
+			# Variants subclass cpu, so they are imported on first use
+			from variants import VARIANTS
+			if variant not in VARIANTS:
+				raise ValueError("Unknown cpu variant {!r}, expected one of {}".format(variant, ", ".join(VARIANTS)))
+			cls = VARIANTS[variant]
+		if "_runCore" not in cls.__dict__:
+			# Variants generate their handlers and run loop on first use, so importing them stays quick
+			cls._generate()
+		if ram is not None and hasattr(ram, "Read"):
+			# Memory with a page table, run on the memory methods that go through it
+			from paging import pagedClass
+			cls = pagedClass(cls)
+		return super().__new__(cls)
+
+	@classmethod
+	def _generate(cls):
+		"""
+		Generate the handlers, the flat cycle table and the run loop of the class from its tables.
+		"""
+		cls._handlers = generateHandlers(cls)
+		cls._handlerCycles = [cycles for row in cls._instructionCycles for cycles in row]
+		cls._runCore = generateCore(cls)
+		pass
+
+	def __init__(self, debug=False, variant=None, ram=None):
 		"""
 		Parameters
 		----------
 		debug : bool, optional
 			Debug flag, prints current instruction when set True (default is False).
+
+		variant : str, optional
+			Processor variant, "6502" for the documented NMOS opcodes, "nmos" to add
+			the stable undocumented opcodes or "65c02" (default is the class it is called on).
+
+		ram : memory, optional
+			Memory to run on, pass the same memory to several cpus to share it. A
+			memory with a page table such as `bankedmemory` makes the cpu read and
+			write through it (default is a new memory).
 		"""
 		self.debug = debug
+		self._memory = memory() if ram is None else ram
 		self._PC = self._memory.Data[0xfffc] + self._memory.Data[0xfffd]*0x0100
 		self._SP = 0x0100
 
@@ -142,6 +239,13 @@ class cpu:
 		self._PS_b = 0
 		self._PS_v = 0
 		self._PS_n = 0
+
+		self._cycles = 0
+		self._traps = dict()
+		self._ports = dict()
+		self._portPages = [None] * 0x100	# True on the pages with a device
+		self._hooks = dict()				# Method name to the (owner, wrap) hooks on it
+		self.counters = counters(self)
 		pass
 
 	def readByte(self, address: int):
@@ -188,13 +292,13 @@ class cpu:
 			processor status register.
 		"""
 		return (
-			self._PS_n << 7+ # Negative
-			self._PS_v << 6+ # Overflow
-			0          << 5+ # Break (No effect)
-			0          << 4+ # None  (No effect)
-			self._PS_d << 3+ # Decimal
-			self._PS_i << 2+ # Interrupt
-			self._PS_z << 1+ # Zero
+			self._PS_n << 7| # Negative
+			self._PS_v << 6| # Overflow
+			0          << 5| # Break (No effect)
+			0          << 4| # None  (No effect)
+			self._PS_d << 3| # Decimal
+			self._PS_i << 2| # Interrupt
+			self._PS_z << 1| # Zero
 			self._PS_c       # Carry
 		)	
 
@@ -211,6 +315,7 @@ class cpu:
 			1 byte value to write to the address.
 		"""
 		self._memory.Data[address] = value & 0b11111111
+		self._memory.Dirty[address >> 8] = 1
 		pass
 
 	def writeWord(self, address: int, value: int):
@@ -227,6 +332,8 @@ class cpu:
 		"""
 		self._memory.Data[address] = value & 0b11111111
 		self._memory.Data[address+1] = (value >> 8) & 0b11111111
+		self._memory.Dirty[address >> 8] = 1
+		self._memory.Dirty[(address+1) >> 8] = 1
 		pass
 
 	def writeStatus(self, status: int):
@@ -250,6 +357,39 @@ class cpu:
 		self._PS_z = (status & 0b00000010) >> 1 # Zero
 		self._PS_c = (status & 0b00000001)      # Carry	
 
+	def readState(self):
+		"""
+		Read every register, flag and the cycle count.
+
+		Returns
+		-------
+		tuple
+			Values in the order of `_STATE`.
+		"""
+		return tuple(getattr(self, name) for name in self._STATE)
+
+	def writeState(self, state: tuple):
+		"""
+		Write every register, flag and the cycle count.
+
+		Parameters
+		----------
+		state : tuple
+			Values in the order of `_STATE`, as returned by `readState`.
+		"""
+		for name, value in zip(self._STATE, state):
+			setattr(self, name, value)
+		self._moveStack()
+		pass
+
+	def _moveStack(self):
+		"""
+		Measure the stack depth from the stack pointer that was just written, keeping the deepest stack so far.
+		"""
+		self._stackDepth = max(self._stackDepth, self._stackTop - self._stackLow)
+		self._stackTop = self._stackLow = self._SP
+		pass
+
 	def _pcIncrement(self, clock=1):
 		"""
 		Increment program clock.
@@ -266,14 +406,324 @@ class cpu:
 		"""
 		Start code execution. Execution stops when the current instruction is not implemented.
 		"""
+		handlers = self._handlers
+		cycles = self._handlerCycles
 		while True:
 			opCode = self.readByte(self._PC)
-			instruction = self._instructions[int(opCode/0x10)][opCode%0x10]
+			instruction = handlers[opCode]
 			if instruction is not None:
+				self._cycles += cycles[opCode]
+				self._retired += 1
 				instruction(self, opCode)
+			elif opCode == self._TRAP_OPCODE and self._PC in self._traps:
+				self._trap()
 			else:
 				break
 
+	def run(self, cycles=None, cover=None, breaks=None):
+		"""
+		Start code execution on the register-in-locals core. It behaves like
+		`execute()`, but keeps the registers, flags and memory in local
+		variables and only writes them back when it stops or reaches a trap.
+
+		When read or write methods are hooked (for example by the memoiser or
+		the rewind debugger, see `addHook`), it runs on `step()` instead so
+		they are still called.
+
+		Parameters
+		----------
+		cycles : int, optional
+			Stop once this many clock cycles have elapsed (default is no limit).
+
+		cover : coverage, optional
+			Collector to mark coverage in. The run loop marks it from a core
+			generated for that on first use, trapped addresses are marked with
+			their original opcode (default is no coverage).
+
+		breaks : set, optional
+			Addresses to stop on before executing the instruction there, checked
+			by a core generated for that on first use. Guest memory is not
+			changed. A trap on one of them runs only when the address is left
+			out (default is no breakpoints).
+		"""
+		stop = (1 << 62) if cycles is None else self._cycles + cycles
+		hooked = any(name in self.__dict__ for name in ("readByte", "readWord", "writeByte", "writeWord"))
+		core = self._core(cover=cover is not None, breaks=breaks is not None)
+		marks = () if cover is None else (cover.executed, cover.opcodes, cover.taken, cover.notTaken)
+		if breaks is not None:
+			marks += (breaks,)
+		while self._cycles < stop:
+			if breaks is not None and self._PC in breaks:
+				break
+			if hooked:
+				if not (self.step() if cover is None else cover.step()):
+					break
+				continue
+			core(stop, *marks)
+			if self._cycles >= stop or breaks is not None and self._PC in breaks:
+				break
+			if self._memory.Data[self._PC] == self._TRAP_OPCODE and self._PC in self._traps:
+				if cover is not None:
+					cover.executed[self._PC] = 1
+					cover.opcodes[self._traps[self._PC][2]] = 1
+				self._trap()
+			else:
+				break
+		pass
+
+	def _core(self, **options):
+		"""
+		Run loop of the class generated with the options of `generator.generateCore` that are set, made on first use.
+		"""
+		cls = type(self)
+		name = "_{}Core".format("".join(sorted(option for option, value in options.items() if value)) or "run")
+		if name not in cls.__dict__:
+			setattr(cls, name, generateCore(cls, **options))
+		return getattr(self, name)
+
+	def step(self):
+		"""
+		Execute one instruction.
+
+		Returns
+		-------
+		bool
+			False if the current instruction is not implemented, otherwise True.
+		"""
+		opCode = self.readByte(self._PC)
+		instruction = self._handlers[opCode]
+		if instruction is not None:
+			self._cycles += self._handlerCycles[opCode]
+			self._retired += 1
+			instruction(self, opCode)
+		elif opCode == self._TRAP_OPCODE and self._PC in self._traps:
+			self._trap()
+		else:
+			return False
+		return True
+
+	def irq(self):
+		"""
+		Assert an interrupt request. Ignored when the interrupt disable flag is set.
+
+		Returns
+		-------
+		bool
+			True if the interrupt was taken.
+		"""
+		if self._PS_i:
+			return False
+		self._interrupt(0xFFFE)
+		return True
+
+	def nmi(self):
+		"""
+		Assert a non-maskable interrupt.
+		"""
+		self._interrupt(0xFFFA)
+		pass
+
+	def _interrupt(self, vector: int):
+		"""
+		Push the program counter and processor status, then jump to the interrupt vector.
+
+		Parameters
+		----------
+		vector : int
+			Address of the interrupt vector.
+		"""
+		self.writeWord(self._SP-1, self._PC)
+		self._SP -= 2
+		self.writeByte(self._SP, self.readStatus())
+		self._SP -= 1
+		if self._SP < self._stackLow:
+			self._stackLow = self._SP
+		self._PS_i = True
+		self._PC = self.readWord(vector)
+		self._cycles += 7
+		self._interrupts += 1
+		pass
+
+	def registerTrap(self, address: int, function, cycles=0):
+		"""
+		Run a native python function instead of the guest routine at the address.
+
+		The opcode on the address is replaced with an unimplemented opcode, so
+		the trap costs nothing when executing other addresses. When the program
+		counter reaches the address, the function is called with the cpu as the
+		only argument. It should update registers, flags and memory as the guest
+		routine would. The cpu then performs an RTS, unless the function moved
+		the program counter off the address, e.g. to leave the cpu inside the
+		guest routine, in which case execution continues from there.
+
+		Parameters
+		----------
+		address : int
+			Entry point of the guest routine.
+
+		function : callable
+			Native implementation of the routine. It may return the clock cycles
+			it took, otherwise `cycles` is used.
+
+		cycles : int, optional
+			Clock cycles of the guest routine including the final RTS (default is 0).
+		"""
+		if address in self._traps:
+			self.removeTrap(address)
+		self._traps[address] = (function, cycles, self._memory.Data[address])
+		self._memory.Data[address] = self._TRAP_OPCODE
+		pass
+
+	def removeTrap(self, address: int):
+		"""
+		Remove a trap and restore the original opcode.
+
+		Parameters
+		----------
+		address : int
+			Entry point the trap was registered on.
+		"""
+		function, cycles, opCode = self._traps.pop(address)
+		if self._memory.Data[address] == self._TRAP_OPCODE:
+			self._memory.Data[address] = opCode
+		pass
+
+	def attachDevice(self, device, start: int, end: int):
+		"""
+		Map the reads and writes of the addresses from start up to end to a device.
+
+		The device is called as `device.read(address)` and
+		`device.write(address, value)`, with `_cycles` up to date. The cpu
+		becomes a subclass from `bus.busClass` that checks a table of device
+		pages, so `run()` serves devices too and only accesses to the pages of
+		a device pay for the lookup. Devices must not change the registers of
+		the cpu from `read` or `write`.
+
+		Parameters
+		----------
+		device : object
+			Device with `read` and `write` methods.
+
+		start : int
+			First address of the device.
+
+		end : int
+			Address after the last address of the device.
+		"""
+		for address in range(start, end):
+			self._ports[address] = device
+			self._portPages[address >> 8] = True
+		if not hasattr(type(self), "_base"):
+			from bus import busClass
+			self.__class__ = busClass(type(self))
+			self._rehook()
+		pass
+
+	def detachDevice(self, device):
+		"""
+		Unmap a device and restore plain memory access on its addresses.
+
+		Parameters
+		----------
+		device : object
+			Device passed to `attachDevice`.
+		"""
+		for address in [a for a, d in self._ports.items() if d is device]:
+			del self._ports[address]
+		self._portPages[:] = [None] * 0x100
+		for address in self._ports:
+			self._portPages[address >> 8] = True
+		if not self._ports and hasattr(type(self), "_base"):
+			self.__class__ = type(self)._base
+			self._rehook()
+		pass
+
+	def addHook(self, owner, name: str, wrap):
+		"""
+		Wrap a method of this cpu, e.g. `writeByte`, for a tool.
+
+		Hooks of several tools stack, the last one added is called first. They
+		are removed by owner, in any order, and the others stay in place. While
+		a memory method is hooked, `run()` uses `step()`.
+
+		Parameters
+		----------
+		owner : object
+			The tool the hook belongs to, passed to `removeHook`.
+
+		name : str
+			Name of the method.
+
+		wrap : callable
+			Called with the method it wraps, returns the function to call instead.
+		"""
+		self._hooks.setdefault(name, list()).append((owner, wrap))
+		self._chain(name)
+		pass
+
+	def removeHook(self, owner, names=None):
+		"""
+		Remove the hooks of a tool. Hooks added after them stay installed.
+
+		Parameters
+		----------
+		owner : object
+			The tool passed to `addHook`.
+
+		names : iterable, optional
+			Names of the methods (default is every method).
+
+		Returns
+		-------
+		int
+			Number of hooks removed, 0 when the tool has none.
+		"""
+		removed = 0
+		for name in list(self._hooks) if names is None else names:
+			hooks = self._hooks.get(name, ())
+			kept = [hook for hook in hooks if hook[0] is not owner]
+			if len(kept) != len(hooks):
+				removed += len(hooks) - len(kept)
+				self._hooks[name] = kept
+				self._chain(name)
+		return removed
+
+	def _chain(self, name: str):
+		"""
+		Install the hooks of a method on the instance, or drop them when there are none left.
+		"""
+		self.__dict__.pop(name, None)
+		hooks = self._hooks.get(name)
+		if not hooks:
+			self._hooks.pop(name, None)
+			return
+		function = getattr(self, name)
+		for owner, wrap in hooks:
+			function = wrap(function)
+		setattr(self, name, function)
+		pass
+
+	def _rehook(self):
+		"""
+		Rebuild every hooked method on the methods of the class, after the class changed.
+		"""
+		for name in list(self._hooks):
+			self._chain(name)
+		pass
+
+	def _trap(self):
+		"""
+		Call the trap registered on the program counter, then return from the
+		routine unless the trap moved the program counter.
+		"""
+		address = self._PC
+		function, cycles, opCode = self._traps[address]
+		used = function(self)
+		self._cycles += cycles if used is None else used
+		if self._PC == address:
+			self._Rts(0x60)
+		pass
+
 	def _Adc(self, opCode):
 		"""
 		MOS6502 instruction ADC
@@ -291,7 +741,7 @@ class cpu:
 		if (opCode&0b11100)>>2 == 2:
 			self._Acc += self.adcFunction[2](self)
 		else:
-			dataAddress = self.adcFunction[(opCode&0b11100)>>2](self)
+			dataAddress = self.adcFunction[(opCode&0b11100)>>2 | (opCode&0b10)<<2](self)
 			self._Acc += self.readByte(dataAddress)
 		if self._Acc > 0xFF:
 			self._PS_c = True
@@ -316,7 +766,7 @@ class cpu:
 		if (opCode&0b11100)>>2 == 2:
 			self._Acc &= self.adcFunction[2](self)
 		else:
-			dataAddress = self.adcFunction[(opCode&0b11100)>>2](self)
+			dataAddress = self.adcFunction[(opCode&0b11100)>>2 | (opCode&0b10)<<2](self)
 			self._Acc &= self.readByte(dataAddress)
 		self._PS_z = bool(self._Acc == 0)
 		self._PS_n = bool((self._Acc & 0b10000000)>0)
@@ -364,7 +814,12 @@ class cpu:
 		self._pcIncrement()
 		if not self._PS_c:
 			offset = self._readRelative()
+			if (self._PC + 1 ^ self._PC + 1 + offset) & 0xFF00:
+				self._pageCrosses += 1
 			self._PC += offset
+			self._branchesTaken += 1
+		else:
+			self._branchesNotTaken += 1
 		self._pcIncrement()
 		pass
 
@@ -382,7 +837,12 @@ class cpu:
 		self._pcIncrement()
 		if self._PS_c:
 			offset = self._readRelative()
+			if (self._PC + 1 ^ self._PC + 1 + offset) & 0xFF00:
+				self._pageCrosses += 1
 			self._PC += offset
+			self._branchesTaken += 1
+		else:
+			self._branchesNotTaken += 1
 		self._pcIncrement()
 		pass
 
@@ -400,7 +860,12 @@ class cpu:
 		self._pcIncrement()
 		if self._PS_z:
 			offset = self._readRelative()
+			if (self._PC + 1 ^ self._PC + 1 + offset) & 0xFF00:
+				self._pageCrosses += 1
 			self._PC += offset
+			self._branchesTaken += 1
+		else:
+			self._branchesNotTaken += 1
 		self._pcIncrement()
 		pass
 
@@ -439,7 +904,12 @@ class cpu:
 		self._pcIncrement()
 		if self._PS_n:
 			offset = self._readRelative()
+			if (self._PC + 1 ^ self._PC + 1 + offset) & 0xFF00:
+				self._pageCrosses += 1
 			self._PC += offset
+			self._branchesTaken += 1
+		else:
+			self._branchesNotTaken += 1
 		self._pcIncrement()
 		pass
 
@@ -457,7 +927,12 @@ class cpu:
 		self._pcIncrement()
 		if not self._PS_z:
 			offset = self._readRelative()
+			if (self._PC + 1 ^ self._PC + 1 + offset) & 0xFF00:
+				self._pageCrosses += 1
 			self._PC += offset
+			self._branchesTaken += 1
+		else:
+			self._branchesNotTaken += 1
 		self._pcIncrement()
 		pass
 
@@ -475,7 +950,12 @@ class cpu:
 		self._pcIncrement()
 		if not self._PS_n:
 			offset = self._readRelative()
+			if (self._PC + 1 ^ self._PC + 1 + offset) & 0xFF00:
+				self._pageCrosses += 1
 			self._PC += offset
+			self._branchesTaken += 1
+		else:
+			self._branchesNotTaken += 1
 		self._pcIncrement()
 		pass
 
@@ -513,7 +993,12 @@ class cpu:
 		self._pcIncrement()
 		if not self._PS_v:
 			offset = self._readRelative()
+			if (self._PC + 1 ^ self._PC + 1 + offset) & 0xFF00:
+				self._pageCrosses += 1
 			self._PC += offset
+			self._branchesTaken += 1
+		else:
+			self._branchesNotTaken += 1
 		self._pcIncrement()
 		pass
 
@@ -531,7 +1016,12 @@ class cpu:
 		self._pcIncrement()
 		if self._PS_v:
 			offset = self._readRelative()
+			if (self._PC + 1 ^ self._PC + 1 + offset) & 0xFF00:
+				self._pageCrosses += 1
 			self._PC += offset
+			self._branchesTaken += 1
+		else:
+			self._branchesNotTaken += 1
 		self._pcIncrement()
 		pass
 
@@ -610,7 +1100,7 @@ class cpu:
 		if (opCode&0b11100)>>2 == 2:
 			data = self.cmpFunction[2](self)
 		else:
-			dataAddress = self.cmpFunction[(opCode&0b11100)>>2](self)
+			dataAddress = self.cmpFunction[(opCode&0b11100)>>2 | (opCode&0b10)<<2](self)
 			data = self.readByte(dataAddress)
 		self._PS_c = bool(self._Acc >= data)
 		self._PS_z = bool(self._Acc == data)
@@ -735,7 +1225,7 @@ class cpu:
 		if (opCode&0b11100)>>2 == 2:
 			self._Acc ^= self.eorFunction[2](self)
 		else:
-			dataAddress = self.eorFunction[(opCode&0b11100)>>2](self)
+			dataAddress = self.eorFunction[(opCode&0b11100)>>2 | (opCode&0b10)<<2](self)
 			self._Acc ^= self.readByte(dataAddress)
 		self._PS_z = bool(self._Acc == 0)
 		self._PS_n = bool((self._Acc & 0b10000000)>0)
@@ -815,7 +1305,8 @@ class cpu:
 			self._PC = dataAddress
 		elif opCode == 0x6C: # Indirect
 			dataAddress = self._readAbsolute()
-			self._PC = self.readWord(dataAddress)
+			# The vector does not cross pages, on $xxFF the high byte is read from $xx00
+			self._PC = self.readByte(dataAddress) + self.readByte((dataAddress & 0xFF00) | ((dataAddress+1) & 0xFF))*0x0100
 		self._pcIncrement()
 		pass
 
@@ -833,7 +1324,10 @@ class cpu:
 		self._pcIncrement()
 		address = self._readAbsolute()
 		self._pcIncrement()
-		self.writeWord(self._SP, self._PC-1)
+		self.writeWord(self._SP-1, self._PC-1)
+		self._SP -= 2
+		if self._SP < self._stackLow:
+			self._stackLow = self._SP
 		self._PC = address
 		pass
 
@@ -852,7 +1346,7 @@ class cpu:
 		if (opCode&0b11100)>>2 == 2:
 			self._Acc = self.ldaFunction[2](self)
 		else:
-			dataAddress = self.ldaFunction[(opCode&0b11100)>>2](self)
+			dataAddress = self.ldaFunction[(opCode&0b11100)>>2 | (opCode&0b10)<<2](self)
 			self._Acc = self.readByte(dataAddress)
 		self._PS_z = bool(self._Acc == 0)
 		self._PS_n = bool((self._Acc & 0b10000000)>0)
@@ -954,7 +1448,7 @@ class cpu:
 		if (opCode&0b11100)>>2 == 2:
 			self._Acc |= self.oraFunction[2](self)
 		else:
-			dataAddress = self.oraFunction[(opCode&0b11100)>>2](self)
+			dataAddress = self.oraFunction[(opCode&0b11100)>>2 | (opCode&0b10)<<2](self)
 			self._Acc |= self.readByte(dataAddress)
 		self._PS_z = bool(self._Acc == 0)
 		self._PS_n = bool((self._Acc & 0b10000000)>0)
@@ -975,6 +1469,8 @@ class cpu:
 		self._pcIncrement()
 		self.writeByte(self._SP, self._Acc)
 		self._SP -= 1
+		if self._SP < self._stackLow:
+			self._stackLow = self._SP
 		pass
 
 	def _Php(self, opCode):
@@ -991,6 +1487,8 @@ class cpu:
 		self._pcIncrement()
 		self.writeByte(self._SP, self.readStatus())
 		self._SP -= 1
+		if self._SP < self._stackLow:
+			self._stackLow = self._SP
 		pass
 
 	def _Pla(self, opCode):
@@ -1097,10 +1595,10 @@ class cpu:
 		opCode : int
 			Opcode that is currently executing. Used for determine addressing mode.
 		"""
-		flags = self.readByte()
-		self.writeStatus(flags)
 		self._SP += 1
-		address = self.readWord(self._SP)
+		flags = self.readByte(self._SP)
+		self.writeStatus(flags)
+		address = self.readWord(self._SP+1)
 		self._PC = address
 		self._SP += 2
 		pass
@@ -1116,8 +1614,8 @@ class cpu:
 		opCode : int
 			Opcode that is currently executing. Used for determine addressing mode.
 		"""
-		address = self.readWord(self._SP)
-		self._PC = address
+		address = self.readWord(self._SP+1)
+		self._PC = address + 1
 		self._SP += 2
 		pass
 
@@ -1137,7 +1635,7 @@ class cpu:
 		if (opCode&0b11100)>>2 == 2:
 			self._Acc = self._Acc - self.sbcFunction[2](self) - (not self._PS_c)
 		else:
-			dataAddress = self.sbcFunction[(opCode&0b11100)>>2](self)
+			dataAddress = self.sbcFunction[(opCode&0b11100)>>2 | (opCode&0b10)<<2](self)
 			self._Acc = self._Acc - self.readByte(dataAddress) - (not self._PS_c)
 		self._PS_v = bool(self._Acc > 0xFFFF or self._Acc < - 0xFFFF)
 		if self._PS_v:
@@ -1204,7 +1702,7 @@ class cpu:
 			Opcode that is currently executing. Used for determine addressing mode.
 		"""
 		self._pcIncrement()
-		dataAddress = self.staFunction[(opCode&0b11100)>>2](self)
+		dataAddress = self.staFunction[(opCode&0b11100)>>2 | (opCode&0b10)<<2](self)
 		self.writeByte(dataAddress, self._Acc)
 		self._pcIncrement()
 		pass
@@ -1315,6 +1813,7 @@ class cpu:
 			Opcode that is currently executing. Used for determine addressing mode.
 		"""
 		self._SP = self._Reg_X
+		self._moveStack()
 		self._pcIncrement()
 		pass
 
@@ -1403,6 +1902,8 @@ class cpu:
 		address      = self.readByte(self._PC)
 		dataAddress  = self.readWord(address)
 		dataAddressY = (dataAddress + self._Reg_Y)
+		if (dataAddress ^ dataAddressY) & 0xFF00:
+			self._pageCrosses += 1
 		return dataAddressY
 
 	def _readZeroPageX(self):
@@ -1442,7 +1943,10 @@ class cpu:
 		int
 			Address in the memory.
 		"""
-		address = self.readWord(self._PC) + self._Reg_Y
+		base = self.readWord(self._PC)
+		address = base + self._Reg_Y
+		if (base ^ address) & 0xFF00:
+			self._pageCrosses += 1
 		self._pcIncrement()
 		return address
 
@@ -1457,7 +1961,10 @@ class cpu:
 		int
 			Address in the memory.
 		"""
-		address = self.readWord(self._PC) + self._Reg_X
+		base = self.readWord(self._PC)
+		address = base + self._Reg_X
+		if (base ^ address) & 0xFF00:
+			self._pageCrosses += 1
 		self._pcIncrement()
 		return address
 
@@ -1478,6 +1985,9 @@ class cpu:
 	Instruction Addressing Mode List
 	================================
 	Lists of addressing mode methods for different instructions to access.
+	Indexed by bits 2~4 of the opcode. Handlers that also take the 65C02
+	zero page indirect mode add 8 for opcodes ending in bits 10, variants list
+	those modes after the first 8 entries.
 	"""
 	adcFunction = [
 		_readIndirectX,
@@ -1735,4 +2245,40 @@ class cpu:
 		[_Bne, _Cmp, None, None, None, _Cmp, _Dec, None, _Cld, _Cmp, None, None, None, _Cmp, _Dec, None], #D
 		[_Cpx, _Sbc, None, None, _Cpx, _Sbc, _Inc, None, _Inx, _Sbc, _Nop, None, _Cpx, _Sbc, _Inc, None], #E
 		[_Beq, _Sbc, None, None, None, _Sbc, _Inc, None, _Sed, _Sbc, None, None, None, _Sbc, _Inc, None]  #F
-	]
\ No newline at end of file
+	]
+
+	"""
+	Instruction cycle table
+	=======================
+	Base clock cycles of each opcode, laid out the same as `_instructions`.
+	Extra cycles for crossing pages and taking branches are not included.
+	"""
+	_instructionCycles = [
+		#0, 1, 2, 3, 4, 5, 6, 7, 8, 9, A, B, C, D, E, F
+		[7, 6, 0, 0, 0, 3, 5, 0, 3, 2, 2, 0, 0, 4, 6, 0], #0
+		[2, 5, 0, 0, 0, 4, 6, 0, 2, 4, 0, 0, 0, 4, 7, 0], #1
+		[6, 6, 0, 0, 3, 3, 5, 0, 4, 2, 2, 0, 4, 4, 6, 0], #2
+		[2, 5, 0, 0, 0, 4, 6, 0, 2, 4, 0, 0, 0, 4, 7, 0], #3
+		[6, 6, 0, 0, 0, 3, 5, 0, 3, 2, 2, 0, 3, 4, 6, 0], #4
+		[2, 5, 0, 0, 0, 4, 6, 0, 2, 4, 0, 0, 0, 4, 7, 0], #5
+		[6, 6, 0, 0, 0, 3, 5, 0, 4, 2, 2, 0, 5, 4, 6, 0], #6
+		[2, 5, 0, 0, 0, 4, 6, 0, 2, 4, 0, 0, 0, 4, 7, 0], #7
+		[0, 6, 0, 0, 3, 3, 3, 0, 2, 0, 2, 0, 4, 4, 4, 0], #8
+		[2, 6, 0, 0, 4, 4, 4, 0, 2, 5, 2, 0, 0, 5, 0, 0], #9
+		[2, 6, 2, 0, 3, 3, 3, 0, 2, 2, 2, 0, 4, 4, 4, 0], #A
+		[2, 5, 0, 0, 4, 4, 4, 0, 2, 4, 2, 0, 4, 4, 4, 0], #B
+		[2, 6, 0, 0, 3, 3, 5, 0, 2, 2, 2, 0, 4, 4, 6, 0], #C
+		[2, 5, 0, 0, 0, 4, 6, 0, 2, 4, 0, 0, 0, 4, 7, 0], #D
+		[2, 6, 0, 0, 3, 3, 5, 0, 2, 2, 2, 0, 4, 4, 6, 0], #E
+		[2, 5, 0, 0, 0, 4, 6, 0, 2, 4, 0, 0, 0, 4, 7, 0]  #F
+	]
+
+"""
+Generated handlers
+==================
+One straight-line handler per opcode, generated from `_instructions` and the
+addressing mode lists, with the cycle table flattened the same way. These
+are what `execute()` and `step()` dispatch on. `run()` uses the same
+handlers inlined into a single loop.
+"""
+cpu._generate()
\ No newline at end of file
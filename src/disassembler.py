@@ -0,0 +1,164 @@
+"""
+Disassembler
+============
+Names the instruction and addressing mode of an opcode from the cpu's
+`_instructions` table and the `xxxFunction` addressing mode lists, and
+formats instructions in memory as assembly.
+"""
+
+from cpu import cpu
+
+_LENGTHS = {
+	"Implied": 1,
+	"Accumulator": 1,
+	"Immediate": 2,
+	"ZeroPage": 2,
+	"ZeroPageX": 2,
+	"ZeroPageY": 2,
+	"IndirectX": 2,
+	"IndirectY": 2,
+	"Relative": 2,
+	"Absolute": 3,
+	"AbsoluteX": 3,
+	"AbsoluteY": 3,
+	"Indirect": 3,
+	"ZeroPageIndirect": 2,
+	"AbsoluteIndirectX": 3
+}
+
+_FORMATS = {
+	"Implied": "",
+	"Accumulator": " A",
+	"Immediate": " #${:02X}",
+	"ZeroPage": " ${:02X}",
+	"ZeroPageX": " ${:02X},X",
+	"ZeroPageY": " ${:02X},Y",
+	"IndirectX": " (${:02X},X)",
+	"IndirectY": " (${:02X}),Y",
+	"Relative": " ${:04X}",
+	"Absolute": " ${:04X}",
+	"AbsoluteX": " ${:04X},X",
+	"AbsoluteY": " ${:04X},Y",
+	"Indirect": " (${:04X})",
+	"ZeroPageIndirect": " (${:02X})",
+	"AbsoluteIndirectX": " (${:04X},X)"
+}
+
+# Operands that are addresses, formatted with a symbol name instead of hex, and the hex digits of the mode without one
+_SYMBOL_FORMATS = {
+	mode: (text.replace("${:04X}", "{}").replace("${:02X}", "{}"), 4 if "${:04X}" in text else 2)
+	for mode, text in _FORMATS.items() if "$" in text and mode != "Immediate"
+}
+
+BRANCHES = frozenset([0x10, 0x30, 0x50, 0x70, 0x90, 0xB0, 0xD0, 0xF0])
+
+def instruction(opCode: int, table=None, cls=cpu):
+	"""
+	Name the instruction and addressing mode of an opcode.
+
+	Parameters
+	----------
+	opCode : int
+		Opcode to look up.
+
+	table : list, optional
+		Instruction table to look the opcode up in (default is `cls._instructions`).
+
+	cls : type, optional
+		Cpu class or variant the addressing mode lists are read from (default is `cpu`).
+
+	Returns
+	-------
+	tuple
+		Mnemonic and addressing mode name, e.g. ("LDA", "ZeroPage"). None if the opcode is not implemented.
+	"""
+	if table is None:
+		table = cls._instructions
+	handler = table[opCode >> 4][opCode & 0x0F]
+	if handler is None:
+		return None
+	mnemonic = handler.__name__[1:].upper()
+	modes = getattr(cls, mnemonic.lower()+"Function", None)
+	if opCode in BRANCHES or mnemonic == "BRA":
+		return (mnemonic, "Relative")
+	if mnemonic == "JMP":
+		return (mnemonic, {0x6C: "Indirect", 0x7C: "AbsoluteIndirectX"}.get(opCode, "Absolute"))
+	if mnemonic == "JSR":
+		return (mnemonic, "Absolute")
+	if modes is None or (mnemonic == "NOP" and opCode & 0x0F == 0x0A):
+		return (mnemonic, "Implied")
+	index = (opCode & 0b11100) >> 2
+	if len(modes) > 8:
+		index |= (opCode & 0b10) << 2
+	mode = modes[index]
+	if mode is None:
+		return (mnemonic, "Accumulator")
+	return (mnemonic, mode.__name__[5:])
+
+def instructions(table=None, cls=cpu):
+	"""
+	Every implemented opcode with its instruction and addressing mode.
+
+	Parameters
+	----------
+	table : list, optional
+		Instruction table (default is `cls._instructions`).
+
+	cls : type, optional
+		Cpu class or variant (default is `cpu`).
+
+	Returns
+	-------
+	dict
+		Opcode to (mnemonic, addressing mode).
+	"""
+	return {opCode: instruction(opCode, table, cls) for opCode in range(0x100) if instruction(opCode, table, cls) is not None}
+
+def length(opCode: int, cls=cpu):
+	"""
+	Length of an instruction in bytes, 1 for opcodes that are not implemented.
+	"""
+	decoded = instruction(opCode, cls=cls)
+	return 1 if decoded is None else _LENGTHS[decoded[1]]
+
+def disassemble(data, address: int, cls=cpu, symbols=None):
+	"""
+	Format one instruction as assembly.
+
+	Parameters
+	----------
+	data : bytes
+		Memory to read the instruction from.
+
+	address : int
+		Address of the instruction.
+
+	cls : type, optional
+		Cpu class or variant the instruction is decoded for (default is `cpu`).
+
+	symbols : symbols, optional
+		Symbol table to name address operands with (default is hex addresses).
+
+	Returns
+	-------
+	tuple
+		The assembly text and the instruction length.
+	"""
+	opCode = data[address]
+	decoded = instruction(opCode, cls=cls)
+	if decoded is None:
+		return ("??? ${:02X}".format(opCode), 1)
+	mnemonic, mode = decoded
+	size = _LENGTHS[mode]
+	if size == 1:
+		operand = 0
+	elif size == 2:
+		operand = data[(address+1) & 0xFFFF]
+	else:
+		operand = data[(address+1) & 0xFFFF] + data[(address+2) & 0xFFFF]*0x0100
+	if mode == "Relative":
+		operand = (address + 2 + (operand - 0x100 if operand & 0x80 else operand)) & 0xFFFF
+	if symbols is not None and mode in _SYMBOL_FORMATS:
+		text, digits = _SYMBOL_FORMATS[mode]
+		return (mnemonic + text.format(symbols.name(operand, digits)), size)
+	return (mnemonic + _FORMATS[mode].format(operand), size)
@@ -0,0 +1,249 @@
+import struct
+import threading
+import zlib
+
+class framebuffer:
+	"""
+	Memory-mapped framebuffer
+	=========================
+	Maps a memory region as a character or bitmap display. The cpu writes to
+	the region as normal memory, so emulation is not slowed down. Each frame
+	compares the region with a copy of the last frame and reports the changed
+	areas as rectangles, and only those areas need to be rendered.
+
+	In character mode every byte is a character code drawn with an 8x8 font,
+	`font` holds 8 row bytes per character with bit 7 as the leftmost pixel.
+	In bitmap mode every byte holds 8 pixels of 1 bit, or 1 pixel of 8 bits
+	indexing the palette.
+
+	Methods
+	-------
+	changes()
+		Capture a frame and return the rectangles that changed since the last one.
+
+	pixels(rect)
+		RGB bytes of an area of the captured frame.
+
+	ppm(rect) / png(rect)
+		An area of the captured frame as a PPM or PNG image.
+
+	start(callback) / stop()
+		Capture frames on a background thread at the frame rate.
+	"""
+
+	def __init__(self, memory, start, width, height, mode="bitmap", depth=1, font=None, palette=None, fps=50):
+		"""
+		Parameters
+		----------
+		memory : memory
+			Memory the framebuffer is mapped in.
+
+		start : int
+			Address of the first byte of the framebuffer.
+
+		width : int
+			Width in characters in character mode, in pixels in bitmap mode.
+
+		height : int
+			Height in characters in character mode, in pixels in bitmap mode.
+
+		mode : str, optional
+			"character" or "bitmap" (default is "bitmap").
+
+		depth : int, optional
+			Bits per pixel in bitmap mode, 1 or 8 (default is 1).
+
+		font : bytes, optional
+			8 bytes per character code, needed to render character mode.
+
+		palette : list, optional
+			(r, g, b) per color index (default is black and white for 1 bit, grey levels for 8 bits).
+
+		fps : int, optional
+			Frames per second captured by `start` (default is 50).
+		"""
+		if mode not in ("character", "bitmap"):
+			raise ValueError("Unknown framebuffer mode {}".format(mode))
+		if mode == "bitmap" and depth not in (1, 8):
+			raise ValueError("Bitmap depth must be 1 or 8")
+		self._memory = memory
+		self._start = start
+		self._mode = mode
+		self._depth = 1 if mode == "character" else depth
+		self._font = font
+		self._fps = fps
+		if mode == "character":
+			self._rowBytes, self._rows = width, height
+			self._cellWidth, self._cellHeight = 8, 8
+			self.width, self.height = width*8, height*8
+		else:
+			self._rowBytes, self._rows = width*depth // 8, height
+			self._cellWidth, self._cellHeight = 8 // depth, 1
+			self.width, self.height = width, height
+		if palette is None:
+			palette = [(0, 0, 0), (255, 255, 255)] if self._depth == 1 else [(i, i, i) for i in range(256)]
+		self._colors = [bytes(color) for color in palette]
+		if self._depth == 1:
+			self._bits = [
+				b"".join(self._colors[(byte >> (7-bit)) & 1] for bit in range(8))
+				for byte in range(0x100)
+			]
+		self._frame = bytearray(self._rowBytes * self._rows)
+		self._captured = False
+		self._thread = None
+		self._running = threading.Event()
+		pass
+
+	def changes(self):
+		"""
+		Capture a frame and return the rectangles that changed since the last one.
+		The first frame is reported as changed completely.
+
+		Returns
+		-------
+		list
+			(x, y, width, height) rectangles in pixels.
+		"""
+		size = self._rowBytes * self._rows
+		current = bytes(self._memory.Data[self._start:self._start+size])
+		if not self._captured:
+			self._frame[:] = current
+			self._captured = True
+			return [(0, 0, self.width, self.height)]
+
+		# Changed byte spans per row, then merge equal spans on neighbouring rows
+		rects = list()
+		pending = dict()
+		frame = self._frame
+		stride = self._rowBytes
+		for row in range(self._rows):
+			offset = row * stride
+			spans = set()
+			if frame[offset:offset+stride] != current[offset:offset+stride]:
+				first = last = None
+				for column in range(stride):
+					if frame[offset+column] != current[offset+column]:
+						if first is None:
+							first = column
+						elif column > last + 1:
+							spans.add((first, last))
+							first = column
+						last = column
+				spans.add((first, last))
+			for span in list(pending):
+				if span not in spans:
+					rects.append(self._rect(span, pending.pop(span), row))
+			for span in spans:
+				pending.setdefault(span, row)
+		for span, top in pending.items():
+			rects.append(self._rect(span, top, self._rows))
+		frame[:] = current
+		return rects
+
+	def _rect(self, span, top, bottom):
+		"""
+		Rectangle in pixels of a byte span on rows from top up to bottom.
+		"""
+		first, last = span
+		return (
+			first * self._cellWidth,
+			top * self._cellHeight,
+			(last - first + 1) * self._cellWidth,
+			(bottom - top) * self._cellHeight
+		)
+
+	def pixels(self, rect=None):
+		"""
+		RGB bytes of an area of the captured frame.
+
+		Parameters
+		----------
+		rect : tuple, optional
+			(x, y, width, height) in pixels (default is the whole frame).
+
+		Returns
+		-------
+		bytes
+			3 bytes per pixel, row by row.
+		"""
+		x, y, width, height = rect or (0, 0, self.width, self.height)
+		frame = self._frame
+		stride = self._rowBytes
+		rows = list()
+		for py in range(y, y+height):
+			if self._mode == "character":
+				if self._font is None:
+					raise ValueError("Character mode needs a font to render pixels")
+				offset = (py // 8) * stride
+				line = py % 8
+				row = b"".join(self._bits[self._font[code*8 + line]] for code in frame[offset:offset+stride])
+			elif self._depth == 1:
+				offset = py * stride
+				row = b"".join(self._bits[byte] for byte in frame[offset:offset+stride])
+			else:
+				offset = py * stride
+				row = b"".join(self._colors[index] for index in frame[offset:offset+stride])
+			rows.append(row[x*3:(x+width)*3])
+		return b"".join(rows)
+
+	def ppm(self, rect=None):
+		"""
+		An area of the captured frame as a binary PPM image.
+		"""
+		x, y, width, height = rect or (0, 0, self.width, self.height)
+		return "P6\n{} {}\n255\n".format(width, height).encode("ascii") + self.pixels(rect)
+
+	def png(self, rect=None):
+		"""
+		An area of the captured frame as a PNG image.
+		"""
+		x, y, width, height = rect or (0, 0, self.width, self.height)
+		data = self.pixels(rect)
+		stride = width * 3
+		raw = b"".join(b"\x00" + data[row*stride:(row+1)*stride] for row in range(height))
+
+		def chunk(kind, body):
+			return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body) & 0xFFFFFFFF)
+
+		return (
+			b"\x89PNG\r\n\x1a\n"
+			+ chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+			+ chunk(b"IDAT", zlib.compress(raw))
+			+ chunk(b"IEND", b"")
+		)
+
+	def start(self, callback):
+		"""
+		Capture frames on a background thread at the frame rate. The callback
+		is called with the framebuffer and the changed rectangles whenever a
+		frame changed, it can render them with `pixels`, `ppm` or `png`.
+
+		Parameters
+		----------
+		callback : callable
+			Function taking (framebuffer, rects).
+		"""
+		if self._thread is not None:
+			return
+
+		def loop():
+			while not self._running.wait(1 / self._fps):
+				rects = self.changes()
+				if rects:
+					callback(self, rects)
+
+		self._running.clear()
+		self._thread = threading.Thread(target=loop, name="framebuffer", daemon=True)
+		self._thread.start()
+		pass
+
+	def stop(self):
+		"""
+		Stop capturing frames on the background thread.
+		"""
+		if self._thread is None:
+			return
+		self._running.set()
+		self._thread.join()
+		self._thread = None
+		pass
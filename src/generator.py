@@ -0,0 +1,499 @@
+"""
+Handler generator
+=================
+Generates one straight-line handler per implemented opcode. Each handler in
+`_instructions` is specialised for every opcode it is listed on: `opCode`
+becomes a constant, the addressing mode checks are folded away, and lookups
+in the `xxxFunction` lists are replaced by direct calls to the addressing
+mode method. The result has no addressing mode decisions left at runtime.
+
+The same handlers are also inlined into a single run loop that keeps the
+registers, flags and memory in local variables. Calls to the memory, status
+and addressing mode methods are inlined, and every opcode becomes a leaf of
+an if-tree on the opcode. State is written back to the cpu when the loop
+stops. Loops that also mark code coverage or stop on breakpoint addresses
+are generated on the first `cpu.run(cover=...)` or `cpu.run(breaks=...)`.
+
+Run `python tool/handlers.py` to print the generated handlers, or
+`python tool/handlers.py --core` for the run loop.
+"""
+
+import ast
+import copy
+import inspect
+import textwrap
+
+class _Specialise(ast.NodeTransformer):
+	"""
+	Specialise a handler for one opcode.
+	"""
+
+	def __init__(self, cls, opCode):
+		self._cls = cls
+		self._opCode = opCode
+
+	def visit_Name(self, node):
+		if node.id == "opCode" and isinstance(node.ctx, ast.Load):
+			return ast.copy_location(ast.Constant(self._opCode), node)
+		return node
+
+	def _fold(self, node):
+		"""
+		Evaluate an expression whose operands are all constants.
+		"""
+		if all(isinstance(child, ast.Constant) for child in ast.iter_child_nodes(node) if isinstance(child, ast.expr)):
+			value = eval(compile(ast.Expression(node), "<fold>", "eval"))
+			return ast.copy_location(ast.Constant(value), node)
+		return node
+
+	def visit_BinOp(self, node):
+		self.generic_visit(node)
+		return self._fold(node)
+
+	def visit_UnaryOp(self, node):
+		self.generic_visit(node)
+		return self._fold(node)
+
+	def visit_Compare(self, node):
+		self.generic_visit(node)
+		return self._fold(node)
+
+	def visit_BoolOp(self, node):
+		self.generic_visit(node)
+		return self._fold(node)
+
+	def visit_If(self, node):
+		# Fold the test first, a pruned branch may index past the end of a mode list
+		node.test = self.visit(node.test)
+		if isinstance(node.test, ast.Constant):
+			kept = []
+			for statement in node.body if node.test.value else node.orelse:
+				statement = self.visit(statement)
+				if isinstance(statement, list):
+					kept.extend(statement)
+				elif statement is not None:
+					kept.append(statement)
+			return kept or None
+		self.generic_visit(node)
+		node.body = node.body or [ast.Pass()]
+		return node
+
+	def visit_Call(self, node):
+		self.generic_visit(node)
+		function = node.func
+		if (
+			isinstance(function, ast.Subscript)
+			and isinstance(function.value, ast.Attribute)
+			and isinstance(function.value.value, ast.Name)
+			and function.value.value.id == "self"
+			and function.value.attr.endswith("Function")
+			and isinstance(function.slice, ast.Constant)
+		):
+			mode = getattr(self._cls, function.value.attr)[function.slice.value]
+			if mode is not None:
+				method = ast.Attribute(value=ast.Name(id="self", ctx=ast.Load()), attr=mode.__name__, ctx=ast.Load())
+				return ast.copy_location(ast.Call(func=method, args=[], keywords=[]), node)
+		return node
+
+def _specialise(cls, handler, opCode):
+	"""
+	Build the function definition of a handler specialised for one opcode.
+	"""
+	tree = ast.parse(textwrap.dedent(inspect.getsource(handler)))
+	function = tree.body[0]
+	body = function.body
+	if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) and isinstance(body[0].value.value, str):
+		body = body[1:]
+	function.body = body
+	function = _Specialise(cls, opCode).visit(function)
+	body = [statement for statement in function.body if not isinstance(statement, ast.Pass)]
+	function.body = body or [ast.Pass()]
+	function.name = "{}_{:02X}".format(handler.__name__, opCode)
+	function.decorator_list = []
+	return ast.fix_missing_locations(function)
+
+def generateSource(cls):
+	"""
+	Source code of the generated handlers.
+
+	Parameters
+	----------
+	cls : type
+		The cpu class to read `_instructions` and the addressing mode lists from.
+
+	Returns
+	-------
+	str
+		One function per implemented opcode.
+	"""
+	functions = list()
+	for opCode in range(0x100):
+		handler = cls._instructions[opCode >> 4][opCode & 0x0F]
+		if handler is not None:
+			functions.append(_specialise(cls, handler, opCode))
+	return ast.unparse(ast.Module(body=functions, type_ignores=[]))
+
+def generateHandlers(cls):
+	"""
+	Generate one straight-line handler per implemented opcode.
+
+	Parameters
+	----------
+	cls : type
+		The cpu class to read `_instructions` and the addressing mode lists from.
+
+	Returns
+	-------
+	list
+		256 handlers indexed by opcode, None where the opcode is not implemented.
+	"""
+	namespace = dict()
+	exec(compile(generateSource(cls), "<generated handlers>", "exec"), namespace)
+	handlers = list()
+	for opCode in range(0x100):
+		handler = cls._instructions[opCode >> 4][opCode & 0x0F]
+		handlers.append(None if handler is None else namespace["{}_{:02X}".format(handler.__name__, opCode)])
+	return handlers
+
+# Methods inlined into the run loop
+_INLINE = (
+	"readByte", "readWord", "readStatus", "writeByte", "writeWord", "writeStatus", "_pcIncrement", "_moveStack",
+	"_readMemory", "_writeMemory",
+	"_readIndirectX", "_readZeroPage", "_readImmediate", "_readAbsolute", "_readIndirectY",
+	"_readZeroPageX", "_readZeroPageY", "_readAbsoluteY", "_readAbsoluteX", "_readRelative",
+	"_readZeroPageIndirect", "_readAbsoluteIndirectX"
+)
+
+# Attributes kept in local variables by the run loop
+_LOCALS = {
+	"_PC": "PC", "_SP": "SP", "_Acc": "A", "_Reg_X": "X", "_Reg_Y": "Y",
+	"_PS_n": "ps_n", "_PS_v": "ps_v", "_PS_b": "ps_b", "_PS_d": "ps_d",
+	"_PS_i": "ps_i", "_PS_z": "ps_z", "_PS_c": "ps_c", "_cycles": "cycles",
+	"_retired": "retired", "_branchesTaken": "taken", "_branchesNotTaken": "notTaken",
+	"_pageCrosses": "crosses", "_stackLow": "stackLow"
+}
+
+_MEMORY = {"Data": "mem", "Dirty": "dirty", "Read": "readPages", "Write": "writePages"}
+
+# Tables of the cpu the run loop holds in local variables, they are changed in place
+_TABLES = {"_portPages": "portPages"}
+
+def _isSelfCall(node):
+	return (
+		isinstance(node, ast.Call)
+		and isinstance(node.func, ast.Attribute)
+		and isinstance(node.func.value, ast.Name)
+		and node.func.value.id == "self"
+		and node.func.attr in _INLINE
+	)
+
+class _Rename(ast.NodeTransformer):
+	"""
+	Rename variables of an inlined method and substitute its parameters.
+	"""
+
+	def __init__(self, names, parameters):
+		self._names = names
+		self._parameters = parameters
+
+	def visit_Name(self, node):
+		if node.id in self._parameters and isinstance(node.ctx, ast.Load):
+			return copy.deepcopy(self._parameters[node.id])
+		if node.id in self._names:
+			return ast.copy_location(ast.Name(id=self._names[node.id], ctx=node.ctx), node)
+		return node
+
+class _Localise(ast.NodeTransformer):
+	"""
+	Replace cpu attributes with the local variables of the run loop.
+	"""
+
+	def visit_Attribute(self, node):
+		if isinstance(node.value, ast.Name) and node.value.id == "self" and node.attr in _LOCALS:
+			return ast.copy_location(ast.Name(id=_LOCALS[node.attr], ctx=node.ctx), node)
+		if isinstance(node.value, ast.Name) and node.value.id == "self" and node.attr in _TABLES:
+			return ast.copy_location(ast.Name(id=_TABLES[node.attr], ctx=node.ctx), node)
+		if (
+			isinstance(node.value, ast.Attribute)
+			and isinstance(node.value.value, ast.Name)
+			and node.value.value.id == "self"
+			and node.value.attr == "_memory"
+			and node.attr in _MEMORY
+		):
+			return ast.copy_location(ast.Name(id=_MEMORY[node.attr], ctx=node.ctx), node)
+		self.generic_visit(node)
+		return node
+
+class _Inliner:
+	"""
+	Inline the methods in `_INLINE` into a list of statements.
+	"""
+
+	def __init__(self, cls):
+		self._cls = cls
+		self._methods = dict()
+		self._count = 0
+
+	def _method(self, name):
+		"""
+		Parameters, default values, statements and returned expression of a method.
+		"""
+		if name not in self._methods:
+			function = ast.parse(textwrap.dedent(inspect.getsource(getattr(self._cls, name)))).body[0]
+			parameters = [argument.arg for argument in function.args.args][1:]
+			defaults = dict(zip(parameters[len(parameters)-len(function.args.defaults):], function.args.defaults))
+			body = [statement for statement in function.body if not isinstance(statement, ast.Pass)]
+			if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+				body = body[1:]
+			body = [_Localise().visit(statement) for statement in body]
+			returned = None
+			if body and isinstance(body[-1], ast.Return):
+				returned = body[-1].value
+				body = body[:-1]
+			if any(isinstance(node, ast.Return) for statement in body for node in ast.walk(statement)):
+				raise ValueError("Cannot inline {}, it returns before its last statement".format(name))
+			self._methods[name] = (parameters, defaults, body, returned)
+		return self._methods[name]
+
+	def _fits(self, node):
+		"""
+		Whether a call passes every parameter without a default value. Calls that do not are left to fail as they would in the handler.
+		"""
+		parameters, defaults, body, returned = self._method(node.func.attr)
+		return not node.keywords and len(parameters) - len(defaults) <= len(node.args) <= len(parameters)
+
+	def _name(self, name):
+		self._count += 1
+		return "_{}{}".format(name, self._count)
+
+	def expression(self, node):
+		"""
+		Inline the calls in an expression. Returns the statements to run first and the new expression.
+		"""
+		if _isSelfCall(node) and self._fits(node):
+			before = list()
+			arguments = list()
+			for argument in node.args:
+				statements, argument = self.expression(argument)
+				before += statements
+				arguments.append(argument)
+			parameters, defaults, body, returned = self._method(node.func.attr)
+			values = dict()
+			for index, parameter in enumerate(parameters):
+				value = arguments[index] if index < len(arguments) else copy.deepcopy(defaults[parameter])
+				if not isinstance(value, (ast.Name, ast.Constant)):
+					name = self._name(parameter)
+					before.append(ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())], value=value))
+					value = ast.Name(id=name, ctx=ast.Load())
+				values[parameter] = value
+			names = {
+				target.id: self._name(target.id)
+				for statement in body for target in ast.walk(statement)
+				if isinstance(target, ast.Name) and isinstance(target.ctx, ast.Store)
+				and target.id not in _LOCALS.values()
+			}
+			rename = _Rename(names, values)
+			before += self.statements([rename.visit(copy.deepcopy(statement)) for statement in body])
+			if returned is None:
+				return before, ast.Constant(None)
+			statements, returned = self.expression(rename.visit(copy.deepcopy(returned)))
+			return before + statements, returned
+
+		before = list()
+		for field, value in ast.iter_fields(node):
+			if isinstance(value, ast.expr):
+				statements, value = self.expression(value)
+				before += statements
+				setattr(node, field, value)
+			elif isinstance(value, list):
+				items = list()
+				for item in value:
+					if isinstance(item, ast.expr):
+						statements, item = self.expression(item)
+						before += statements
+					items.append(item)
+				setattr(node, field, items)
+		return before, node
+
+	def statements(self, statements):
+		"""
+		Inline the calls in a list of statements.
+		"""
+		result = list()
+		for statement in statements:
+			if isinstance(statement, ast.Expr) and _isSelfCall(statement.value) and self._fits(statement.value):
+				before, value = self.expression(statement.value)
+				result += before
+			elif isinstance(statement, ast.If):
+				before, statement.test = self.expression(statement.test)
+				statement.body = self.statements(statement.body) or [ast.Pass()]
+				statement.orelse = self.statements(statement.orelse)
+				result += before + [statement]
+			else:
+				before, statement = self.expression(statement)
+				result += before + [statement]
+		return result
+
+def _tree(cases, low, high):
+	"""
+	If-tree on the opcode for the opcodes from low to high, stopping on opcodes that are not implemented.
+	"""
+	if not any(opCode in cases for opCode in range(low, high)):
+		return [ast.Break()]
+	if high - low == 1:
+		return cases[low]
+	middle = (low + high) // 2
+	test = ast.Compare(left=ast.Name(id="opCode", ctx=ast.Load()), ops=[ast.Lt()], comparators=[ast.Constant(middle)])
+	return [ast.If(test=test, body=_tree(cases, low, middle), orelse=_tree(cases, middle, high))]
+
+def _cases(cls, inliner):
+	"""
+	Inlined and localised statements of every implemented opcode.
+	"""
+	cases = dict()
+	for opCode in range(0x100):
+		handler = cls._instructions[opCode >> 4][opCode & 0x0F]
+		if handler is None:
+			continue
+		function = _specialise(cls, handler, opCode)
+		body = [_Localise().visit(statement) for statement in function.body if not isinstance(statement, ast.Pass)]
+		body = [_Localise().visit(statement) for statement in inliner.statements(body)]
+		cases[opCode] = [_Specialise(cls, opCode).visit(statement) for statement in body]
+	return cases
+
+def registerEffects(cls):
+	"""
+	Registers and flags every opcode reads and writes, from the statements the run loop executes for it.
+
+	A register counts as read when a statement loads it before a statement
+	on the top level of the handler has assigned it, and as written only by
+	such top level assignments. Assignments in branches are writes that may
+	not happen.
+
+	Parameters
+	----------
+	cls : type
+		The cpu class to read `_instructions` and the addressing mode lists from.
+
+	Returns
+	-------
+	list
+		256 entries indexed by opcode, None where the opcode is not implemented,
+		otherwise the attribute names read, always written and possibly written, as frozensets.
+	"""
+	names = {local: name for name, local in _LOCALS.items()}
+	effects = [None] * 0x100
+	for opCode, body in _cases(cls, _Inliner(cls)).items():
+		reads, writes, changes = set(), set(), set()
+		for statement in body:
+			nodes = list(ast.walk(statement))
+			loaded = {node.id for node in nodes if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)}
+			loaded |= {node.target.id for node in nodes if isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name)}
+			stored = {node.id for node in nodes if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)}
+			reads |= loaded - writes
+			changes |= stored
+			if isinstance(statement, (ast.Assign, ast.AugAssign)):
+				writes |= stored
+		# Calls left in the statements cannot change registers, the run loop keeps those in local variables
+		effects[opCode] = tuple(frozenset(names[local] for local in found if local in names) for found in (reads, writes, changes))
+	return effects
+
+# Statements marking coverage around the statements of an opcode, see `generateCoreSource`
+_COVER = "coverExecuted[PC] = 1\ncoverOpcodes[{}] = 1"
+_COVER_BRANCH = "branchAt = PC\nbranchTaken = taken"
+_COVER_SIDE = "if taken != branchTaken:\n\tcoverTaken[branchAt] = 1\nelse:\n\tcoverNotTaken[branchAt] = 1"
+
+def generateCoreSource(cls, cover=False, breaks=False):
+	"""
+	Source code of the run loop.
+
+	Parameters
+	----------
+	cls : type
+		The cpu class to read `_instructions`, `_instructionCycles` and the addressing mode lists from.
+
+	cover : bool, optional
+		Mark coverage from the loop (default is False).
+
+	breaks : bool, optional
+		Stop the loop on breakpoint addresses (default is False).
+
+	Returns
+	-------
+	str
+		Definition of `_runCore(self, stop)`. It runs until an opcode is not
+		implemented or the cycle count reaches `stop`. With `cover` it takes
+		`coverExecuted, coverOpcodes, coverTaken, coverNotTaken` after `stop`
+		and sets the bytes of the executed addresses, the opcodes and the
+		sides of the branches, telling those apart by the taken branch counter.
+		With `breaks` it takes a set of addresses last and also stops before
+		executing the instruction on one of them.
+	"""
+	inliner = _Inliner(cls)
+	cases = dict()
+	for opCode, body in _cases(cls, inliner).items():
+		cycles = ast.AugAssign(target=ast.Name(id="cycles", ctx=ast.Store()), op=ast.Add(), value=ast.Constant(cls._instructionCycles[opCode >> 4][opCode & 0x0F]))
+		retired = ast.AugAssign(target=ast.Name(id="retired", ctx=ast.Store()), op=ast.Add(), value=ast.Constant(1))
+		if cover:
+			# Conditional branches count both sides
+			stored = {node.id for statement in body for node in ast.walk(statement) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)}
+			if {"taken", "notTaken"} <= stored:
+				body = ast.parse(_COVER_BRANCH).body + body + ast.parse(_COVER_SIDE).body
+			body = ast.parse(_COVER.format(opCode)).body + body
+		cases[opCode] = [cycles, retired] + body
+
+	fetch = [_Localise().visit(statement) for statement in ast.parse("opCode = self.readByte(self._PC)").body]
+	fetch = [_Localise().visit(statement) for statement in inliner.statements(fetch)]
+
+	if breaks:
+		fetch = ast.parse("if PC in breaks:\n\tbreak").body + fetch
+
+	parameters = ["self", "stop"] + (["coverExecuted", "coverOpcodes", "coverTaken", "coverNotTaken"] if cover else []) + (["breaks"] if breaks else [])
+	load = "\n".join("\t{} = self.{}".format(local, name) for name, local in _LOCALS.items())
+	store = "\n".join("\t\tself.{} = {}".format(name, local) for name, local in _LOCALS.items())
+	source = (
+		"def _runCore({}):\n".format(", ".join(parameters))
+		+ load + "\n"
+		"\ttry:\n"
+		"\t\twhile cycles < stop:\n"
+		"\t\t\tDISPATCH\n"
+		"\tfinally:\n"
+		+ store + "\n"
+	)
+	function = ast.parse(source).body[0]
+	loop = function.body[-1].body[0]
+	loop.body[-1:] = fetch + _tree(cases, 0, 0x100)
+	# Load only the memory attributes and tables the inlined methods use
+	used = {node.id for node in ast.walk(loop) if isinstance(node, ast.Name)}
+	function.body[:0] = [
+		ast.parse("{} = self._memory.{}".format(local, name)).body[0]
+		for name, local in _MEMORY.items() if local in used
+	] + [
+		ast.parse("{} = self.{}".format(local, name)).body[0]
+		for name, local in _TABLES.items() if local in used
+	]
+	return ast.unparse(ast.fix_missing_locations(function))
+
+def generateCore(cls, cover=False, breaks=False):
+	"""
+	Generate the run loop.
+
+	Parameters
+	----------
+	cls : type
+		The cpu class to read `_instructions`, `_instructionCycles` and the addressing mode lists from.
+
+	cover : bool, optional
+		Mark coverage from the loop, see `generateCoreSource` (default is False).
+
+	breaks : bool, optional
+		Stop the loop on breakpoint addresses, see `generateCoreSource` (default is False).
+
+	Returns
+	-------
+	function
+		`_runCore`, to be set on the cpu class.
+	"""
+	namespace = dict()
+	exec(compile(generateCoreSource(cls, cover, breaks), "<generated core>", "exec"), namespace)
+	return namespace["_runCore"]
@@ -0,0 +1,207 @@
+import json
+import time
+
+class hostprofiler:
+	"""
+	Host time profiler
+	==================
+	Measures where the emulator itself spends host time. It runs the cpu on a
+	copy of the `execute()` loop that times every handler call, and wraps the
+	addressing mode helpers on the instance to time them too. Handler time is
+	reported without the helpers it called, and the time of the loop that is
+	not spent in a handler is reported as dispatch.
+
+	Timing uses `time.perf_counter_ns`. The cost of reading the clock is
+	measured once and taken off every timed call.
+
+	Methods
+	-------
+	run(count)
+		Execute and time instructions until the cpu halts or `count` is reached.
+
+	reset()
+		Drop the measurements.
+
+	report()
+		Measurements ranked by time, ready for JSON.
+
+	table(limit)
+		The ranked report as text.
+
+	saveJSON(path)
+		Write the report as JSON.
+	"""
+
+	_HELPERS = (
+		"_readIndirectX", "_readZeroPage", "_readImmediate", "_readAbsolute", "_readIndirectY",
+		"_readZeroPageX", "_readZeroPageY", "_readAbsoluteY", "_readAbsoluteX", "_readRelative"
+	)
+
+	def __init__(self, cpu):
+		"""
+		Parameters
+		----------
+		cpu : cpu
+			The cpu to run.
+		"""
+		self._cpu = cpu
+		self._names = [
+			None if handler is None else handler.__name__
+			for row in cpu._instructions for handler in row
+		]
+		self._overhead = self._calibrate()
+		self.reset()
+		pass
+
+	def _calibrate(self):
+		"""
+		Nanoseconds between two back to back clock reads, the least of many tries.
+		"""
+		clock = time.perf_counter_ns
+		return min(-clock() + clock() for _ in range(10000))
+
+	def reset(self):
+		"""
+		Drop the measurements.
+		"""
+		self._times = [0] * 0x100
+		self._calls = [0] * 0x100
+		self._helperTimes = dict.fromkeys(self._HELPERS, 0)
+		self._helperCalls = dict.fromkeys(self._HELPERS, 0)
+		self._total = 0
+		pass
+
+	def run(self, count=None):
+		"""
+		Execute and time instructions until the cpu halts or `count` is reached.
+
+		Parameters
+		----------
+		count : int, optional
+			Instructions to execute (default is no limit).
+		"""
+		CPU = self._cpu
+		clock = time.perf_counter_ns
+		overhead = self._overhead
+		handlers = CPU._handlers
+		cycles = CPU._handlerCycles
+		times, calls = self._times, self._calls
+		helperTimes, helperCalls = self._helperTimes, self._helperCalls
+		nested = [0]
+
+		def timed(name, helper):
+			def helperTimer():
+				start = clock()
+				address = helper()
+				elapsed = clock() - start - overhead
+				helperTimes[name] += elapsed
+				helperCalls[name] += 1
+				nested[0] += elapsed
+				return address
+			return helperTimer
+
+		for name in self._HELPERS:
+			CPU.addHook(self, name, lambda helper, name=name: timed(name, helper))
+		executed = 0
+		begin = clock()
+		try:
+			while count is None or executed < count:
+				opCode = CPU.readByte(CPU._PC)
+				instruction = handlers[opCode]
+				if instruction is None:
+					if opCode == CPU._TRAP_OPCODE and CPU._PC in CPU._traps:
+						CPU._trap()
+						executed += 1
+						continue
+					break
+				CPU._cycles += cycles[opCode]
+				CPU._retired += 1
+				nested[0] = 0
+				start = clock()
+				instruction(CPU, opCode)
+				elapsed = clock() - start - overhead
+				# Helper time is reported on the helper, not on the handler that called it
+				times[opCode] += elapsed - nested[0]
+				calls[opCode] += 1
+				executed += 1
+		finally:
+			self._total += clock() - begin
+			CPU.removeHook(self, self._HELPERS)
+		pass
+
+	def report(self):
+		"""
+		Measurements ranked by time, ready for JSON.
+
+		Returns
+		-------
+		dict
+			"entries" lists handlers, helpers and dispatch from the most to the
+			least time as {"name", "kind", "calls", "seconds", "nanosecondsPerCall", "share"},
+			"opcodes" holds the handler time per opcode.
+		"""
+		handlerTimes = dict()
+		handlerCalls = dict()
+		opcodes = dict()
+		for opCode, name in enumerate(self._names):
+			if name is None or not self._calls[opCode]:
+				continue
+			handlerTimes[name] = handlerTimes.get(name, 0) + self._times[opCode]
+			handlerCalls[name] = handlerCalls.get(name, 0) + self._calls[opCode]
+			opcodes["{:02X}".format(opCode)] = {"name": name, "calls": self._calls[opCode], "seconds": self._times[opCode] / 1e9}
+
+		measured = sum(handlerTimes.values()) + sum(self._helperTimes.values())
+		entries = [(name, "handler", handlerCalls[name], handlerTimes[name]) for name in handlerTimes]
+		entries += [(name, "helper", self._helperCalls[name], self._helperTimes[name]) for name in self._HELPERS if self._helperCalls[name]]
+		entries.append(("dispatch", "dispatch", sum(self._calls), max(self._total - measured, 0)))
+		entries.sort(key=lambda entry: entry[3], reverse=True)
+		total = sum(entry[3] for entry in entries) or 1
+		return {
+			"seconds": self._total / 1e9,
+			"entries": [
+				{
+					"name": name,
+					"kind": kind,
+					"calls": calls,
+					"seconds": nanoseconds / 1e9,
+					"nanosecondsPerCall": nanoseconds / calls if calls else 0,
+					"share": nanoseconds / total
+				}
+				for name, kind, calls, nanoseconds in entries
+			],
+			"opcodes": opcodes
+		}
+
+	def table(self, limit=None):
+		"""
+		The ranked report as text.
+
+		Parameters
+		----------
+		limit : int, optional
+			Number of entries to show (default is every entry).
+
+		Returns
+		-------
+		str
+			One line per entry with its share, time, calls and time per call.
+		"""
+		lines = ["{:<16} {:>7} {:>10} {:>10} {:>9}".format("name", "share", "seconds", "calls", "ns/call")]
+		for entry in self.report()["entries"][:limit]:
+			lines.append("{:<16} {:>6.1f}% {:>10.4f} {:>10} {:>9.0f}".format(
+				entry["name"], entry["share"]*100, entry["seconds"], entry["calls"], entry["nanosecondsPerCall"]
+			))
+		return "\n".join(lines)
+
+	def saveJSON(self, path):
+		"""
+		Write the report as JSON.
+
+		Parameters
+		----------
+		path : str
+			Path of the JSON file.
+		"""
+		with open(path, "w") as file:
+			json.dump(self.report(), file, indent="\t")
+		pass
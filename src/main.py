@@ -8,8 +8,7 @@ from memory import memory
 CPU = cpu()
 
 # Immediate
-CPU._memory.Data[0x0000] = 0x49
-CPU._memory.Data[0x0001] = 0xaa
+CPU._memory.load(0x0000, bytes([0x49, 0xaa]))
 CPU._Acc = 0xcc
 CPU.execute()
 CPU._memory.memoryDump("./dump")
@@ -0,0 +1,276 @@
+from collections import OrderedDict
+
+from generator import registerEffects
+
+# Register effects of the opcodes per cpu class, see `generator.registerEffects`
+_EFFECTS = dict()
+
+class memoiser:
+	"""
+	Guest subroutine memoiser
+	=========================
+	Caches the results of pure guest subroutines. Each target is trapped on its
+	entry point. The first call with a new input runs the real routine and
+	records the memory it reads and writes, and from the instructions it
+	executes the registers and flags it reads before writing them. Later calls
+	with the same values in those registers and the same bytes on the recorded
+	addresses replay the result instead. A target called from another target
+	adds its inputs to those of the caller.
+
+	A target must only depend on its registers and the memory it reads, and
+	must return with an RTS on the stack depth it was called with. A call that
+	halts on an unimplemented opcode or runs past `limit` clock cycles before
+	its RTS is not cached, the cpu is left where the routine stopped, with
+	the return address still on the stack.
+
+	Attributes
+	----------
+	hits : int
+		Calls answered from the cache.
+
+	misses : int
+		Calls that ran the guest routine.
+
+	Methods
+	-------
+	addTarget(address)
+		Memoise the subroutine on the address.
+
+	removeTarget(address)
+		Stop memoising the subroutine and drop its cache.
+
+	invalidate(address)
+		Drop cached results.
+	"""
+
+	_REGISTERS = ("_Acc", "_Reg_X", "_Reg_Y", "_SP", "_PS_n", "_PS_v", "_PS_d", "_PS_i", "_PS_z", "_PS_c")
+
+	def __init__(self, cpu, size=256, limit=1000000):
+		"""
+		Parameters
+		----------
+		cpu : cpu
+			The cpu to memoise subroutines on.
+
+		size : int, optional
+			Maximum cached results per target, least recently used results are dropped first (default is 256).
+
+		limit : int, optional
+			Clock cycles a recorded call may take before it is given up on (default is 1000000).
+		"""
+		self._cpu = cpu
+		self._size = size
+		self._limit = limit
+		self._targets = dict()
+		self._recording = list()
+		cls = type(cpu)
+		if cls not in _EFFECTS:
+			_EFFECTS[cls] = registerEffects(cls)
+		registers = frozenset(self._REGISTERS)
+		self._effects = [None if effect is None else tuple(names & registers for names in effect) for effect in _EFFECTS[cls]]
+		self.hits = 0
+		self.misses = 0
+		pass
+
+	def addTarget(self, address: int):
+		"""
+		Memoise the subroutine on the address.
+
+		Parameters
+		----------
+		address : int
+			Entry point of the subroutine.
+		"""
+		self._targets[address] = (OrderedDict(), dict())
+		self._cpu.registerTrap(address, lambda CPU: self._call(address))
+		pass
+
+	def removeTarget(self, address: int):
+		"""
+		Stop memoising the subroutine and drop its cache.
+
+		Parameters
+		----------
+		address : int
+			Entry point of the subroutine.
+		"""
+		self._cpu.removeTrap(address)
+		del self._targets[address]
+		pass
+
+	def invalidate(self, address=None):
+		"""
+		Drop cached results.
+
+		Parameters
+		----------
+		address : int, optional
+			Entry point of the subroutine, drops every target when not set.
+		"""
+		for target in ([address] if address is not None else list(self._targets)):
+			cache, layouts = self._targets[target]
+			cache.clear()
+			layouts.clear()
+		pass
+
+	def _call(self, address: int):
+		"""
+		Trap function of a target. Replays a cached result or runs the routine.
+
+		Returns
+		-------
+		int
+			Clock cycles of the call.
+		"""
+		CPU = self._cpu
+		data = CPU._memory.Data
+		cache, layouts = self._targets[address]
+		data[address] = CPU._traps[address][2]
+		try:
+			for layout, code in list(layouts.items()):
+				if any(data[a] != v for a, v in code):
+					self._dropLayout(cache, layouts, layout)
+					continue
+				registers, reads = layout
+				key = (tuple(getattr(CPU, register) for register in registers), layout, tuple(data[a] for a in reads))
+				result = cache.get(key)
+				if result is not None:
+					cache.move_to_end(key)
+					self.hits += 1
+					if self._recording:
+						# The entry point is already in the caller's code, with the trap opcode on it
+						addresses = reads + tuple(a for a, v in code if a != address)
+						self._recording[-1](registers, tuple(register for register, value in result[0]), addresses)
+					return self._replay(result)
+			self.misses += 1
+			return self._record(address)
+		finally:
+			data[address] = CPU._TRAP_OPCODE
+
+	def _replay(self, result):
+		"""
+		Apply a cached result to the cpu.
+		"""
+		CPU = self._cpu
+		outputs, writes, cycles = result
+		for register, value in outputs:
+			setattr(CPU, register, value)
+		for a, v in writes:
+			CPU.writeByte(a, v)
+		return cycles
+
+	def _record(self, address: int):
+		"""
+		Run the routine up to its RTS while recording the memory it touches
+		and the registers it reads and writes. When it halts or exceeds the
+		limit first, nothing is cached and the cpu stays where it stopped.
+		"""
+		CPU = self._cpu
+		data = CPU._memory.Data
+		effects = self._effects
+		cache, layouts = self._targets[address]
+		entry = {register: getattr(CPU, register) for register in self._REGISTERS}
+		code = dict()
+		reads = dict()
+		writes = dict()
+		# Registers read before they are written, always written, and possibly written
+		used = set()
+		written = set()
+		changed = set()
+		readByte = CPU.readByte
+		writeByte = CPU.writeByte
+
+		def recordByte(a):
+			value = readByte(a)
+			if a == CPU._PC:
+				code.setdefault(a, value)
+			elif a not in writes:
+				reads.setdefault(a, value)
+			return value
+
+		def recordWord(a):
+			if a == CPU._PC:
+				code.setdefault(a, data[a])
+				code.setdefault(a+1, data[a+1])
+				return readByte(a) + readByte(a+1)*0x0100
+			return recordByte(a) + recordByte(a+1)*0x0100
+
+		def recordWriteByte(a, value):
+			writeByte(a, value)
+			writes[a] = data[a]
+
+		def recordWriteWord(a, value):
+			recordWriteByte(a, value)
+			recordWriteByte(a+1, value >> 8)
+
+		def recordCall(registers, outputs, addresses):
+			# A target called from this one, replayed or recorded on its own
+			used.update(register for register in registers if register not in written)
+			changed.update(outputs)
+			for a in addresses:
+				if a not in writes:
+					reads.setdefault(a, data[a])
+
+		# The byte methods wrapped are those read above, words are recorded per byte.
+		# A call of its own owns the hooks, so a target called from this one leaves them in place.
+		owner = object()
+		CPU.addHook(owner, "readByte", lambda inner: recordByte)
+		CPU.addHook(owner, "readWord", lambda inner: recordWord)
+		CPU.addHook(owner, "writeByte", lambda inner: recordWriteByte)
+		CPU.addHook(owner, "writeWord", lambda inner: recordWriteWord)
+		self._recording.append(recordCall)
+		stack = CPU._SP
+		cycles = CPU._cycles
+		limit = cycles + self._limit
+		completed = False
+		try:
+			while CPU._cycles < limit:
+				opCode = data[CPU._PC]
+				if opCode == 0x60 and CPU._SP == stack:
+					code.setdefault(CPU._PC, 0x60)
+					completed = True
+					break
+				if opCode == CPU._TRAP_OPCODE and CPU._PC in CPU._traps:
+					if CPU._PC not in self._targets:
+						# Any other trap function may use every register
+						recordCall(self._REGISTERS, self._REGISTERS, ())
+				elif effects[opCode] is not None:
+					reading, writing, changing = effects[opCode]
+					used.update(reading - written)
+					written.update(writing)
+					changed.update(changing)
+				if not CPU.step():
+					break
+		finally:
+			self._recording.pop()
+			CPU.removeHook(owner)
+
+		registers = tuple(register for register in self._REGISTERS if register in used)
+		outputs = tuple(register for register in self._REGISTERS if register in changed)
+		if self._recording:
+			# The trap returns with an RTS, which uses the stack pointer
+			self._recording[-1](registers + ("_SP",), outputs + ("_SP",), ())
+		if not completed:
+			# The cycles are already counted, the trap skips the RTS as the program counter moved
+			return 0
+		rts = CPU._instructionCycles[6][0]
+		result = (
+			tuple((register, getattr(CPU, register)) for register in outputs),
+			tuple(writes.items()),
+			CPU._cycles - cycles + rts
+		)
+		layout = (registers, tuple(sorted(reads)))
+		layouts.setdefault(layout, tuple(code.items()))
+		cache[(tuple(entry[register] for register in registers), layout, tuple(reads[a] for a in layout[1]))] = result
+		if len(cache) > self._size:
+			cache.popitem(last=False)
+		return rts
+
+	def _dropLayout(self, cache, layouts, layout):
+		"""
+		Drop the cached results recorded with code bytes that have changed.
+		"""
+		del layouts[layout]
+		for key in [key for key in cache if key[1] == layout]:
+			del cache[key]
+		pass
@@ -0,0 +1,264 @@
+from contextlib import contextmanager
+from mmap import ACCESS_READ, mmap
+from multiprocessing import resource_tracker, shared_memory
+import struct
+import time
+
+_CREATED = set()	# Names of the shared memory blocks created by this process
+
+class memory:
+
+	_MEMORY_SIZE_MAX = int()
+	_PAGE_SIZE = 0x100
+	_DUMP_MAGIC = b"EMUP"
+	_DUMP_VERSION = 1
+	_SHARED_HEADER = 8	# Sequence counter in front of the shared memory data
+	Data = bytearray()
+	Dirty = bytearray()
+
+	def __init__(self, size=0x10000, shared=None):
+		"""
+		Parameters
+		----------
+		size : int, optional
+			Memory size in bytes (default is 0x10000).
+
+		shared : bool or str, optional
+			Back the memory with a shared memory block other processes can attach
+			to by name. True picks a free name, a str uses it as the name (default
+			is a private bytearray).
+		"""
+		self._MEMORY_SIZE_MAX = size
+		self._shared = None
+		self._owner = False
+		if shared:
+			name = shared if isinstance(shared, str) else None
+			self._share(shared_memory.SharedMemory(name=name, create=True, size=self._SHARED_HEADER+size), True)
+			_CREATED.add(self.sharedName)
+		self.memoryClear()
+		pass
+
+	@classmethod
+	def attach(cls, name):
+		"Attach to the shared memory of a memory object in another process"
+		try:
+			block = shared_memory.SharedMemory(name=name, track=False)
+		except TypeError:
+			# Before python 3.13 attaching registers the block to be freed when this process exits.
+			# A block created by this process shares that registration, it is dropped when the creator unlinks it
+			block = shared_memory.SharedMemory(name=name)
+			if block.name not in _CREATED:
+				resource_tracker.unregister(block._name, "shared_memory")
+		self = cls.__new__(cls)
+		self._MEMORY_SIZE_MAX = block.size - cls._SHARED_HEADER
+		self._share(block, False)
+		self.Dirty = bytearray(self._MEMORY_SIZE_MAX // self._PAGE_SIZE)
+		self._dirtyHistory = list()
+		return self
+
+	def _share(self, block, owner):
+		"Use a shared memory block as Data"
+		self._shared = block
+		self._owner = owner
+		self.sharedName = block.name
+		self.Data = block.buf[self._SHARED_HEADER:self._SHARED_HEADER+self._MEMORY_SIZE_MAX]
+
+	def close(self):
+		"Detach from the shared memory, the process that created it also frees it"
+		if self._shared is None:
+			return
+		data = bytearray(self.Data)
+		self.Data.release()
+		self.Data = data
+		self._shared.close()
+		if self._owner:
+			self._shared.unlink()
+			_CREATED.discard(self.sharedName)
+		self._shared = None
+
+	@property
+	def sequence(self):
+		"Update counter of shared memory, odd while an update is in progress"
+		if self._shared is None:
+			return 0
+		return struct.unpack_from("<Q", self._shared.buf, 0)[0]
+
+	@contextmanager
+	def update(self):
+		"Mark a batch of writes, readers of shared memory retry snapshots taken during it. Keep it short, e.g. one quantum of a run, readers wait until it ends"
+		if self._shared is None:
+			yield self
+			return
+		struct.pack_into("<Q", self._shared.buf, 0, self.sequence + 1)
+		try:
+			yield self
+		finally:
+			struct.pack_into("<Q", self._shared.buf, 0, self.sequence + 1)
+
+	def snapshot(self, start=0, end=None):
+		"Copy a range that was not written by an update while copying, sleeping between retries"
+		end = self._MEMORY_SIZE_MAX if end is None else end
+		delay = 0.00005
+		while True:
+			sequence = self.sequence
+			if sequence % 2 == 0:
+				data = bytes(self.Data[start:end])
+				if self.sequence == sequence:
+					return data
+			# Back off up to a millisecond rather than spin against the writer for the GIL and the cache lines
+			time.sleep(delay)
+			delay = min(delay * 2, 0.001)
+
+	def memoryClear(self):
+		"Clear memory to init state"
+		if self._shared is None:
+			self.Data = bytearray(self._MEMORY_SIZE_MAX)
+		else:
+			self.Data[:] = bytes(self._MEMORY_SIZE_MAX)
+		self.Dirty = bytearray(self._MEMORY_SIZE_MAX // self._PAGE_SIZE)
+		self._dirtyHistory = list()
+		pass
+
+	def loadBinary(self, path, address=0):
+		"Load Binary File"
+		with open(path, "rb") as f, mmap(f.fileno(), 0, access=ACCESS_READ) as s:
+			self.load(address, s[:len(self.Data)-address])
+		pass
+
+	def load(self, address, data):
+		"Copy bytes into memory at the address"
+		self._checkRange(address, address+len(data))
+		self.Data[address:address+len(data)] = data
+		self._markDirty(address, address+len(data))
+
+	def read(self, address, length):
+		"Copy bytes out of memory from the address"
+		self._checkRange(address, address+length)
+		return bytes(self.Data[address:address+length])
+
+	def fill(self, start, end, value=0):
+		"Fill the addresses from start up to end with a byte"
+		self._checkRange(start, end)
+		self.Data[start:end] = bytes([value & 0xFF]) * (end - start)
+		self._markDirty(start, end)
+
+	def copy(self, source, destination, length):
+		"Copy a range of memory, overlapping ranges are copied as if through a buffer"
+		self._checkRange(source, source+length)
+		self._checkRange(destination, destination+length)
+		self.Data[destination:destination+length] = self.Data[source:source+length]
+		self._markDirty(destination, destination+length)
+
+	def _checkRange(self, start, end):
+		"Raise a ValueError unless the addresses from start up to end are in memory, slices would resize Data"
+		if not 0 <= start <= end <= len(self.Data):
+			raise ValueError("Addresses ${:04X} to ${:04X} are outside the {} byte memory".format(start, end, len(self.Data)))
+
+	def find(self, pattern, start=0, end=None):
+		"Address of the first match of a byte pattern, -1 when not found"
+		return self._searchable().find(bytes(pattern), start, len(self.Data) if end is None else end)
+
+	def findAll(self, pattern, start=0, end=None):
+		"Addresses of every match of a byte pattern, including overlapping matches"
+		pattern = bytes(pattern)
+		end = len(self.Data) if end is None else end
+		data = self._searchable()
+		matches = list()
+		address = data.find(pattern, start, end)
+		while address != -1:
+			matches.append(address)
+			address = data.find(pattern, address+1, end)
+		return matches
+
+	def _searchable(self):
+		"Data as an object with find(), shared memory has to be copied"
+		return self.Data if isinstance(self.Data, bytearray) else bytes(self.Data)
+
+	def compare(self, first, second, length):
+		"Offset of the first byte that differs between two ranges, -1 when they are equal"
+		a = self._comparable(first, first+length)
+		b = self._comparable(second, second+length)
+		if a == b:
+			return -1
+		low, high = 0, length
+		while high - low > 1:
+			middle = (low + high) // 2
+			if a[low:middle] != b[low:middle]:
+				high = middle
+			else:
+				low = middle
+		return low
+
+	def view(self, start, end):
+		"Writable zero-copy view of a range, writes through it are not tracked as dirty"
+		return memoryview(self.Data)[start:end]
+
+	def _comparable(self, start, end):
+		"A range as an object that compares and slices like bytes"
+		return self.view(start, end)
+
+	def _markDirty(self, start, end):
+		"Mark the pages of a range as written"
+		if end > start:
+			first = start // self._PAGE_SIZE
+			last = (end - 1) // self._PAGE_SIZE
+			self.Dirty[first:last+1] = b"\x01" * (last - first + 1)
+
+	def memoryDump(self, path):
+		"Dump memory to a file"
+		with open(path, "wb") as file:
+			file.write(self.Data)
+
+	def setMarker(self):
+		"Start a new dirty page epoch, returns a marker for `dirtyPages`"
+		self._dirtyHistory.append(frozenset(i for i, dirty in enumerate(self.Dirty) if dirty))
+		self.Dirty[:] = bytes(len(self.Dirty))
+		return len(self._dirtyHistory)
+
+	def dirtyPages(self, marker=0):
+		"List pages written since the marker, or since the memory was cleared"
+		pages = {i for i, dirty in enumerate(self.Dirty) if dirty}
+		for epoch in self._dirtyHistory[marker:]:
+			pages |= epoch
+		return sorted(pages)
+
+	def diffPages(self, image):
+		"List pages that differ from another memory image"
+		if isinstance(image, memory):
+			image = image.Data
+		size = self._PAGE_SIZE
+		return [
+			page for page in range(len(self.Data) // size)
+			if self.Data[page*size:(page+1)*size] != image[page*size:(page+1)*size]
+		]
+
+	def dumpPages(self, path, pages=None):
+		"Dump pages to an incremental dump file, every page when not set"
+		if pages is None:
+			pages = range(len(self.Data) // self._PAGE_SIZE)
+		size = self._PAGE_SIZE
+		with open(path, "wb") as file:
+			file.write(self._DUMP_MAGIC + struct.pack("<BHI", self._DUMP_VERSION, size, len(pages)))
+			for page in pages:
+				file.write(struct.pack("<I", page))
+				file.write(self.Data[page*size:(page+1)*size])
+
+	def memoryDumpIncremental(self, path, marker=None):
+		"Dump the pages written since the marker, or a full base image when not set"
+		self.dumpPages(path, None if marker is None else self.dirtyPages(marker))
+
+	def loadIncremental(self, *paths):
+		"Load a base image and page deltas written by `dumpPages`, in order"
+		for path in paths:
+			with open(path, "rb") as file:
+				header = file.read(11)
+				if header[:4] != self._DUMP_MAGIC:
+					raise ValueError("{} is not a memory dump".format(path))
+				version, size, count = struct.unpack("<BHI", header[4:])
+				if version != self._DUMP_VERSION:
+					raise ValueError("Unsupported memory dump version {}".format(version))
+				for _ in range(count):
+					page = struct.unpack("<I", file.read(4))[0]
+					self.Data[page*size:(page+1)*size] = file.read(size)
+					self.Dirty[page*size // self._PAGE_SIZE] = 1
+		pass
@@ -0,0 +1,255 @@
+import json
+import platform
+import time
+
+from cpu import cpu
+from disassembler import instruction, length
+
+class microbench:
+	"""
+	Per opcode micro benchmark
+	==========================
+	Times every (instruction, addressing mode) pair of the instruction table
+	on every engine. For each opcode a block of `count` copies of the
+	instruction is laid out in memory and run to the unimplemented opcode
+	after it, so the time per instruction includes dispatch but no loop
+	instruction.
+
+	The copies are spaced by the distance the program counter actually moves,
+	the first spacing from the instruction length up to 3 bytes for which
+	the block runs through from start to end is used. Instructions that
+	leave the block (jumps, calls, returns, BRK) or raise are skipped.
+	Branches use a zero offset, so taken and not taken land on the next copy.
+
+	Operands point at $80 on the zero page and $3000, the zero page pointer
+	at $80 also points at $3000. Code starts at $4000.
+
+	Methods
+	-------
+	program(opCode)
+		Lay out the block of an opcode.
+
+	measure(engines, opCodes)
+		Time the opcodes on the engines.
+
+	table()
+		The matrix as text.
+
+	save(path)
+		Write the matrix as JSON.
+
+	compare(baseline, threshold)
+		Opcodes that got slower than in a baseline matrix.
+	"""
+
+	ENGINES = ("run", "execute", "step")
+
+	_CODE = 0x4000
+	_ZERO_PAGE = 0x80
+	_ABSOLUTE = 0x3000
+
+	def __init__(self, cls=cpu, count=1000, repeat=5):
+		"""
+		Parameters
+		----------
+		cls : type, optional
+			Cpu class or variant to benchmark (default is `cpu`).
+
+		count : int, optional
+			Copies of the instruction in a block (default is 1000).
+
+		repeat : int, optional
+			Runs per opcode and engine, the fastest is kept (default is 5).
+		"""
+		self._cls = cls
+		self._count = count
+		self._repeat = repeat
+		self._cpu = cls()
+		self.matrix = {"variant": cls._VARIANT, "python": platform.python_version(), "count": count, "opcodes": {}, "skipped": {}}
+		pass
+
+	def _reset(self, flags):
+		"""
+		Registers, flags and pointers before a block runs.
+		"""
+		CPU = self._cpu
+		CPU.writeState((self._CODE, 0x01FF, 0, 0, 0) + (flags,) * 7 + (0,))
+		data = CPU._memory.Data
+		data[self._ZERO_PAGE] = self._ABSOLUTE & 0xFF
+		data[self._ZERO_PAGE+1] = self._ABSOLUTE >> 8
+		pass
+
+	def _layout(self, opCode, stride):
+		"""
+		Write `count` copies of an opcode spaced by stride, returns the end of the block.
+		"""
+		data = self._cpu._memory.Data
+		size = length(opCode, self._cls)
+		mnemonic, mode = instruction(opCode, cls=self._cls)
+		if mode == "Relative":
+			operand = [0]
+		elif size == 2:
+			operand = [self._ZERO_PAGE]
+		else:
+			operand = [self._ABSOLUTE & 0xFF, self._ABSOLUTE >> 8][:size-1]
+		copy = bytes([opCode] + operand + [0xEA] * (stride - size))
+		end = self._CODE + stride * self._count
+		data[self._CODE:end] = copy * self._count
+		data[end] = self._cls._TRAP_OPCODE
+		return end
+
+	def program(self, opCode):
+		"""
+		Lay out the block of an opcode.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode to benchmark.
+
+		Returns
+		-------
+		tuple
+			The initial flags and the end of the block, None if the block does not run through or raises.
+		"""
+		CPU = self._cpu
+		for stride in range(length(opCode, self._cls), 4):
+			for flags in (0, 1):
+				end = self._layout(opCode, stride)
+				self._reset(flags)
+				retired = CPU._retired
+				try:
+					while CPU._PC != end and CPU.step():
+						if CPU._retired - retired > self._count:
+							break
+				except Exception:
+					# Handlers that fail are reported as skipped
+					return None
+				if CPU._PC == end and CPU._retired - retired == self._count:
+					return (flags, end)
+		return None
+
+	def _time(self, engine, flags, end):
+		"""
+		Fastest run of the current block on an engine, in nanoseconds.
+		"""
+		CPU = self._cpu
+		clock = time.perf_counter_ns
+		best = None
+		for _ in range(self._repeat):
+			self._reset(flags)
+			if engine == "run":
+				start = clock()
+				CPU.run()
+				elapsed = clock() - start
+			elif engine == "execute":
+				start = clock()
+				CPU.execute()
+				elapsed = clock() - start
+			else:
+				step = CPU.step
+				start = clock()
+				while step():
+					pass
+				elapsed = clock() - start
+			if CPU._PC != end:
+				raise RuntimeError("Block of ${:02X} stopped at ${:04X} on {}".format(CPU._memory.Data[self._CODE], CPU._PC, engine))
+			best = elapsed if best is None else min(best, elapsed)
+		return best
+
+	def measure(self, engines=ENGINES, opCodes=None):
+		"""
+		Time the opcodes on the engines and add them to the matrix.
+
+		Parameters
+		----------
+		engines : tuple, optional
+			Engines to time, from `ENGINES` (default is all of them).
+
+		opCodes : list, optional
+			Opcodes to time (default is every implemented opcode).
+
+		Returns
+		-------
+		dict
+			The matrix, {"opcodes": {"A5": {"name": "LDA ZeroPage", "ns": {engine: ns per instruction}}}, "skipped": {...}}.
+		"""
+		for engine in engines:
+			if engine not in self.ENGINES:
+				raise ValueError("Unknown engine {!r}, expected one of {}".format(engine, ", ".join(self.ENGINES)))
+		if opCodes is None:
+			opCodes = [opCode for opCode in range(0x100) if self._cls._handlers[opCode] is not None]
+		for opCode in opCodes:
+			key = "{:02X}".format(opCode)
+			name = " ".join(instruction(opCode, cls=self._cls))
+			block = self.program(opCode)
+			if block is None:
+				self.matrix["skipped"][key] = name
+				continue
+			entry = self.matrix["opcodes"].setdefault(key, {"name": name, "ns": {}})
+			for engine in engines:
+				entry["ns"][engine] = self._time(engine, *block) / self._count
+		return self.matrix
+
+	def table(self):
+		"""
+		The matrix as text, one line per opcode with the fastest engine.
+
+		Returns
+		-------
+		str
+			The table.
+		"""
+		engines = [engine for engine in self.ENGINES if any(engine in entry["ns"] for entry in self.matrix["opcodes"].values())]
+		lines = ["{:<3} {:<20}".format("op", "instruction") + "".join("{:>10}".format(engine) for engine in engines) + "  fastest"]
+		for key, entry in sorted(self.matrix["opcodes"].items()):
+			times = entry["ns"]
+			lines.append("{:<3} {:<20}".format(key, entry["name"]) + "".join("{:>10.1f}".format(times[engine]) if engine in times else "{:>10}".format("-") for engine in engines) + "  " + min(times, key=times.get))
+		for key, name in sorted(self.matrix["skipped"].items()):
+			lines.append("{:<3} {:<20} skipped".format(key, name))
+		return "\n".join(lines)
+
+	def save(self, path):
+		"""
+		Write the matrix as JSON.
+
+		Parameters
+		----------
+		path : str
+			Path of the JSON file.
+		"""
+		with open(path, "w") as file:
+			json.dump(self.matrix, file, indent="\t")
+		pass
+
+	def compare(self, baseline, threshold=0.1):
+		"""
+		Opcodes that got slower than in a baseline matrix.
+
+		Parameters
+		----------
+		baseline : dict or str
+			Baseline matrix or the path of its JSON file.
+
+		threshold : float, optional
+			Slowdown to report, 0.1 reports 10% slower and more (default is 0.1).
+
+		Returns
+		-------
+		list
+			(opcode, name, engine, baseline ns, current ns, ratio), the largest slowdown first.
+		"""
+		if isinstance(baseline, str):
+			with open(baseline) as file:
+				baseline = json.load(file)
+		slower = []
+		for key, entry in self.matrix["opcodes"].items():
+			before = baseline["opcodes"].get(key)
+			if before is None:
+				continue
+			for engine, ns in entry["ns"].items():
+				old = before["ns"].get(engine)
+				if old and ns / old > 1 + threshold:
+					slower.append((key, entry["name"], engine, old, ns, ns / old))
+		slower.sort(key=lambda item: item[5], reverse=True)
+		return slower
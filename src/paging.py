@@ -0,0 +1,205 @@
+"""
+Paged memory access
+===================
+Memories that map the 64 KB address space through a page table, such as
+`bankedmemory` and `sparsememory`, have `Read` and `Write` lists of 256
+views of 256 bytes each, the same pages `Dirty` marks. A cpu created with
+such a memory (`cpu(ram=...)`) is a subclass that reads and writes
+through the tables, with its own generated run loop. Changing an entry of
+a table maps another page in O(1), the run loop sees the change on its
+next access because it holds the lists, not the pages.
+
+A `Write` entry of None sends writes to the page to `writeFault(address,
+value)` of the memory, for read only pages, control registers or pages
+that are allocated on the first write.
+
+`Data` of a paged memory is a `pagedview`, which reads and writes the
+pages mapped at the moment. Tools that patch or inspect `Data`, such as
+traps, breakpoints and the memoiser, follow the page table with it.
+"""
+
+from generator import generateCore
+from memory import memory
+
+class pagedview:
+	"""
+	Address space of a paged memory as a bytearray-like object.
+
+	Reads and writes go to the pages mapped at the moment. Writes bypass
+	`writeFault`, so they patch read only pages and do not trigger control
+	registers. Slices return bytes.
+	"""
+
+	def __init__(self, memory):
+		self._memory = memory
+		self._read = memory.Read
+		pass
+
+	def __len__(self):
+		return 0x10000
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(0x10000)
+			if step != 1:
+				return bytes(self[address] for address in range(start, stop, step))
+			pieces = list()
+			while start < stop:
+				end = min(stop, (start | 0xFF) + 1)
+				pieces.append(self._read[start >> 8][start & 0xFF:(end - 1 & 0xFF) + 1])
+				start = end
+			return b"".join(pieces)
+		return self._read[index >> 8][index & 0xFF]
+
+	def __setitem__(self, index, value):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(0x10000)
+			value = bytes(value)
+			if step != 1 or len(value) != len(range(start, stop, step)):
+				raise ValueError("Paged memory only takes slices of the same length")
+			offset = 0
+			while start < stop:
+				end = min(stop, (start | 0xFF) + 1)
+				self._memory._pokePage(start >> 8)[start & 0xFF:(end - 1 & 0xFF) + 1] = value[offset:offset + end - start]
+				offset += end - start
+				start = end
+			return
+		self._memory._pokePage((index >> 8) & 0xFF)[index & 0xFF] = value
+
+	def __bytes__(self):
+		return self[:]
+
+class pagedmemory(memory):
+	"""
+	Base of the paged memories. Subclasses set up `Read`, `Write` and `Data`
+	in `memoryClear` and provide `writeFault` and `_pokePage`, the page a
+	write through `Data` goes to.
+	"""
+
+	def writeFault(self, address, value):
+		"Write to a page without a direct write entry"
+		raise NotImplementedError
+
+	def _pokePage(self, page):
+		"Page to write to through Data"
+		raise NotImplementedError
+
+	def memoryDump(self, path):
+		"Dump the address space as mapped to a file"
+		with open(path, "wb") as file:
+			file.write(bytes(self.Data))
+
+	def view(self, start, end):
+		"Writable zero-copy view of a range inside one page, the page Data writes to, writes through it are not tracked as dirty"
+		if end <= start:
+			return memoryview(bytearray())
+		if start >> 8 != (end - 1) >> 8:
+			# The pages of a range need not be next to each other, read Data[start:end] for a copy
+			raise ValueError("View from ${:04X} to ${:04X} crosses a page of paged memory".format(start, end))
+		return memoryview(self._pokePage(start >> 8))[start & 0xFF:((end - 1) & 0xFF) + 1]
+
+	def _comparable(self, start, end):
+		"A range as bytes, the pages are copied"
+		return self.Data[start:end]
+
+	def _searchable(self):
+		"Data as an object with find()"
+		return bytes(self.Data)
+
+class paged:
+	"""
+	Memory methods of a cpu on a paged memory. `pagedClass` mixes it into a cpu class.
+	"""
+
+	def readByte(self, address: int):
+		"""
+		Read 1 byte from the page mapped at the address.
+
+		Parameters
+		----------
+		address : int
+			Address in memory.
+
+		Returns
+		-------
+		int
+			1 byte value in the memory on the specified memory address.
+		"""
+		return self._memory.Read[address >> 8][address & 0xFF]
+
+	def readWord(self, address: int):
+		"""
+		Read 2 bytes from the pages mapped at the address.
+
+		Parameters
+		----------
+		address : int
+			Address in memory.
+
+		Returns
+		-------
+		int
+			2 byte value in the memory on the specified memory address.
+		"""
+		return self.readByte(address) + self.readByte(address+1)*0x0100
+
+	def writeByte(self, address: int, value: int):
+		"""
+		Write 1 byte to the page mapped at the address, or to the write fault handler of the memory.
+
+		Parameters
+		----------
+		address : int
+			Address in memory.
+
+		value : int
+			1 byte value to write to the address.
+		"""
+		page = self._memory.Write[address >> 8]
+		if page is None:
+			self._memory.writeFault(address, value & 0b11111111)
+		else:
+			page[address & 0xFF] = value & 0b11111111
+			self._memory.Dirty[address >> 8] = 1
+		pass
+
+	def writeWord(self, address: int, value: int):
+		"""
+		Write 2 bytes to the pages mapped at the address.
+
+		Parameters
+		----------
+		address : int
+			Address in memory.
+
+		value : int
+			2 byte value to write to the address.
+		"""
+		self.writeByte(address, value)
+		self.writeByte(address+1, value >> 8)
+		pass
+
+_CLASSES = dict()
+
+def pagedClass(base):
+	"""
+	Cpu class that runs on paged memory, made once per base class.
+
+	Parameters
+	----------
+	base : type
+		Cpu class or variant.
+
+	Returns
+	-------
+	type
+		Subclass of base with the memory methods of `paged` and a run loop generated for them.
+	"""
+	if issubclass(base, paged):
+		return base
+	if base not in _CLASSES:
+		cls = type("paged" + base.__name__, (paged, base), {"__doc__": base.__doc__})
+		# The handlers call the memory methods, only the run loop inlines them
+		cls._runCore = generateCore(cls)
+		_CLASSES[base] = cls
+	return _CLASSES[base]
@@ -0,0 +1,230 @@
+import json
+
+class profiler:
+	"""
+	Guest call-graph profiler
+	=========================
+	Runs a cpu while keeping a shadow call stack of the guest. A JSR pushes a
+	frame holding the stack pointer before the call, an interrupt pushes a
+	frame for its handler. Whenever the stack pointer rises to or above the
+	stack pointer of a frame, the frame has returned. This follows RTS and RTI
+	and also routines that drop their return address with PLA, PLA or TXS.
+	An RTS to an address pushed by the routine itself (RTS as a jump) leaves
+	the stack pointer below the frame, so it stays in the same routine.
+
+	Cycles are attributed to the routine on top of the shadow stack
+	(exclusive) and to every routine on the stack (inclusive, counted once
+	per routine when it recurses).
+
+	Methods
+	-------
+	step()
+		Execute and profile one instruction.
+
+	execute(count)
+		Execute and profile until the cpu halts or `count` is reached.
+
+	report()
+		Calls, inclusive and exclusive cycles per routine, ready for JSON.
+
+	table(limit)
+		The report as text, ranked by inclusive cycles.
+
+	folded()
+		Stacks in the folded format of flame graph tools.
+
+	saveFolded(path)
+		Write the folded stacks to a file.
+
+	saveJSON(path)
+		Write the report as JSON.
+	"""
+
+	def __init__(self, cpu, names=None, root="main"):
+		"""
+		Parameters
+		----------
+		cpu : cpu
+			The cpu to run.
+
+		names : dict or symbols, optional
+			Routine name per entry address, or a symbol table whose exact matches
+			name them (default names routines "sub_XXXX").
+
+		root : str, optional
+			Name of the code outside every routine (default is "main").
+		"""
+		self._cpu = cpu
+		self._names = names.labels() if hasattr(names, "labels") else dict(names or {})
+		self._root = root
+		self._stack = list()	# (name, stack pointer before the call, cycles at entry)
+		self._path = (root,)
+		self._onStack = {root: 1}
+		self._calls = dict()
+		self._inclusive = dict()
+		self._exclusive = dict()
+		self._folded = dict()
+		self._interrupts = cpu._interrupts
+		pass
+
+	def _name(self, address):
+		"""
+		Name of the routine at the entry address.
+		"""
+		name = self._names.get(address)
+		if name is None:
+			name = self._names[address] = "sub_{:04X}".format(address)
+		return name
+
+	def _push(self, entry, sp):
+		"""
+		Enter the routine at the entry address, it returns once the stack pointer reaches sp.
+		"""
+		name = self._name(entry)
+		self._stack.append((name, sp, self._cpu._cycles))
+		self._path += (name,)
+		self._onStack[name] = self._onStack.get(name, 0) + 1
+		self._calls[name] = self._calls.get(name, 0) + 1
+		pass
+
+	def _unwind(self, sp, cycles):
+		"""
+		Return from every frame the stack pointer has risen past.
+		"""
+		stack = self._stack
+		while stack and stack[-1][1] <= sp:
+			name, _, entered = stack.pop()
+			self._path = self._path[:-1]
+			self._onStack[name] -= 1
+			if not self._onStack[name]:
+				self._inclusive[name] = self._inclusive.get(name, 0) + cycles - entered
+		pass
+
+	def step(self):
+		"""
+		Execute and profile one instruction.
+
+		Returns
+		-------
+		bool
+			False if the current instruction is not implemented, otherwise True.
+		"""
+		CPU = self._cpu
+		if CPU._interrupts != self._interrupts:
+			# Interrupt taken since the last step, its handler returns above the pushed status and address
+			self._interrupts = CPU._interrupts
+			self._push(CPU._PC, CPU._SP + 3)
+		sp = CPU._SP
+		cycles = CPU._cycles
+		opCode = CPU._memory.Data[CPU._PC]
+		if not CPU.step():
+			return False
+		used = CPU._cycles - cycles
+		path = self._path
+		self._folded[path] = self._folded.get(path, 0) + used
+		top = path[-1]
+		self._exclusive[top] = self._exclusive.get(top, 0) + used
+		if opCode == 0x20 and CPU._SP < sp:
+			self._push(CPU._PC, sp)
+		elif CPU._SP > sp:
+			self._unwind(CPU._SP, CPU._cycles)
+		return True
+
+	def execute(self, count=None):
+		"""
+		Execute and profile until the cpu halts or `count` is reached.
+
+		Parameters
+		----------
+		count : int, optional
+			Instructions to execute (default is no limit).
+		"""
+		step = self.step
+		executed = 0
+		while (count is None or executed < count) and step():
+			executed += 1
+		pass
+
+	def report(self):
+		"""
+		Calls, inclusive and exclusive cycles per routine, ready for JSON.
+		Routines still on the shadow stack count their cycles up to now.
+
+		Returns
+		-------
+		dict
+			Routine name to {"calls", "inclusive", "exclusive"}, ranked by inclusive cycles.
+		"""
+		cycles = self._cpu._cycles
+		inclusive = dict(self._inclusive)
+		seen = set()
+		for name, _, entered in self._stack:
+			if name not in seen:
+				seen.add(name)
+				inclusive[name] = inclusive.get(name, 0) + cycles - entered
+		inclusive[self._root] = sum(self._exclusive.values())
+		names = sorted(set(inclusive) | set(self._exclusive), key=lambda name: inclusive.get(name, 0), reverse=True)
+		return {
+			name: {
+				"calls": self._calls.get(name, 0),
+				"inclusive": inclusive.get(name, 0),
+				"exclusive": self._exclusive.get(name, 0)
+			}
+			for name in names
+		}
+
+	def table(self, limit=None):
+		"""
+		The report as text, ranked by inclusive cycles.
+
+		Parameters
+		----------
+		limit : int, optional
+			Number of routines to show (default is every routine).
+
+		Returns
+		-------
+		str
+			One line per routine.
+		"""
+		lines = ["{:<24} {:>8} {:>12} {:>12}".format("routine", "calls", "inclusive", "exclusive")]
+		for name, entry in list(self.report().items())[:limit]:
+			lines.append("{:<24} {:>8} {:>12} {:>12}".format(name, entry["calls"], entry["inclusive"], entry["exclusive"]))
+		return "\n".join(lines)
+
+	def folded(self):
+		"""
+		Stacks in the folded format of flame graph tools.
+
+		Returns
+		-------
+		str
+			One "root;caller;callee cycles" line per stack.
+		"""
+		return "".join("{} {}\n".format(";".join(path), cycles) for path, cycles in sorted(self._folded.items()) if cycles)
+
+	def saveFolded(self, path):
+		"""
+		Write the folded stacks to a file, e.g. for flamegraph.pl or speedscope.
+
+		Parameters
+		----------
+		path : str
+			Path of the folded stacks file.
+		"""
+		with open(path, "w") as file:
+			file.write(self.folded())
+		pass
+
+	def saveJSON(self, path):
+		"""
+		Write the report as JSON.
+
+		Parameters
+		----------
+		path : str
+			Path of the JSON file.
+		"""
+		with open(path, "w") as file:
+			json.dump(self.report(), file, indent="\t")
+		pass
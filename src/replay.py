@@ -0,0 +1,385 @@
+import struct
+
+_MAGIC = b"EMUR"
+_VERSION = 1
+_EVENT = struct.Struct("<IBB")	# Cycles since the previous event, channel, value
+
+class recorder:
+	"""
+	External input recorder
+	=======================
+	Logs every external input of a run with its cycle stamp, so a `replayer`
+	can feed the same inputs back and the run produces the same instruction
+	stream. Devices attached through `attachDevice` have their reads recorded
+	from both `step()` and `run()`, other read functions are wrapped with
+	`input`. Interrupts are recorded by asserting them through `irq` and `nmi`.
+
+	Methods
+	-------
+	attachDevice(device, start, end, channel)
+		Attach a device to the cpu and record the values it returns.
+
+	input(channel, function)
+		Wrap a device read function so every value it returns is recorded.
+
+	irq()
+		Assert and record an interrupt request.
+
+	nmi()
+		Assert and record a non-maskable interrupt.
+
+	save(path)
+		Write the recorded inputs to a file.
+	"""
+
+	def __init__(self, cpu):
+		"""
+		Parameters
+		----------
+		cpu : cpu
+			The cpu whose cycle count stamps the inputs.
+		"""
+		self._cpu = cpu
+		self._channels = ["irq", "nmi"]
+		self._indices = {"irq": 0, "nmi": 1}
+		self._events = bytearray()
+		self._cycles = cpu._cycles
+		self._start = cpu._cycles
+		pass
+
+	def attachDevice(self, device, start: int, end: int, channel=None):
+		"""
+		Attach a device to the cpu and record the values it returns.
+
+		Parameters
+		----------
+		device : object
+			Device with `read` and `write` methods, see `cpu.attachDevice`.
+
+		start : int
+			First address of the device.
+
+		end : int
+			Address after the last address of the device.
+
+		channel : str, optional
+			Name of the input, the same name is used to replay it (default is the class name of the device and its start address).
+		"""
+		index = self._channel(_channelName(device, start, channel))
+		self._cpu.attachDevice(_recordedDevice(device, lambda value: self._record(index, value)), start, end)
+		pass
+
+	def input(self, channel: str, function):
+		"""
+		Wrap a device read function so every value it returns is recorded.
+
+		Parameters
+		----------
+		channel : str
+			Name of the input, the same name is used to replay it.
+
+		function : callable
+			Function without arguments returning a byte.
+
+		Returns
+		-------
+		callable
+			The recording function.
+		"""
+		index = self._channel(channel)
+
+		def read():
+			value = function()
+			self._record(index, value)
+			return value
+		return read
+
+	def irq(self):
+		"""
+		Assert and record an interrupt request.
+
+		Returns
+		-------
+		bool
+			True if the interrupt was taken.
+		"""
+		cycles = self._cpu._cycles
+		taken = self._cpu.irq()
+		self._record(0, int(taken), cycles)
+		return taken
+
+	def nmi(self):
+		"""
+		Assert and record a non-maskable interrupt.
+		"""
+		self._record(1, 1)
+		self._cpu.nmi()
+		pass
+
+	def save(self, path):
+		"""
+		Write the recorded inputs to a file.
+
+		Parameters
+		----------
+		path : str
+			Path of the recording.
+		"""
+		with open(path, "wb") as file:
+			file.write(_MAGIC + struct.pack("<BQB", _VERSION, self._start, len(self._channels)))
+			for channel in self._channels:
+				name = channel.encode("utf-8")
+				file.write(struct.pack("<B", len(name)) + name)
+			file.write(self._events)
+		pass
+
+	def _channel(self, channel: str):
+		"""
+		Index of a channel, registering it when new. Index 0xFF is reserved for padding events.
+		"""
+		index = self._indices.get(channel)
+		if index is None:
+			if len(self._channels) >= 0xFF:
+				raise ValueError("Too many input channels")
+			index = len(self._channels)
+			self._channels.append(channel)
+			self._indices[channel] = index
+		return index
+
+	def _record(self, index: int, value: int, cycles=None):
+		"""
+		Append an event stamped with the cycle count, the current one when not set.
+		"""
+		if cycles is None:
+			cycles = self._cpu._cycles
+		delta = cycles - self._cycles
+		while delta > 0xFFFFFFFF:
+			self._events += _EVENT.pack(0xFFFFFFFF, 0xFF, 0)
+			delta -= 0xFFFFFFFF
+		self._events += _EVENT.pack(delta, index, value & 0xFF)
+		self._cycles = cycles
+		pass
+
+class replayer:
+	"""
+	External input replayer
+	=======================
+	Feeds back the inputs logged by a `recorder`. Device reads return the
+	recorded values and interrupts are asserted on the recorded cycle, by
+	`step()`, `execute()` and `run()` alike. A read on a different cycle or
+	channel than recorded means the run diverged and raises a RuntimeError.
+
+	Methods
+	-------
+	attachDevice(device, start, end, channel)
+		Attach a device whose reads return the recorded values.
+
+	input(channel)
+		Function returning the recorded values of a device read.
+
+	step()
+		Assert interrupts that are due, then execute one instruction.
+
+	execute()
+		Replay until the cpu halts.
+
+	run(cycles)
+		Replay on the run loop until the cpu halts or the cycles have elapsed.
+	"""
+
+	def __init__(self, cpu, path):
+		"""
+		Parameters
+		----------
+		cpu : cpu
+			The cpu to replay on. It must be in the state the recording started from.
+
+		path : str
+			Path of the recording.
+		"""
+		self._cpu = cpu
+		with open(path, "rb") as file:
+			data = file.read()
+		if data[:4] != _MAGIC:
+			raise ValueError("{} is not an input recording".format(path))
+		version, cycles, count = struct.unpack_from("<BQB", data, 4)
+		if version != _VERSION:
+			raise ValueError("Unsupported recording version {}".format(version))
+		offset = 14
+		self._channels = list()
+		for _ in range(count):
+			length = data[offset]
+			self._channels.append(data[offset+1:offset+1+length].decode("utf-8"))
+			offset += 1 + length
+
+		self._events = list()
+		for delta, index, value in _EVENT.iter_unpack(data[offset:]):
+			cycles += delta
+			if index != 0xFF:
+				self._events.append((cycles, index, value))
+		self._position = 0
+		pass
+
+	def attachDevice(self, device, start: int, end: int, channel=None):
+		"""
+		Attach a device whose reads return the recorded values. Writes still go to the device.
+
+		Parameters
+		----------
+		device : object
+			The device attached to the `recorder`, or one with the same class when `channel` is not set.
+
+		start : int
+			First address of the device.
+
+		end : int
+			Address after the last address of the device.
+
+		channel : str, optional
+			Name the input was recorded with (default is the class name of the device and its start address).
+		"""
+		read = self.input(_channelName(device, start, channel))
+		self._cpu.attachDevice(_replayedDevice(device, read), start, end)
+		pass
+
+	def input(self, channel: str):
+		"""
+		Function returning the recorded values of a device read.
+
+		Parameters
+		----------
+		channel : str
+			Name the input was recorded with.
+
+		Returns
+		-------
+		callable
+			Function without arguments returning the next recorded byte.
+		"""
+		index = self._channels.index(channel)
+
+		def read():
+			cycles, recorded, value = self._next()
+			if recorded != index or cycles != self._cpu._cycles:
+				raise RuntimeError("Replay diverged on cycle {}: read {} but recorded {} on cycle {}".format(
+					self._cpu._cycles, channel, self._channels[recorded], cycles))
+			self._position += 1
+			return value
+		return read
+
+	def step(self):
+		"""
+		Assert interrupts that are due, then execute one instruction.
+
+		Returns
+		-------
+		bool
+			False if the current instruction is not implemented, otherwise True.
+		"""
+		self._interrupt()
+		return self._cpu.step()
+
+	def execute(self):
+		"""
+		Replay until the cpu halts.
+		"""
+		while self.step():
+			pass
+		pass
+
+	def run(self, cycles=None):
+		"""
+		Replay on the run loop until the cpu halts or the cycles have elapsed.
+		The run loop stops on the cycle of every recorded interrupt to assert it.
+
+		Parameters
+		----------
+		cycles : int, optional
+			Stop once this many clock cycles have elapsed (default is no limit).
+		"""
+		CPU = self._cpu
+		stop = None if cycles is None else CPU._cycles + cycles
+		while stop is None or CPU._cycles < stop:
+			self._interrupt()
+			due = self._due()
+			end = stop if due is None else due if stop is None else min(due, stop)
+			CPU.run(cycles=None if end is None else end - CPU._cycles)
+			if end is None or CPU._cycles < end:
+				# Stopped before the budget, on an instruction that is not implemented
+				break
+		pass
+
+	def _interrupt(self):
+		"""
+		Assert the interrupts recorded up to the current cycle.
+		"""
+		CPU = self._cpu
+		while self._position < len(self._events):
+			cycles, index, value = self._events[self._position]
+			if index > 1 or cycles > CPU._cycles:
+				break
+			self._position += 1
+			if index == 0:
+				if CPU.irq() != bool(value):
+					raise RuntimeError("Replay diverged on cycle {}: interrupt request was {}".format(
+						CPU._cycles, "ignored" if value else "taken"))
+			else:
+				CPU.nmi()
+		pass
+
+	def _due(self):
+		"""
+		Cycle of the next recorded interrupt, None when there is none.
+		"""
+		for cycles, index, value in self._events[self._position:]:
+			if index <= 1:
+				return cycles
+		return None
+
+	def _next(self):
+		"""
+		Next recorded event.
+		"""
+		if self._position >= len(self._events):
+			raise RuntimeError("Replay diverged on cycle {}: no more recorded inputs".format(self._cpu._cycles))
+		return self._events[self._position]
+
+def _channelName(device, start: int, channel):
+	"""
+	Channel of a device, the class name and start address unless named.
+	"""
+	return channel if channel is not None else "{}@{:04X}".format(type(device).__name__, start)
+
+class _recordedDevice:
+	"""
+	Device passing the values read from another device to a record function.
+	"""
+
+	def __init__(self, device, record):
+		self._device = device
+		self._record = record
+
+	def read(self, address: int):
+		value = self._device.read(address) & 0xFF
+		self._record(value)
+		return value
+
+	def write(self, address: int, value: int):
+		self._device.write(address, value)
+		pass
+
+class _replayedDevice:
+	"""
+	Device returning recorded values for its reads and passing writes to another device.
+	"""
+
+	def __init__(self, device, read):
+		self._device = device
+		self._read = read
+
+	def read(self, address: int):
+		return self._read()
+
+	def write(self, address: int, value: int):
+		self._device.write(address, value)
+		pass
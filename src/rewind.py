@@ -0,0 +1,205 @@
+from bisect import bisect_right
+
+class rewind:
+	"""
+	Rewind debugger
+	===============
+	Runs a cpu while keeping enough history to step backwards. Every `interval`
+	instructions a keyframe stores the full cpu state and memory. Between
+	keyframes a journal stores, per instruction, the registers that changed
+	and the bytes that were written. Rewinding restores one keyframe and
+	replays at most `interval` journal entries, without executing any code.
+
+	Attributes
+	----------
+	position : int
+		Number of instructions executed since the rewinder was attached.
+
+	Methods
+	-------
+	step()
+		Execute one instruction and record it.
+
+	run(count)
+		Execute and record instructions until the cpu halts or `count` is reached.
+
+	rewindTo(position)
+		Restore the cpu and memory to the state before the instruction on the position.
+
+	stepBack(count)
+		Rewind a number of instructions.
+
+	close()
+		Stop recording writes.
+	"""
+
+	_KEYFRAME_OVERHEAD = 256	# Estimated bytes of a keyframe besides the memory image
+	_ENTRY_SIZE = 64			# Estimated bytes of a journal entry without its changes
+	_CHANGE_SIZE = 16			# Estimated bytes of one register change or memory write
+
+	def __init__(self, cpu, interval=1000, limit=0x4000000):
+		"""
+		Parameters
+		----------
+		cpu : cpu
+			The cpu to record.
+
+		interval : int, optional
+			Instructions between keyframes, the most instructions a rewind replays (default is 1000).
+
+		limit : int, optional
+			Estimated bytes of history to keep, the oldest keyframes are dropped first (default is 64 MB).
+		"""
+		self._cpu = cpu
+		self._interval = interval
+		self._limit = limit
+		self._segments = list()	# [position, state, memory image, journal]
+		self._positions = list()
+		self._size = 0
+		self._writes = list()
+		self.position = 0
+
+		writes = self._writes
+
+		def journalByte(writeByte):
+			def journalByte(address, value):
+				writeByte(address, value)
+				writes.append((address, cpu._memory.Data[address]))
+			return journalByte
+
+		def journalWord(writeWord):
+			def journalWord(address, value):
+				writeWord(address, value)
+				writes.append((address, cpu._memory.Data[address]))
+				writes.append((address+1, cpu._memory.Data[address+1]))
+			return journalWord
+
+		cpu.addHook(self, "writeByte", journalByte)
+		cpu.addHook(self, "writeWord", journalWord)
+		pass
+
+	def close(self):
+		"""
+		Stop recording writes. The history can still be rewound. Closing again does nothing.
+		"""
+		self._cpu.removeHook(self)
+		pass
+
+	def step(self):
+		"""
+		Execute one instruction and record it.
+
+		Returns
+		-------
+		bool
+			False if the current instruction is not implemented, otherwise True.
+		"""
+		CPU = self._cpu
+		if not self._segments or (self.position % self._interval == 0 and self._positions[-1] != self.position):
+			self._keyframe()
+		segment = self._segments[-1]
+		before = CPU.readState()
+		del self._writes[:]
+		if not CPU.step():
+			return False
+		after = CPU.readState()
+		changes = tuple((i, value) for i, (value, old) in enumerate(zip(after, before)) if value != old)
+		writes = tuple(self._writes)
+		segment[3].append((changes, writes))
+		self.position += 1
+		self._size += self._ENTRY_SIZE + self._CHANGE_SIZE * (len(changes) + len(writes))
+		self._trim()
+		return True
+
+	def run(self, count=None):
+		"""
+		Execute and record instructions until the cpu halts or `count` is reached.
+
+		Parameters
+		----------
+		count : int, optional
+			Maximum instructions to execute (default is no limit).
+		"""
+		while count is None or count > 0:
+			if not self.step():
+				break
+			if count is not None:
+				count -= 1
+		pass
+
+	def rewindTo(self, position: int):
+		"""
+		Restore the cpu and memory to the state before the instruction on the position.
+		History after the position is dropped.
+
+		Parameters
+		----------
+		position : int
+			Instruction number, between the oldest kept keyframe and the current position.
+		"""
+		if not self._segments or position < self._positions[0] or position > self.position:
+			raise ValueError("Position {} is not in the recorded history".format(position))
+		index = bisect_right(self._positions, position) - 1
+		start, state, image, journal = self._segments[index]
+
+		CPU = self._cpu
+		memory = CPU._memory
+		for page in memory.diffPages(image):
+			memory.Dirty[page] = 1
+		memory.Data[:] = image
+		state = list(state)
+		data = memory.Data
+		for changes, writes in journal[:position-start]:
+			for i, value in changes:
+				state[i] = value
+			for address, value in writes:
+				data[address] = value
+		CPU.writeState(state)
+
+		for segment in self._segments[index+1:]:
+			self._size -= self._segmentSize(segment)
+		del self._segments[index+1:]
+		del self._positions[index+1:]
+		for entry in journal[position-start:]:
+			self._size -= self._entrySize(entry)
+		del journal[position-start:]
+		self.position = position
+		pass
+
+	def stepBack(self, count=1):
+		"""
+		Rewind a number of instructions.
+
+		Parameters
+		----------
+		count : int, optional
+			Instructions to go back (default is 1).
+		"""
+		self.rewindTo(self.position - count)
+		pass
+
+	def _keyframe(self):
+		"""
+		Start a new segment with the full cpu state and memory.
+		"""
+		memory = self._cpu._memory
+		segment = [self.position, self._cpu.readState(), bytes(memory.Data), list()]
+		self._segments.append(segment)
+		self._positions.append(self.position)
+		self._size += self._KEYFRAME_OVERHEAD + len(memory.Data)
+		pass
+
+	def _trim(self):
+		"""
+		Drop the oldest segments until the history fits in the limit. The current segment is always kept.
+		"""
+		while self._size > self._limit and len(self._segments) > 1:
+			self._size -= self._segmentSize(self._segments.pop(0))
+			self._positions.pop(0)
+		pass
+
+	def _segmentSize(self, segment):
+		return self._KEYFRAME_OVERHEAD + len(segment[2]) + sum(self._entrySize(entry) for entry in segment[3])
+
+	def _entrySize(self, entry):
+		return self._ENTRY_SIZE + self._CHANGE_SIZE * (len(entry[0]) + len(entry[1]))
@@ -0,0 +1,260 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+class runner:
+	"""
+	Background runner
+	=================
+	Runs a cpu on a worker thread in quanta of clock cycles, on its fastest
+	engine. Other threads control it through a command queue the worker
+	only looks at between quanta, so nothing is locked per instruction.
+	Posting a command appends to a deque, which needs no lock, and wakes the
+	worker if it is paused.
+
+	Commands run on the worker between two quanta, while the cpu stands
+	still, so `inspect` sees registers and memory from the same instant.
+	Every command returns a `concurrent.futures.Future` with its result.
+
+	The quantum is sized to take about `latency` seconds at the measured
+	speed, so a command waits about that long while the cpu runs, plus the
+	switch interval of the interpreter (`sys.getswitchinterval()`) for the
+	waiting thread to get the GIL back. Checking the queue once per quantum
+	costs nothing measurable, throughput stays that of a bare `run()`.
+
+	Attributes
+	----------
+	running : bool
+		The cpu is running, not paused or halted.
+
+	halted : bool
+		The cpu reached an unimplemented opcode or raised.
+
+	error : Exception
+		What the cpu raised, None if nothing.
+
+	Methods
+	-------
+	start(paused)
+		Start the worker thread.
+
+	pause()
+		Stop running at the end of the quantum.
+
+	resume()
+		Run again.
+
+	step(count)
+		Execute instructions while paused.
+
+	inspect(regions)
+		Registers, flags and memory regions from one instant.
+
+	call(function)
+		Call a function with the cpu between quanta.
+
+	stop()
+		End the worker thread.
+	"""
+
+	def __init__(self, cpu, latency=0.005, quantum=None):
+		"""
+		Parameters
+		----------
+		cpu : cpu
+			The cpu to run, only the worker touches it after `start`.
+
+		latency : float, optional
+			Seconds a command may wait while the cpu runs (default is 0.005).
+
+		quantum : int, optional
+			Fixed quantum in clock cycles instead of one sized by `latency` (default is sized).
+		"""
+		self._cpu = cpu
+		self._latency = latency
+		self._fixed = quantum is not None
+		self._quantum = quantum if quantum is not None else 1000
+		self._commands = deque()
+		self._wake = threading.Event()
+		self._thread = None
+		self._stopping = False
+		self.running = False
+		self.halted = False
+		self.error = None
+		pass
+
+	def start(self, paused=False):
+		"""
+		Start the worker thread.
+
+		Parameters
+		----------
+		paused : bool, optional
+			Wait for `resume` or `step` before running (default is False).
+
+		Returns
+		-------
+		threading.Thread
+			The worker thread.
+		"""
+		if self._thread is not None:
+			raise RuntimeError("Runner is already started")
+		self.running = not paused
+		self._thread = threading.Thread(target=self._work, name="cpu runner", daemon=True)
+		self._thread.start()
+		return self._thread
+
+	def _post(self, function):
+		"""
+		Queue a function for the worker, returns the future of its result.
+		"""
+		future = Future()
+		self._commands.append((function, future))
+		self._wake.set()
+		return future
+
+	def _work(self):
+		"""
+		Worker loop, commands between quanta.
+		"""
+		CPU = self._cpu
+		commands = self._commands
+		clock = time.perf_counter
+		while not self._stopping:
+			while commands:
+				function, future = commands.popleft()
+				try:
+					future.set_result(function())
+				except Exception as exception:
+					future.set_exception(exception)
+			if self._stopping:
+				break
+			if not self.running:
+				self._wake.wait()
+				self._wake.clear()
+				continue
+			start, stop = clock(), CPU._cycles + self._quantum
+			try:
+				CPU.run(cycles=self._quantum)
+			except Exception as exception:
+				self.error = exception
+			if CPU._cycles < stop:
+				self.running = False
+				self.halted = True
+				continue
+			elapsed = clock() - start
+			if not self._fixed and elapsed > 0:
+				# Aim the next quantum at the latency, grow at most tenfold at once
+				self._quantum = max(100, min(self._quantum * 10, int(self._quantum * self._latency / elapsed)))
+		while commands:
+			commands.popleft()[1].cancel()
+		pass
+
+	def pause(self):
+		"""
+		Stop running at the end of the quantum.
+
+		Returns
+		-------
+		Future
+			Resolves to the cpu state once paused.
+		"""
+		def pause():
+			self.running = False
+			return self._cpu.readState()
+		return self._post(pause)
+
+	def resume(self):
+		"""
+		Run again, unless the cpu halted.
+
+		Returns
+		-------
+		Future
+			Resolves to True once running, False if the cpu halted.
+		"""
+		def resume():
+			self.running = not self.halted
+			return self.running
+		return self._post(resume)
+
+	def step(self, count=1):
+		"""
+		Pause and execute instructions.
+
+		Parameters
+		----------
+		count : int, optional
+			Instructions to execute (default is 1).
+
+		Returns
+		-------
+		Future
+			Resolves to the cpu state after them.
+		"""
+		def step():
+			self.running = False
+			for _ in range(count):
+				if not self._cpu.step():
+					self.halted = True
+					break
+			return self._cpu.readState()
+		return self._post(step)
+
+	def inspect(self, regions=None):
+		"""
+		Registers, flags and memory regions from one instant.
+
+		Parameters
+		----------
+		regions : dict, optional
+			Name to (start, end) of the memory to copy (default is none).
+
+		Returns
+		-------
+		Future
+			Resolves to {"state": cpu state, "memory": {name: bytes}, "running": bool, "halted": bool}.
+		"""
+		def inspect():
+			data = self._cpu._memory.Data
+			return {
+				"state": self._cpu.readState(),
+				"memory": {name: bytes(data[start:end]) for name, (start, end) in (regions or {}).items()},
+				"running": self.running,
+				"halted": self.halted
+			}
+		return self._post(inspect)
+
+	def call(self, function):
+		"""
+		Call a function with the cpu between quanta, e.g. to assert an interrupt or patch memory.
+
+		Parameters
+		----------
+		function : callable
+			Called with the cpu.
+
+		Returns
+		-------
+		Future
+			Resolves to what the function returns.
+		"""
+		return self._post(lambda: function(self._cpu))
+
+	def stop(self, timeout=None):
+		"""
+		End the worker thread at the end of the quantum and wait for it.
+
+		Parameters
+		----------
+		timeout : float, optional
+			Seconds to wait (default is waiting until it ended).
+		"""
+		def stop():
+			self._stopping = True
+		if self._thread is not None:
+			self._post(stop)
+			self._thread.join(timeout)
+			self._thread = None
+		pass
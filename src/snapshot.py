@@ -0,0 +1,277 @@
+import struct
+import zlib
+from mmap import ACCESS_READ, mmap
+
+_MAGIC = b"EMUS"
+_VERSION = 2
+_COMPRESSED = 0b1
+_HEADER = struct.Struct("<4sBB16s5q7BQHIII")	# Magic, version, flags, variant, registers, flags, cycles, devices, image size, stored size, memory state size
+_HEADER_1 = struct.Struct("<4sBB16s5q7BQHII")	# Version 1, without the memory state
+_DEVICE = struct.Struct("<BI")					# Name length, state length
+_NO_STATE = 0xFFFFFFFF							# Memory state size of a memory without one
+
+class snapshot:
+	"""
+	Machine snapshot
+	================
+	The registers, flags, cycle count, memory image and device states of a
+	machine, e.g. right after booting a firmware, so jobs can start from it
+	instead of booting again.
+
+	Files are versioned and the memory image is optionally compressed with
+	zlib. An uncompressed file is mapped instead of read, the image is a
+	view of the mapping and restoring copies it straight into the memory of
+	the cpu. Load a snapshot once and restore it into every cpu.
+
+	Devices take part when they have `readState()`, returning bytes, and
+	`writeState(state)`. By default those attached to the cpu are used,
+	named by their class and first address, e.g. "console@F000".
+
+	Memories with a state besides the address space, such as the banks
+	mapped, RAM and store of a `bankedmemory`, save it the same way. It is
+	restored before the image, and restoring into such a memory needs a
+	snapshot taken on one.
+
+	Attributes
+	----------
+	state : tuple
+		Registers, flags and cycle count in the order of `cpu._STATE`.
+
+	variant : str
+		Cpu variant the snapshot was taken on.
+
+	image : bytes or memoryview
+		Memory image, with the original opcodes on trapped addresses.
+
+	devices : dict
+		Device name to its state.
+
+	memory : bytes
+		State of the memory from its `readState()`, None for memories without one.
+
+	Methods
+	-------
+	capture(cpu, devices)
+		Snapshot of a machine.
+
+	save(path, compress)
+		Write the snapshot to a file.
+
+	load(path)
+		Snapshot from a file.
+
+	restore(cpu, devices)
+		Put a machine in the state of the snapshot.
+
+	close()
+		Release the mapping of a loaded file.
+	"""
+
+	def __init__(self, state, variant, image, devices=None, memory=None):
+		"""
+		Parameters
+		----------
+		state : tuple
+			Registers, flags and cycle count in the order of `cpu._STATE`.
+
+		variant : str
+			Cpu variant.
+
+		image : bytes or memoryview
+			Memory image.
+
+		devices : dict, optional
+			Device name to its state (default is none).
+
+		memory : bytes, optional
+			State of the memory (default is none).
+		"""
+		self.state = tuple(state)
+		self.variant = variant
+		self.image = image
+		self.devices = dict() if devices is None else devices
+		self.memory = memory
+		self._mapping = None
+		pass
+
+	@staticmethod
+	def _attached(cpu):
+		"""
+		Devices attached to a cpu that have a state, by name.
+		"""
+		devices = dict()
+		for address in sorted(cpu._ports):
+			device = cpu._ports[address]
+			if hasattr(device, "readState") and device not in devices.values():
+				devices["{}@{:04X}".format(type(device).__name__, address)] = device
+		return devices
+
+	@classmethod
+	def capture(cls, cpu, devices=None):
+		"""
+		Snapshot of a machine.
+
+		Parameters
+		----------
+		cpu : cpu
+			The cpu, with its memory.
+
+		devices : dict, optional
+			Device name to device (default is the devices attached to the cpu).
+
+		Returns
+		-------
+		snapshot
+			The snapshot.
+		"""
+		data = cpu._memory.Data
+		# Put the original opcodes back while reading, a memory state may hold the trapped bytes too
+		patched = [address for address in cpu._traps if data[address] == cpu._TRAP_OPCODE]
+		for address in patched:
+			data[address] = cpu._traps[address][2]
+		try:
+			image = bytes(data[:])
+			memory = bytes(cpu._memory.readState()) if hasattr(cpu._memory, "readState") else None
+		finally:
+			for address in patched:
+				data[address] = cpu._TRAP_OPCODE
+		devices = cls._attached(cpu) if devices is None else devices
+		return cls(cpu.readState(), cpu._VARIANT, image, {name: bytes(device.readState()) for name, device in devices.items()}, memory)
+
+	def save(self, path, compress=True):
+		"""
+		Write the snapshot to a file.
+
+		Parameters
+		----------
+		path : str
+			Path of the file.
+
+		compress : bool or int, optional
+			Compress the memory image, an int is the zlib level. Uncompressed
+			files restore faster (default is True).
+		"""
+		image = bytes(self.image)
+		memory = b"" if self.memory is None else bytes(self.memory)
+		# The memory state goes in front of the image, compressed with it
+		stored = memory + image
+		if compress:
+			stored = zlib.compress(stored, 6 if compress is True else compress)
+		state = [int(value) for value in self.state]
+		with open(path, "wb") as file:
+			file.write(_HEADER.pack(_MAGIC, _VERSION, _COMPRESSED if compress else 0, self.variant.encode("ascii"), *state, len(self.devices), len(image), len(stored), _NO_STATE if self.memory is None else len(memory)))
+			for name, data in self.devices.items():
+				name = name.encode("utf-8")
+				file.write(_DEVICE.pack(len(name), len(data)) + name + data)
+			file.write(stored)
+		pass
+
+	@classmethod
+	def load(cls, path):
+		"""
+		Snapshot from a file, the image of an uncompressed file is a view of its mapping.
+
+		Parameters
+		----------
+		path : str
+			Path of the file.
+
+		Returns
+		-------
+		snapshot
+			The snapshot.
+		"""
+		with open(path, "rb") as file:
+			mapping = mmap(file.fileno(), 0, access=ACCESS_READ)
+		if mapping[:4] != _MAGIC:
+			mapping.close()
+			raise ValueError("{} is not a snapshot".format(path))
+		version = mapping[4]
+		if version not in (1, _VERSION):
+			mapping.close()
+			raise ValueError("Unsupported snapshot version {}".format(version))
+		header = _HEADER if version == _VERSION else _HEADER_1
+		fields = header.unpack_from(mapping, 0)
+		flags, variant = fields[2], fields[3].rstrip(b"\0").decode("ascii")
+		state = fields[4:17]
+		count, size, storedSize = fields[17:20]
+		memorySize = fields[20] if version == _VERSION else _NO_STATE
+		position = header.size
+		devices = dict()
+		for _ in range(count):
+			length, dataLength = _DEVICE.unpack_from(mapping, position)
+			position += _DEVICE.size
+			name = mapping[position:position+length].decode("utf-8")
+			devices[name] = mapping[position+length:position+length+dataLength]
+			position += length + dataLength
+		memory = None
+		skip = 0 if memorySize == _NO_STATE else memorySize
+		if flags & _COMPRESSED:
+			stored = zlib.decompress(mapping[position:position+storedSize])
+			if memorySize != _NO_STATE:
+				memory = stored[:memorySize]
+			image = stored[skip:skip+size]
+			mapping.close()
+			mapping = None
+		else:
+			if memorySize != _NO_STATE:
+				memory = mapping[position:position+memorySize]
+			image = memoryview(mapping)[position+skip:position+skip+size]
+		self = cls(state, variant, image, devices, memory)
+		self._mapping = mapping
+		return self
+
+	def restore(self, cpu, devices=None):
+		"""
+		Put a machine in the state of the snapshot. The restored memory is the
+		new base of the dirty pages, `dirtyPages()` starts empty.
+
+		Parameters
+		----------
+		cpu : cpu
+			The cpu, of the variant the snapshot was taken on.
+
+		devices : dict, optional
+			Device name to device (default is the devices attached to the cpu).
+		"""
+		if cpu._VARIANT != self.variant:
+			raise ValueError("Snapshot of a {} cpu cannot be restored on a {} cpu".format(self.variant, cpu._VARIANT))
+		devices = self._attached(cpu) if devices is None else devices
+		for name in devices:
+			if name not in self.devices:
+				raise ValueError("Snapshot has no state for device {!r}".format(name))
+		memory = cpu._memory
+		if hasattr(memory, "writeState") and self.memory is None:
+			raise ValueError("Snapshot has no memory state, a {} cannot be restored from it".format(type(memory).__name__))
+		if self.memory is not None and not hasattr(memory, "writeState"):
+			raise ValueError("Snapshot of a {} byte memory state cannot be restored into a {}".format(len(self.memory), type(memory).__name__))
+		if self.memory is not None:
+			# Map the banks first, the image is written through them
+			memory.writeState(self.memory)
+		if hasattr(memory, "Read"):
+			# Only write the pages that differ, a sparse memory keeps the rest untouched
+			image = self.image
+			for page in range(0x100):
+				if memory.Read[page] != image[page << 8:(page + 1) << 8]:
+					memory.Data[page << 8:(page + 1) << 8] = image[page << 8:(page + 1) << 8]
+		else:
+			memory.Data[:len(self.image)] = self.image
+		memory.Dirty[:] = bytes(len(memory.Dirty))
+		memory._dirtyHistory = list()
+		for address, (function, cycles, opCode) in cpu._traps.items():
+			cpu._traps[address] = (function, cycles, memory.Data[address])
+			memory.Data[address] = cpu._TRAP_OPCODE
+		cpu.writeState(self.state)
+		for name, device in devices.items():
+			device.writeState(bytes(self.devices[name]))
+		pass
+
+	def close(self):
+		"""
+		Release the mapping of a loaded file. The image of an uncompressed file cannot be used after it.
+		"""
+		if self._mapping is not None:
+			self.image.release()
+			self._mapping.close()
+			self._mapping = None
+		pass
@@ -0,0 +1,143 @@
+import sys
+
+from paging import pagedmemory, pagedview
+
+# Read only page every untouched page of every sparse memory shows
+_ZERO_PAGE = memoryview(bytes(0x100))
+
+def sparseTemplate(image, address=0):
+	"""
+	Read only pages of a memory image, to share between sparse memories.
+
+	Build it once and pass it to every `sparsememory`, the pages are not
+	copied per memory. Pages of zeros map to the shared zero page.
+
+	Parameters
+	----------
+	image : bytes
+		Contents, e.g. a ROM.
+
+	address : int, optional
+		Address the image starts at (default is 0).
+
+	Returns
+	-------
+	tuple
+		256 read only views of 256 bytes, one per page.
+	"""
+	data = bytearray(0x10000)
+	data[address:address+len(image)] = image
+	data = memoryview(bytes(data))
+	pages = list()
+	for page in range(0x100):
+		view = data[page << 8:(page + 1) << 8]
+		pages.append(_ZERO_PAGE if view == _ZERO_PAGE else view)
+	return tuple(pages)
+
+_ZERO_TEMPLATE = (_ZERO_PAGE,) * 0x100
+
+class sparsememory(pagedmemory):
+	"""
+	Sparse memory
+	=============
+	A 64 KB address space whose 256 byte pages are allocated on the first
+	write. Untouched pages read the shared zero page or the page of a shared
+	read only template, see `sparseTemplate`. A memory that touched 20 pages
+	holds about 16 KB instead of 64 KB, a third of it the page tables.
+
+	The first write to a page copies it from the template into a page of
+	its own (`writeFault`), later writes go straight to it. Writes through
+	`Data`, e.g. loading a program or patching a trap, allocate the same way
+	and never change the template. Pages inside `rom` ranges ignore writes
+	of the cpu, `Data` still patches a copy of them.
+
+	Pass the memory to the cpu when creating it, `cpu(ram=...)`.
+
+	Methods
+	-------
+	residentPages()
+		Pages with a copy of their own.
+
+	residentSize()
+		Bytes held by this memory alone.
+
+	trim()
+		Drop copies that equal the template again.
+	"""
+
+	def __init__(self, template=None, rom=None):
+		"""
+		Parameters
+		----------
+		template : tuple or bytes, optional
+			Pages from `sparseTemplate`, or a 64 KB image to make them from (default is zeros).
+
+		rom : tuple or list, optional
+			(start, end) range or list of ranges the cpu cannot write, rounded out to whole pages (default is none).
+		"""
+		if template is None:
+			template = _ZERO_TEMPLATE
+		elif not isinstance(template, tuple):
+			template = sparseTemplate(template)
+		if len(template) != 0x100:
+			raise ValueError("Template must have 256 pages, not {}".format(len(template)))
+		if rom and isinstance(rom[0], int):
+			rom = [rom]
+		self._template = template
+		self._rom = frozenset(page for start, end in (rom or ()) for page in range(start >> 8, ((end - 1) >> 8) + 1))
+		pagedmemory.__init__(self)
+		pass
+
+	def memoryClear(self):
+		"Drop every page copy and show the template again"
+		self.Read = list(self._template)
+		self.Write = [None] * 0x100
+		self.Data = pagedview(self)
+		self.Dirty = bytearray(self._MEMORY_SIZE_MAX // self._PAGE_SIZE)
+		self._dirtyHistory = list()
+		self._resident = set()
+		pass
+
+	def _allocate(self, page):
+		"Copy a page from the template and map the copy"
+		# A bytearray rather than a view of one saves a third per page
+		copy = bytearray(self.Read[page])
+		self.Read[page] = copy
+		if page not in self._rom:
+			self.Write[page] = copy
+		self._resident.add(page)
+		return copy
+
+	def writeFault(self, address, value):
+		"First write to a page, or a write to rom"
+		page = address >> 8
+		if page in self._rom:
+			return
+		self._allocate(page)[address & 0xFF] = value
+		self.Dirty[page] = 1
+
+	def _pokePage(self, page):
+		"Page to write to through Data, copied first if it is still the template"
+		if page in self._resident:
+			return self.Read[page]
+		return self._allocate(page)
+
+	def residentPages(self):
+		"Pages with a copy of their own"
+		return sorted(self._resident)
+
+	def residentSize(self):
+		"Bytes held by the page copies and the page tables of this memory, the template is not counted"
+		size = sys.getsizeof(self.Read) + sys.getsizeof(self.Write) + sys.getsizeof(self.Dirty)
+		for page in self._resident:
+			size += sys.getsizeof(self.Read[page])
+		return size
+
+	def trim(self):
+		"Drop page copies that equal the template again, returns the number of pages dropped"
+		dropped = [page for page in self._resident if self.Read[page] == self._template[page]]
+		for page in dropped:
+			self.Read[page] = self._template[page]
+			self.Write[page] = None
+			self._resident.discard(page)
+		return len(dropped)
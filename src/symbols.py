@@ -0,0 +1,289 @@
+import re
+from bisect import bisect_right
+
+# name = $C000, name = 0xC000, name = 49152, name EQU $C000, name: .equ $C000
+_ASSIGNMENT = re.compile(r"^\s*\.?([A-Za-z_@.][\w.@]*)\s*(?::?\s*\.?equ\b|:?=|:)\s*(\$[0-9A-Fa-f]+|0[xX][0-9A-Fa-f]+|\d+)\s*(?:[;#].*)?$", re.IGNORECASE)
+# al C:C000 .name, as written by ca65 -Ln and read by VICE
+_VICE = re.compile(r"^\s*al\s+(?:[A-Za-z]:)?([0-9A-Fa-f]+)\s+\.?(\S+)\s*$")
+# sym id=0,name="reset",addrsize=absolute,...,val=0xC000,type=lab in ld65 --dbgfile
+_DEBUG = re.compile(r"^sym\s+(.*)$")
+
+class symbols:
+	"""
+	Symbol table
+	============
+	Labels by address, loaded from assembler output, with a lookup of the
+	nearest symbol at or below an address. The addresses are kept as a sorted
+	list searched with bisect, O(log n) per lookup, and the names of
+	addresses already looked up are cached, so reports that symbolise the
+	same hot addresses millions of times mostly hit the cache.
+
+	Formats `load` understands:
+
+	list
+		`name = $C000` lines, also `name = 0xC000`, `name = 49152`,
+		`name EQU $C000` and `name: $C000`. Comments start with ; or #.
+
+	vice
+		`al C:C000 .name` label files, e.g. from `ca65 -Ln` or `ld65 -Ln`.
+
+	debug
+		Debug info files of `ld65 --dbgfile`, the `sym` lines with a `val`.
+
+	Methods
+	-------
+	add(address, name)
+		Add a symbol.
+
+	load(path, format)
+		Add the symbols of a file.
+
+	lookup(address)
+		Nearest symbol at or below an address and the offset from it.
+
+	name(address, digits)
+		An address as "name", "name+offset" or hex.
+
+	names(addresses)
+		Several addresses as names.
+
+	address(name)
+		Address of a symbol.
+
+	labels()
+		Symbol per address, for exact matches only.
+	"""
+
+	_CACHE_SIZE = 0x10000
+
+	def __init__(self, labels=None, reach=0x100):
+		"""
+		Parameters
+		----------
+		labels : dict, optional
+			Name per address to start with (default is none).
+
+		reach : int, optional
+			Largest offset from a symbol `name` still uses it, further away the
+			address is shown in hex. None for any distance (default is 0x100).
+		"""
+		self._reach = reach
+		self._labels = dict()		# address to the first name added for it
+		self._addresses = dict()	# name to address
+		self._sorted = list()
+		self._sortedNames = list()
+		self._stale = False
+		self._cache = dict()
+		for address, name in (labels or {}).items():
+			self.add(address, name)
+		pass
+
+	def __len__(self):
+		return len(self._addresses)
+
+	def add(self, address: int, name: str):
+		"""
+		Add a symbol. The first name added for an address is the one shown for it.
+
+		Parameters
+		----------
+		address : int
+			Address of the symbol.
+
+		name : str
+			Name of the symbol.
+		"""
+		self._addresses.setdefault(name, address)
+		if address not in self._labels:
+			self._labels[address] = name
+			self._stale = True
+			self._cache.clear()
+		pass
+
+	def load(self, path, format=None):
+		"""
+		Add the symbols of a file.
+
+		Parameters
+		----------
+		path : str
+			Path of the file.
+
+		format : str, optional
+			"list", "vice" or "debug" (default is guessed from the first symbol line).
+
+		Returns
+		-------
+		int
+			Number of symbols read.
+		"""
+		with open(path, encoding="utf-8", errors="replace") as file:
+			lines = file.read().splitlines()
+		if format is None:
+			format = self._guess(lines)
+		parse = {"list": self._parseList, "vice": self._parseVice, "debug": self._parseDebug}.get(format)
+		if parse is None:
+			raise ValueError("Unknown symbol format {!r}, expected list, vice or debug".format(format))
+		count = 0
+		for address, name in parse(lines):
+			self.add(address, name)
+			count += 1
+		return count
+
+	@staticmethod
+	def _guess(lines):
+		"""
+		Format of the lines of a symbol file.
+		"""
+		for line in lines:
+			if _DEBUG.match(line) or line.startswith("version\tmajor="):
+				return "debug"
+			if _VICE.match(line):
+				return "vice"
+			if _ASSIGNMENT.match(line):
+				return "list"
+		return "list"
+
+	@staticmethod
+	def _number(text):
+		"""
+		Value of a $hex, 0xhex or decimal number.
+		"""
+		if text.startswith("$"):
+			return int(text[1:], 16)
+		return int(text, 0)
+
+	def _parseList(self, lines):
+		"""
+		(address, name) of the `name = $addr` lines.
+		"""
+		for line in lines:
+			match = _ASSIGNMENT.match(line)
+			if match is not None:
+				yield (self._number(match.group(2)), match.group(1))
+
+	def _parseVice(self, lines):
+		"""
+		(address, name) of the `al` lines of a VICE label file.
+		"""
+		for line in lines:
+			match = _VICE.match(line)
+			if match is not None:
+				yield (int(match.group(1), 16), match.group(2))
+
+	def _parseDebug(self, lines):
+		"""
+		(address, name) of the `sym` lines of an ld65 debug file.
+		"""
+		for line in lines:
+			match = _DEBUG.match(line)
+			if match is None:
+				continue
+			fields = dict(field.split("=", 1) for field in match.group(1).split(",") if "=" in field)
+			if "val" in fields and "name" in fields and fields.get("type", "lab") != "imp":
+				yield (self._number(fields["val"]), fields["name"].strip('"'))
+
+	def _sort(self):
+		"""
+		Rebuild the sorted addresses after symbols were added.
+		"""
+		self._sorted = sorted(self._labels)
+		self._sortedNames = [self._labels[address] for address in self._sorted]
+		self._stale = False
+		pass
+
+	def lookup(self, address: int):
+		"""
+		Nearest symbol at or below an address.
+
+		Parameters
+		----------
+		address : int
+			The address.
+
+		Returns
+		-------
+		tuple
+			The name and the offset of the address from it, None when no symbol is at or below the address.
+		"""
+		if self._stale:
+			self._sort()
+		index = bisect_right(self._sorted, address) - 1
+		if index < 0:
+			return None
+		return (self._sortedNames[index], address - self._sorted[index])
+
+	def name(self, address: int, digits=4):
+		"""
+		An address as "name", "name+offset" or hex, e.g. "$C000", when no symbol is within reach.
+
+		Parameters
+		----------
+		address : int
+			The address.
+
+		digits : int, optional
+			Hex digits of an address without a symbol, 2 for zero page operands (default is 4).
+
+		Returns
+		-------
+		str
+			The name.
+		"""
+		name = self._cache.get(address)
+		if name is None:
+			found = self.lookup(address)
+			if found is None or (self._reach is not None and found[1] >= self._reach):
+				name = ""
+			elif found[1] == 0:
+				name = found[0]
+			else:
+				name = "{}+{}".format(*found)
+			if len(self._cache) >= self._CACHE_SIZE:
+				self._cache.clear()
+			self._cache[address] = name
+		return name or "${:0{}X}".format(address, digits)
+
+	def names(self, addresses):
+		"""
+		Several addresses as names, see `name`.
+
+		Parameters
+		----------
+		addresses : iterable
+			The addresses, e.g. a trace of program counters.
+
+		Returns
+		-------
+		list
+			The names in the order of the addresses.
+		"""
+		name = self.name
+		return [name(address) for address in addresses]
+
+	def address(self, name: str):
+		"""
+		Address of a symbol.
+
+		Parameters
+		----------
+		name : str
+			Name of the symbol.
+
+		Returns
+		-------
+		int
+			The address, None when there is no such symbol.
+		"""
+		return self._addresses.get(name)
+
+	def labels(self):
+		"""
+		Symbol per address, for exact matches only.
+
+		Returns
+		-------
+		dict
+			Name per address.
+		"""
+		return dict(self._labels)
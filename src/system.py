@@ -0,0 +1,225 @@
+class _port:
+	"""
+	Shared device as seen by one cpu. Every access first brings the other cpus up to the time of the access.
+	"""
+
+	def __init__(self, system, cpu, device):
+		self._system = system
+		self._cpu = cpu
+		self._device = device
+		pass
+
+	def read(self, address):
+		self._system._sync(self._cpu)
+		return self._device.read(address)
+
+	def write(self, address, value):
+		self._system._sync(self._cpu)
+		self._device.write(address, value)
+		pass
+
+class system:
+	"""
+	Multi-cpu system
+	================
+	Runs several cpus, e.g. a host and a disk drive controller, interleaved
+	in quanta of clock cycles. Each cpu runs a whole quantum on its own engine
+	before the next one takes its turn, so cpus that only touch their own
+	memory and devices are synchronised once per quantum.
+
+	Devices shared between cpus are synchronised tightly. Before a cpu reads
+	or writes a shared device, every other cpu behind it is run up to the
+	cycle of the access, stopping before an instruction that would end after
+	it, so the device sees the accesses of all cpus in time order no matter
+	how large the quantum is. The accesses are served from
+	the run loop of the cpu, only those to the pages of a device leave it.
+
+	Cpus may also share a memory, passed to each with `cpu(ram=...)`. Plain
+	memory is not synchronised, writes are seen by the other cpus at the next
+	quantum at the latest.
+
+	Methods
+	-------
+	add(cpu, name)
+		Add a cpu to the system.
+
+	share(device, start, end, cpus)
+		Map a device on the bus of several cpus.
+
+	unshare(device)
+		Remove a shared device from every cpu.
+
+	run(cycles)
+		Run every cpu until all of them halt or `cycles` have elapsed.
+
+	sample()
+		Clock cycles and state of every cpu.
+	"""
+
+	def __init__(self, quantum=1000):
+		"""
+		Parameters
+		----------
+		quantum : int, optional
+			Clock cycles each cpu runs before the next one takes its turn (default is 1000).
+		"""
+		self._quantum = quantum
+		self._cpus = list()
+		self._names = dict()
+		self._start = dict()	# cpu to its cycle count at system cycle 0
+		self._halted = set()
+		self._ports = list()	# (cpu, port, device)
+		self._active = list()	# cpus executing, innermost last
+		self._cycles = 0
+		pass
+
+	def add(self, cpu, name=None):
+		"""
+		Add a cpu to the system. It starts at the current system cycle.
+
+		Parameters
+		----------
+		cpu : cpu
+			The cpu to add.
+
+		name : str, optional
+			Name of the cpu in samples (default is "cpu" and its index).
+
+		Returns
+		-------
+		cpu
+			The cpu that was added.
+		"""
+		self._names[cpu] = "cpu{}".format(len(self._cpus)) if name is None else name
+		self._start[cpu] = cpu._cycles - self._cycles
+		self._cpus.append(cpu)
+		return cpu
+
+	def share(self, device, start, end, cpus=None):
+		"""
+		Map a device on the bus of several cpus, from start up to end. Call it
+		again with other cpus to map the same device at other addresses.
+
+		Parameters
+		----------
+		device : object
+			Device with `read(address)` and `write(address, value)`.
+
+		start : int
+			First address of the device.
+
+		end : int
+			Address after the last address of the device.
+
+		cpus : list, optional
+			Cpus to map the device on (default is every cpu added so far).
+		"""
+		for cpu in self._cpus if cpus is None else cpus:
+			port = _port(self, cpu, device)
+			cpu.attachDevice(port, start, end)
+			self._ports.append((cpu, port, device))
+		pass
+
+	def unshare(self, device):
+		"""
+		Remove a shared device from every cpu it is mapped on.
+
+		Parameters
+		----------
+		device : object
+			The device passed to `share`.
+		"""
+		for cpu, port, shared in list(self._ports):
+			if shared is device:
+				cpu.detachDevice(port)
+				self._ports.remove((cpu, port, shared))
+		pass
+
+	def time(self, cpu):
+		"""
+		Clock cycles the cpu has run on the system clock.
+		"""
+		return cpu._cycles - self._start[cpu]
+
+	def _advance(self, cpu, target):
+		"""
+		Run the cpu until the system clock reaches target, unless it is executing already.
+		"""
+		budget = target - self.time(cpu)
+		if budget <= 0 or cpu in self._active:
+			return
+		self._active.append(cpu)
+		try:
+			cpu.run(cycles=budget)
+		finally:
+			self._active.pop()
+		if self.time(cpu) < target:
+			self._halted.add(cpu)
+		else:
+			self._halted.discard(cpu)
+		pass
+
+	def _catchUp(self, cpu, target):
+		"""
+		Run the cpu as far as it gets without an instruction ending after target, unless it is executing already.
+		"""
+		if cpu in self._active:
+			return
+		self._active.append(cpu)
+		try:
+			# The run loop finishes the instruction that reaches its budget, leave room for the longest one
+			budget = target - self.time(cpu) - max(cpu._handlerCycles)
+			if budget > 0:
+				cpu.run(cycles=budget)
+			while self.time(cpu) + cpu._handlerCycles[cpu._memory.Data[cpu._PC]] <= target and cpu.step():
+				pass
+		finally:
+			self._active.pop()
+		pass
+
+	def _sync(self, cpu):
+		"""
+		Bring every other cpu up to the time of the cpu accessing a shared device.
+		An instruction of another cpu that would end after the access is left for later,
+		its own accesses come after this one.
+		"""
+		now = self.time(cpu)
+		for other in self._cpus:
+			if other is not cpu:
+				self._catchUp(other, now)
+		pass
+
+	def run(self, cycles=None):
+		"""
+		Run every cpu quantum by quantum until all of them halt or `cycles` have
+		elapsed. A halted cpu is tried again every quantum, so a device or
+		another cpu can wake it up.
+
+		Parameters
+		----------
+		cycles : int, optional
+			System clock cycles to run (default is no limit).
+		"""
+		end = None if cycles is None else self._cycles + cycles
+		while self._cpus and (end is None or self._cycles < end):
+			target = self._cycles + self._quantum if end is None else min(self._cycles + self._quantum, end)
+			for cpu in self._cpus:
+				self._advance(cpu, target)
+			self._cycles = target
+			if all(cpu in self._halted for cpu in self._cpus):
+				break
+		pass
+
+	def sample(self):
+		"""
+		Clock cycles and state of every cpu.
+
+		Returns
+		-------
+		dict
+			Name to {"cycles", "halted"}, cycles on the system clock.
+		"""
+		return {
+			self._names[cpu]: {"cycles": self.time(cpu), "halted": cpu in self._halted}
+			for cpu in self._cpus
+		}
@@ -0,0 +1,815 @@
+"""
+CPU variants
+============
+Processor variants on top of `cpu`, chosen with `cpu(variant=...)`. Each
+variant is a subclass with its own `_instructions` and `_instructionCycles`
+tables, and its own generated handlers and run loop, so no handler checks
+which variant it runs on. Those are generated when the first cpu of the
+variant is made, importing the variants does not generate any.
+
+"6502"
+	Documented NMOS opcodes, the plain `cpu`.
+
+"nmos"
+	NMOS with the stable undocumented opcodes. The unstable ones (XAA, LAX
+	immediate, AHX, TAS, SHX, SHY, LAS) and the JAM opcodes stay unimplemented
+	and halt the cpu.
+
+"65c02"
+	CMOS 65C02 with its new instructions, the zero page indirect and
+	(absolute,X) addressing modes and JMP ($xxFF) reading the vector across
+	the page. Opcodes the 65C02 leaves undefined are not implemented.
+
+Opcode $02 is unimplemented on every variant, so traps work on all of them.
+"""
+
+from cpu import cpu
+
+class nmos(cpu):
+	"""
+	NMOS 6502 with undocumented opcodes
+	===================================
+	Adds the stable undocumented opcodes to the documented NMOS opcodes of `cpu`.
+	Read-modify-write combinations (SLO, RLA, SRE, RRA, DCP, ISC), SAX and LAX
+	take the same addressing modes as the documented instructions they combine.
+	"""
+
+	_VARIANT = "nmos"
+
+	def _Slo(self, opCode):
+		"""
+		MOS6502 undocumented instruction SLO
+		====================================
+		Shift a memory location one bit left, then OR it into the accumulator.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.sloFunction[(opCode&0b11100)>>2](self)
+		data = self.readByte(dataAddress)
+		self._PS_c = bool(data & 0b10000000)
+		data = (data << 1) & 0b11111111
+		self.writeByte(dataAddress, data)
+		self._Acc |= data
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = bool((self._Acc & 0b10000000)>0)
+		self._pcIncrement()
+		pass
+
+	def _Rla(self, opCode):
+		"""
+		MOS6502 undocumented instruction RLA
+		====================================
+		Rotate a memory location one bit left, then AND it into the accumulator.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.rlaFunction[(opCode&0b11100)>>2](self)
+		data = self.readByte(dataAddress)
+		carry = bool(data & 0b10000000)
+		data = ((data << 1) & 0b11111111) | self._PS_c
+		self._PS_c = carry
+		self.writeByte(dataAddress, data)
+		self._Acc &= data
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = bool((self._Acc & 0b10000000)>0)
+		self._pcIncrement()
+		pass
+
+	def _Sre(self, opCode):
+		"""
+		MOS6502 undocumented instruction SRE
+		====================================
+		Shift a memory location one bit right, then EOR it into the accumulator.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.sreFunction[(opCode&0b11100)>>2](self)
+		data = self.readByte(dataAddress)
+		self._PS_c = bool(data & 0b00000001)
+		data >>= 1
+		self.writeByte(dataAddress, data)
+		self._Acc ^= data
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = bool((self._Acc & 0b10000000)>0)
+		self._pcIncrement()
+		pass
+
+	def _Rra(self, opCode):
+		"""
+		MOS6502 undocumented instruction RRA
+		====================================
+		Rotate a memory location one bit right, then add it to the accumulator with the carry bit.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.rraFunction[(opCode&0b11100)>>2](self)
+		data = self.readByte(dataAddress)
+		carry = data & 0b00000001
+		data = (data >> 1) | (self._PS_c << 7)
+		self.writeByte(dataAddress, data)
+		result = self._Acc + data + carry
+		self._PS_v = bool(~(self._Acc ^ data) & (self._Acc ^ result) & 0b10000000)
+		self._PS_c = bool(result > 0xFF)
+		self._Acc = result & 0xFF
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = bool((self._Acc & 0b10000000)>0)
+		self._pcIncrement()
+		pass
+
+	def _Sax(self, opCode):
+		"""
+		MOS6502 undocumented instruction SAX
+		====================================
+		Store the accumulator ANDed with the X register to memory.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.saxFunction[(opCode&0b11100)>>2](self)
+		self.writeByte(dataAddress, self._Acc & self._Reg_X)
+		self._pcIncrement()
+		pass
+
+	def _Lax(self, opCode):
+		"""
+		MOS6502 undocumented instruction LAX
+		====================================
+		Load the accumulator and the X register with the same memory location.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.laxFunction[(opCode&0b11100)>>2](self)
+		self._Acc = self.readByte(dataAddress)
+		self._Reg_X = self._Acc
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = bool((self._Acc & 0b10000000)>0)
+		self._pcIncrement()
+		pass
+
+	def _Dcp(self, opCode):
+		"""
+		MOS6502 undocumented instruction DCP
+		====================================
+		Subtract 1 from a memory location, then compare it with the accumulator.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.dcpFunction[(opCode&0b11100)>>2](self)
+		data = (self.readByte(dataAddress) - 1) & 0b11111111
+		self.writeByte(dataAddress, data)
+		self._PS_c = bool(self._Acc >= data)
+		self._PS_z = bool(self._Acc == data)
+		self._PS_n = bool(((self._Acc - data) & 0b10000000)>0)
+		self._pcIncrement()
+		pass
+
+	def _Isc(self, opCode):
+		"""
+		MOS6502 undocumented instruction ISC
+		====================================
+		Add 1 to a memory location, then subtract it from the accumulator with the not of the carry bit.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.iscFunction[(opCode&0b11100)>>2](self)
+		data = (self.readByte(dataAddress) + 1) & 0b11111111
+		self.writeByte(dataAddress, data)
+		result = self._Acc - data - (not self._PS_c)
+		self._PS_v = bool((self._Acc ^ data) & (self._Acc ^ result) & 0b10000000)
+		self._PS_c = bool(result >= 0)
+		self._Acc = result & 0xFF
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = bool((self._Acc & 0b10000000)>0)
+		self._pcIncrement()
+		pass
+
+	def _Anc(self, opCode):
+		"""
+		MOS6502 undocumented instruction ANC
+		====================================
+		AND a value into the accumulator and copy the negative flag to the carry flag.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		self._Acc &= self.ancFunction[(opCode&0b11100)>>2](self)
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = bool((self._Acc & 0b10000000)>0)
+		self._PS_c = self._PS_n
+		self._pcIncrement()
+		pass
+
+	def _Alr(self, opCode):
+		"""
+		MOS6502 undocumented instruction ALR
+		====================================
+		AND a value into the accumulator, then shift the accumulator one bit right.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		self._Acc &= self.alrFunction[(opCode&0b11100)>>2](self)
+		self._PS_c = bool(self._Acc & 0b00000001)
+		self._Acc >>= 1
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = False
+		self._pcIncrement()
+		pass
+
+	def _Arr(self, opCode):
+		"""
+		MOS6502 undocumented instruction ARR
+		====================================
+		AND a value into the accumulator, then rotate the accumulator one bit right.
+		Carry is taken from bit 6 and overflow from bit 6 EOR bit 5 of the result.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		data = self._Acc & self.arrFunction[(opCode&0b11100)>>2](self)
+		self._Acc = (data >> 1) | (self._PS_c << 7)
+		self._PS_c = bool(self._Acc & 0b01000000)
+		self._PS_v = bool(((self._Acc >> 6) ^ (self._Acc >> 5)) & 1)
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = bool((self._Acc & 0b10000000)>0)
+		self._pcIncrement()
+		pass
+
+	def _Sbx(self, opCode):
+		"""
+		MOS6502 undocumented instruction SBX
+		====================================
+		Set the X register to the accumulator ANDed with X, minus a value without borrow.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		result = (self._Acc & self._Reg_X) - self.sbxFunction[(opCode&0b11100)>>2](self)
+		self._PS_c = bool(result >= 0)
+		self._Reg_X = result & 0xFF
+		self._PS_z = bool(self._Reg_X == 0)
+		self._PS_n = bool((self._Reg_X & 0b10000000)>0)
+		self._pcIncrement()
+		pass
+
+	def _Nop(self, opCode):
+		"""
+		MOS6502 instruction NOP
+		=======================
+		Do nothing. The undocumented forms read their operand and ignore it.
+
+		Parameters
+		----------
+		opCode : int, optional
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		if opCode & 0x0F != 0x0A:
+			self.nopFunction[(opCode&0b11100)>>2](self)
+			self._pcIncrement()
+		pass
+
+	"""
+	Instruction Addressing Mode List
+	================================
+	"""
+	sloFunction = [
+		cpu._readIndirectX,
+		cpu._readZeroPage,
+		None,
+		cpu._readAbsolute,
+		cpu._readIndirectY,
+		cpu._readZeroPageX,
+		cpu._readAbsoluteY,
+		cpu._readAbsoluteX
+	]
+	rlaFunction = sloFunction
+	sreFunction = sloFunction
+	rraFunction = sloFunction
+	dcpFunction = sloFunction
+	iscFunction = sloFunction
+	saxFunction = [
+		cpu._readIndirectX,
+		cpu._readZeroPage,
+		None,
+		cpu._readAbsolute,
+		None,
+		cpu._readZeroPageY,
+		None,
+		None
+	]
+	laxFunction = [
+		cpu._readIndirectX,
+		cpu._readZeroPage,
+		None,
+		cpu._readAbsolute,
+		cpu._readIndirectY,
+		cpu._readZeroPageY,
+		None,
+		cpu._readAbsoluteY
+	]
+	ancFunction = [
+		None,
+		None,
+		cpu._readImmediate,
+		None,
+		None,
+		None,
+		None,
+		None
+	]
+	alrFunction = ancFunction
+	arrFunction = ancFunction
+	sbxFunction = ancFunction
+	nopFunction = [
+		cpu._readImmediate,
+		cpu._readZeroPage,
+		cpu._readImmediate,
+		cpu._readAbsolute,
+		None,
+		cpu._readZeroPageX,
+		None,
+		cpu._readAbsoluteX
+	]
+
+	_Brk, _Ora, _Asl, _Php, _Bpl, _Clc = cpu._Brk, cpu._Ora, cpu._Asl, cpu._Php, cpu._Bpl, cpu._Clc
+	_Jsr, _And, _Bit, _Rol, _Plp, _Bmi, _Sec = cpu._Jsr, cpu._And, cpu._Bit, cpu._Rol, cpu._Plp, cpu._Bmi, cpu._Sec
+	_Rti, _Eor, _Lsr, _Pha, _Jmp, _Bvc, _Cli = cpu._Rti, cpu._Eor, cpu._Lsr, cpu._Pha, cpu._Jmp, cpu._Bvc, cpu._Cli
+	_Rts, _Adc, _Ror, _Pla, _Bvs, _Sei = cpu._Rts, cpu._Adc, cpu._Ror, cpu._Pla, cpu._Bvs, cpu._Sei
+	_Sta, _Sty, _Stx, _Dey, _Txa, _Bcc, _Tya, _Txs = cpu._Sta, cpu._Sty, cpu._Stx, cpu._Dey, cpu._Txa, cpu._Bcc, cpu._Tya, cpu._Txs
+	_Ldy, _Lda, _Ldx, _Tay, _Tax, _Bcs, _Clv, _Tsx = cpu._Ldy, cpu._Lda, cpu._Ldx, cpu._Tay, cpu._Tax, cpu._Bcs, cpu._Clv, cpu._Tsx
+	_Cpy, _Cmp, _Dec, _Iny, _Dex, _Bne, _Cld = cpu._Cpy, cpu._Cmp, cpu._Dec, cpu._Iny, cpu._Dex, cpu._Bne, cpu._Cld
+	_Cpx, _Sbc, _Inc, _Inx, _Beq, _Sed = cpu._Cpx, cpu._Sbc, cpu._Inc, cpu._Inx, cpu._Beq, cpu._Sed
+
+	"""
+	Instruction List
+	================
+	"""
+	_instructions = [
+		#0,    1,    2,    3,    4,    5,    6,    7,    8,    9,    A,    B,    C,    D,    E,    F
+		[_Brk, _Ora, None, _Slo, _Nop, _Ora, _Asl, _Slo, _Php, _Ora, _Asl, _Anc, _Nop, _Ora, _Asl, _Slo], #0
+		[_Bpl, _Ora, None, _Slo, _Nop, _Ora, _Asl, _Slo, _Clc, _Ora, _Nop, _Slo, _Nop, _Ora, _Asl, _Slo], #1
+		[_Jsr, _And, None, _Rla, _Bit, _And, _Rol, _Rla, _Plp, _And, _Rol, _Anc, _Bit, _And, _Rol, _Rla], #2
+		[_Bmi, _And, None, _Rla, _Nop, _And, _Rol, _Rla, _Sec, _And, _Nop, _Rla, _Nop, _And, _Rol, _Rla], #3
+		[_Rti, _Eor, None, _Sre, _Nop, _Eor, _Lsr, _Sre, _Pha, _Eor, _Lsr, _Alr, _Jmp, _Eor, _Lsr, _Sre], #4
+		[_Bvc, _Eor, None, _Sre, _Nop, _Eor, _Lsr, _Sre, _Cli, _Eor, _Nop, _Sre, _Nop, _Eor, _Lsr, _Sre], #5
+		[_Rts, _Adc, None, _Rra, _Nop, _Adc, _Ror, _Rra, _Pla, _Adc, _Ror, _Arr, _Jmp, _Adc, _Ror, _Rra], #6
+		[_Bvs, _Adc, None, _Rra, _Nop, _Adc, _Ror, _Rra, _Sei, _Adc, _Nop, _Rra, _Nop, _Adc, _Ror, _Rra], #7
+		[_Nop, _Sta, _Nop, _Sax, _Sty, _Sta, _Stx, _Sax, _Dey, _Nop, _Txa, None, _Sty, _Sta, _Stx, _Sax], #8
+		[_Bcc, _Sta, None, None, _Sty, _Sta, _Stx, _Sax, _Tya, _Sta, _Txs, None, None, _Sta, None, None], #9
+		[_Ldy, _Lda, _Ldx, _Lax, _Ldy, _Lda, _Ldx, _Lax, _Tay, _Lda, _Tax, None, _Ldy, _Lda, _Ldx, _Lax], #A
+		[_Bcs, _Lda, None, _Lax, _Ldy, _Lda, _Ldx, _Lax, _Clv, _Lda, _Tsx, None, _Ldy, _Lda, _Ldx, _Lax], #B
+		[_Cpy, _Cmp, _Nop, _Dcp, _Cpy, _Cmp, _Dec, _Dcp, _Iny, _Cmp, _Dex, _Sbx, _Cpy, _Cmp, _Dec, _Dcp], #C
+		[_Bne, _Cmp, None, _Dcp, _Nop, _Cmp, _Dec, _Dcp, _Cld, _Cmp, _Nop, _Dcp, _Nop, _Cmp, _Dec, _Dcp], #D
+		[_Cpx, _Sbc, _Nop, _Isc, _Cpx, _Sbc, _Inc, _Isc, _Inx, _Sbc, _Nop, _Sbc, _Cpx, _Sbc, _Inc, _Isc], #E
+		[_Beq, _Sbc, None, _Isc, _Nop, _Sbc, _Inc, _Isc, _Sed, _Sbc, _Nop, _Isc, _Nop, _Sbc, _Inc, _Isc]  #F
+	]
+
+	_instructionCycles = [
+		#0, 1, 2, 3, 4, 5, 6, 7, 8, 9, A, B, C, D, E, F
+		[7, 6, 0, 8, 3, 3, 5, 5, 3, 2, 2, 2, 4, 4, 6, 6], #0
+		[2, 5, 0, 8, 4, 4, 6, 6, 2, 4, 2, 7, 4, 4, 7, 7], #1
+		[6, 6, 0, 8, 3, 3, 5, 5, 4, 2, 2, 2, 4, 4, 6, 6], #2
+		[2, 5, 0, 8, 4, 4, 6, 6, 2, 4, 2, 7, 4, 4, 7, 7], #3
+		[6, 6, 0, 8, 3, 3, 5, 5, 3, 2, 2, 2, 3, 4, 6, 6], #4
+		[2, 5, 0, 8, 4, 4, 6, 6, 2, 4, 2, 7, 4, 4, 7, 7], #5
+		[6, 6, 0, 8, 3, 3, 5, 5, 4, 2, 2, 2, 5, 4, 6, 6], #6
+		[2, 5, 0, 8, 4, 4, 6, 6, 2, 4, 2, 7, 4, 4, 7, 7], #7
+		[2, 6, 2, 6, 3, 3, 3, 3, 2, 2, 2, 0, 4, 4, 4, 4], #8
+		[2, 6, 0, 0, 4, 4, 4, 4, 2, 5, 2, 0, 0, 5, 0, 0], #9
+		[2, 6, 2, 6, 3, 3, 3, 3, 2, 2, 2, 0, 4, 4, 4, 4], #A
+		[2, 5, 0, 5, 4, 4, 4, 4, 2, 4, 2, 0, 4, 4, 4, 4], #B
+		[2, 6, 2, 8, 3, 3, 5, 5, 2, 2, 2, 2, 4, 4, 6, 6], #C
+		[2, 5, 0, 8, 4, 4, 6, 6, 2, 4, 2, 7, 4, 4, 7, 7], #D
+		[2, 6, 2, 8, 3, 3, 5, 5, 2, 2, 2, 2, 4, 4, 6, 6], #E
+		[2, 5, 0, 8, 4, 4, 6, 6, 2, 4, 2, 7, 4, 4, 7, 7]  #F
+	]
+
+class cmos(cpu):
+	"""
+	CMOS 65C02
+	==========
+	Adds the 65C02 instructions BRA, PHX, PHY, PLX, PLY, STZ, TSB, TRB, INC A
+	(INA) and DEC A (DEA), BIT with immediate and indexed modes, the zero page
+	indirect mode on ORA, AND, EOR, ADC, STA, LDA, CMP and SBC, and JMP
+	(absolute,X). JMP ($xxFF) reads the high byte of the vector from the next
+	page.
+	"""
+
+	_VARIANT = "65c02"
+
+	def _readZeroPageIndirect(self):
+		"""
+		Zero page indirect addressing mode
+		==================================
+		Read the second byte as an address to a word in zero page. Returns the word as an address.
+
+		Returns
+		-------
+		int
+			Address in the memory.
+		"""
+		return self.readWord(self.readByte(self._PC))
+
+	def _readAbsoluteIndirectX(self):
+		"""
+		Absolute indexed indirect addressing mode
+		=========================================
+		Reads the next two bytes in the instruction as an address, adds the X registor and returns the word there as an address.
+
+		Returns
+		-------
+		int
+			Address in the memory.
+		"""
+		address = (self.readWord(self._PC) + self._Reg_X) & 0xFFFF
+		self._pcIncrement()
+		return self.readWord(address)
+
+	def _Bra(self, opCode):
+		"""
+		65C02 instruction BRA
+		=====================
+		Branch always.
+
+		Parameters
+		----------
+		opCode : int, optional
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		offset = self._readRelative()
+		if (self._PC + 1 ^ self._PC + 1 + offset) & 0xFF00:
+			self._pageCrosses += 1
+		self._PC += offset
+		self._branchesTaken += 1
+		self._pcIncrement()
+		pass
+
+	def _Bit(self, opCode):
+		"""
+		65C02 instruction BIT
+		=====================
+		Test if one or more bits are in the target memory location. The
+		immediate form only sets the zero flag.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		if (opCode&0b11100)>>2 == 2:
+			data = self.bitFunction[2](self)
+		else:
+			dataAddress = self.bitFunction[(opCode&0b11100)>>2](self)
+			data = self.readByte(dataAddress)
+			self._PS_v = bool((data & 0b01000000)>0)
+			self._PS_n = bool((data & 0b10000000)>0)
+		self._PS_z = bool((self._Acc & data) == 0)
+		self._pcIncrement()
+		pass
+
+	def _Jmp(self, opCode):
+		"""
+		65C02 instruction JMP
+		=====================
+		Set the program counter (_PC) to specified address.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		if opCode == 0x4C:   # Absolute
+			dataAddress = self._readAbsolute()
+			self._PC = dataAddress
+		elif opCode == 0x6C: # Indirect
+			dataAddress = self._readAbsolute()
+			self._PC = self.readWord(dataAddress)
+		elif opCode == 0x7C: # Absolute indexed indirect
+			self._PC = self._readAbsoluteIndirectX()
+		self._pcIncrement()
+		pass
+
+	def _Stz(self, opCode):
+		"""
+		65C02 instruction STZ
+		=====================
+		Stores zero to memory.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.stzFunction[(opCode&0b11100)>>2 | (opCode&0b10)<<2](self)
+		self.writeByte(dataAddress, 0)
+		self._pcIncrement()
+		pass
+
+	def _Tsb(self, opCode):
+		"""
+		65C02 instruction TSB
+		=====================
+		Set the bits of the accumulator in a memory location. The zero flag is set from accumulator AND memory.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.tsbFunction[(opCode&0b11100)>>2](self)
+		data = self.readByte(dataAddress)
+		self._PS_z = bool((self._Acc & data) == 0)
+		self.writeByte(dataAddress, data | self._Acc)
+		self._pcIncrement()
+		pass
+
+	def _Trb(self, opCode):
+		"""
+		65C02 instruction TRB
+		=====================
+		Clear the bits of the accumulator in a memory location. The zero flag is set from accumulator AND memory.
+
+		Parameters
+		----------
+		opCode : int
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		dataAddress = self.trbFunction[(opCode&0b11100)>>2](self)
+		data = self.readByte(dataAddress)
+		self._PS_z = bool((self._Acc & data) == 0)
+		self.writeByte(dataAddress, data & ~self._Acc)
+		self._pcIncrement()
+		pass
+
+	def _Ina(self, opCode):
+		"""
+		65C02 instruction INC A
+		=======================
+		Adds 1 to the accumulator.
+
+		Parameters
+		----------
+		opCode : int, optional
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		self._Acc = (self._Acc + 1) & 0b11111111
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = bool((self._Acc & 0b10000000)>0)
+		pass
+
+	def _Dea(self, opCode):
+		"""
+		65C02 instruction DEC A
+		=======================
+		Subtracts 1 from the accumulator.
+
+		Parameters
+		----------
+		opCode : int, optional
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		self._Acc = (self._Acc - 1) & 0b11111111
+		self._PS_z = bool(self._Acc == 0)
+		self._PS_n = bool((self._Acc & 0b10000000)>0)
+		pass
+
+	def _Phx(self, opCode):
+		"""
+		65C02 instruction PHX
+		=====================
+		Pushes the content of the X register on to the stack.
+
+		Parameters
+		----------
+		opCode : int, optional
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		self.writeByte(self._SP, self._Reg_X)
+		self._SP -= 1
+		if self._SP < self._stackLow:
+			self._stackLow = self._SP
+		pass
+
+	def _Phy(self, opCode):
+		"""
+		65C02 instruction PHY
+		=====================
+		Pushes the content of the Y register on to the stack.
+
+		Parameters
+		----------
+		opCode : int, optional
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		self.writeByte(self._SP, self._Reg_Y)
+		self._SP -= 1
+		if self._SP < self._stackLow:
+			self._stackLow = self._SP
+		pass
+
+	def _Plx(self, opCode):
+		"""
+		65C02 instruction PLX
+		=====================
+		Pulls the X register from the stack.
+
+		Parameters
+		----------
+		opCode : int, optional
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		self._Reg_X = self.readByte(self._SP)
+		self._SP += 1
+		self._PS_z = bool(self._Reg_X == 0)
+		self._PS_n = bool((self._Reg_X & 0b10000000)>0)
+		pass
+
+	def _Ply(self, opCode):
+		"""
+		65C02 instruction PLY
+		=====================
+		Pulls the Y register from the stack.
+
+		Parameters
+		----------
+		opCode : int, optional
+			Opcode that is currently executing. Used for determine addressing mode.
+		"""
+		self._pcIncrement()
+		self._Reg_Y = self.readByte(self._SP)
+		self._SP += 1
+		self._PS_z = bool(self._Reg_Y == 0)
+		self._PS_n = bool((self._Reg_Y & 0b10000000)>0)
+		pass
+
+	"""
+	Instruction Addressing Mode List
+	================================
+	Entries 8~15 are used by opcodes ending in bits 10.
+	"""
+	adcFunction = cpu.adcFunction + [None, None, None, None, _readZeroPageIndirect, None, None, None]
+	andFunction = cpu.andFunction + [None, None, None, None, _readZeroPageIndirect, None, None, None]
+	cmpFunction = cpu.cmpFunction + [None, None, None, None, _readZeroPageIndirect, None, None, None]
+	eorFunction = cpu.eorFunction + [None, None, None, None, _readZeroPageIndirect, None, None, None]
+	ldaFunction = cpu.ldaFunction + [None, None, None, None, _readZeroPageIndirect, None, None, None]
+	oraFunction = cpu.oraFunction + [None, None, None, None, _readZeroPageIndirect, None, None, None]
+	sbcFunction = cpu.sbcFunction + [None, None, None, None, _readZeroPageIndirect, None, None, None]
+	staFunction = cpu.staFunction + [None, None, None, None, _readZeroPageIndirect, None, None, None]
+	bitFunction = [
+		None,
+		cpu._readZeroPage,
+		cpu._readImmediate,
+		cpu._readAbsolute,
+		None,
+		cpu._readZeroPageX,
+		None,
+		cpu._readAbsoluteX
+	]
+	stzFunction = [
+		None,
+		cpu._readZeroPage,
+		None,
+		None,
+		None,
+		cpu._readZeroPageX,
+		None,
+		cpu._readAbsolute,
+		None,
+		None,
+		None,
+		None,
+		None,
+		None,
+		None,
+		cpu._readAbsoluteX
+	]
+	tsbFunction = [
+		None,
+		cpu._readZeroPage,
+		None,
+		cpu._readAbsolute,
+		None,
+		None,
+		None,
+		None
+	]
+	trbFunction = [
+		None,
+		None,
+		None,
+		None,
+		None,
+		cpu._readZeroPage,
+		None,
+		cpu._readAbsolute
+	]
+
+	_Brk, _Ora, _Asl, _Php, _Bpl, _Clc = cpu._Brk, cpu._Ora, cpu._Asl, cpu._Php, cpu._Bpl, cpu._Clc
+	_Jsr, _And, _Rol, _Plp, _Bmi, _Sec = cpu._Jsr, cpu._And, cpu._Rol, cpu._Plp, cpu._Bmi, cpu._Sec
+	_Rti, _Eor, _Lsr, _Pha, _Bvc, _Cli = cpu._Rti, cpu._Eor, cpu._Lsr, cpu._Pha, cpu._Bvc, cpu._Cli
+	_Rts, _Adc, _Ror, _Pla, _Bvs, _Sei = cpu._Rts, cpu._Adc, cpu._Ror, cpu._Pla, cpu._Bvs, cpu._Sei
+	_Sta, _Sty, _Stx, _Dey, _Txa, _Bcc, _Tya, _Txs = cpu._Sta, cpu._Sty, cpu._Stx, cpu._Dey, cpu._Txa, cpu._Bcc, cpu._Tya, cpu._Txs
+	_Ldy, _Lda, _Ldx, _Tay, _Tax, _Bcs, _Clv, _Tsx = cpu._Ldy, cpu._Lda, cpu._Ldx, cpu._Tay, cpu._Tax, cpu._Bcs, cpu._Clv, cpu._Tsx
+	_Cpy, _Cmp, _Dec, _Iny, _Dex, _Bne, _Cld = cpu._Cpy, cpu._Cmp, cpu._Dec, cpu._Iny, cpu._Dex, cpu._Bne, cpu._Cld
+	_Cpx, _Sbc, _Inc, _Inx, _Nop, _Beq, _Sed = cpu._Cpx, cpu._Sbc, cpu._Inc, cpu._Inx, cpu._Nop, cpu._Beq, cpu._Sed
+
+	"""
+	Instruction List
+	================
+	"""
+	_instructions = [
+		#0,    1,    2,    3,    4,    5,    6,    7,    8,    9,    A,    B,    C,    D,    E,    F
+		[_Brk, _Ora, None, None, _Tsb, _Ora, _Asl, None, _Php, _Ora, _Asl, None, _Tsb, _Ora, _Asl, None], #0
+		[_Bpl, _Ora, _Ora, None, _Trb, _Ora, _Asl, None, _Clc, _Ora, _Ina, None, _Trb, _Ora, _Asl, None], #1
+		[_Jsr, _And, None, None, _Bit, _And, _Rol, None, _Plp, _And, _Rol, None, _Bit, _And, _Rol, None], #2
+		[_Bmi, _And, _And, None, _Bit, _And, _Rol, None, _Sec, _And, _Dea, None, _Bit, _And, _Rol, None], #3
+		[_Rti, _Eor, None, None, None, _Eor, _Lsr, None, _Pha, _Eor, _Lsr, None, _Jmp, _Eor, _Lsr, None], #4
+		[_Bvc, _Eor, _Eor, None, None, _Eor, _Lsr, None, _Cli, _Eor, _Phy, None, None, _Eor, _Lsr, None], #5
+		[_Rts, _Adc, None, None, _Stz, _Adc, _Ror, None, _Pla, _Adc, _Ror, None, _Jmp, _Adc, _Ror, None], #6
+		[_Bvs, _Adc, _Adc, None, _Stz, _Adc, _Ror, None, _Sei, _Adc, _Ply, None, _Jmp, _Adc, _Ror, None], #7
+		[_Bra, _Sta, None, None, _Sty, _Sta, _Stx, None, _Dey, _Bit, _Txa, None, _Sty, _Sta, _Stx, None], #8
+		[_Bcc, _Sta, _Sta, None, _Sty, _Sta, _Stx, None, _Tya, _Sta, _Txs, None, _Stz, _Sta, _Stz, None], #9
+		[_Ldy, _Lda, _Ldx, None, _Ldy, _Lda, _Ldx, None, _Tay, _Lda, _Tax, None, _Ldy, _Lda, _Ldx, None], #A
+		[_Bcs, _Lda, _Lda, None, _Ldy, _Lda, _Ldx, None, _Clv, _Lda, _Tsx, None, _Ldy, _Lda, _Ldx, None], #B
+		[_Cpy, _Cmp, None, None, _Cpy, _Cmp, _Dec, None, _Iny, _Cmp, _Dex, None, _Cpy, _Cmp, _Dec, None], #C
+		[_Bne, _Cmp, _Cmp, None, None, _Cmp, _Dec, None, _Cld, _Cmp, _Phx, None, None, _Cmp, _Dec, None], #D
+		[_Cpx, _Sbc, None, None, _Cpx, _Sbc, _Inc, None, _Inx, _Sbc, _Nop, None, _Cpx, _Sbc, _Inc, None], #E
+		[_Beq, _Sbc, _Sbc, None, None, _Sbc, _Inc, None, _Sed, _Sbc, _Plx, None, None, _Sbc, _Inc, None]  #F
+	]
+
+	_instructionCycles = [
+		#0, 1, 2, 3, 4, 5, 6, 7, 8, 9, A, B, C, D, E, F
+		[7, 6, 0, 0, 5, 3, 5, 0, 3, 2, 2, 0, 6, 4, 6, 0], #0
+		[2, 5, 5, 0, 5, 4, 6, 0, 2, 4, 2, 0, 6, 4, 7, 0], #1
+		[6, 6, 0, 0, 3, 3, 5, 0, 4, 2, 2, 0, 4, 4, 6, 0], #2
+		[2, 5, 5, 0, 4, 4, 6, 0, 2, 4, 2, 0, 4, 4, 7, 0], #3
+		[6, 6, 0, 0, 0, 3, 5, 0, 3, 2, 2, 0, 3, 4, 6, 0], #4
+		[2, 5, 5, 0, 0, 4, 6, 0, 2, 4, 3, 0, 0, 4, 7, 0], #5
+		[6, 6, 0, 0, 3, 3, 5, 0, 4, 2, 2, 0, 6, 4, 6, 0], #6
+		[2, 5, 5, 0, 4, 4, 6, 0, 2, 4, 4, 0, 6, 4, 7, 0], #7
+		[3, 6, 0, 0, 3, 3, 3, 0, 2, 2, 2, 0, 4, 4, 4, 0], #8
+		[2, 6, 5, 0, 4, 4, 4, 0, 2, 5, 2, 0, 4, 5, 5, 0], #9
+		[2, 6, 2, 0, 3, 3, 3, 0, 2, 2, 2, 0, 4, 4, 4, 0], #A
+		[2, 5, 5, 0, 4, 4, 4, 0, 2, 4, 2, 0, 4, 4, 4, 0], #B
+		[2, 6, 0, 0, 3, 3, 5, 0, 2, 2, 2, 0, 4, 4, 6, 0], #C
+		[2, 5, 5, 0, 0, 4, 6, 0, 2, 4, 3, 0, 0, 4, 7, 0], #D
+		[2, 6, 0, 0, 3, 3, 5, 0, 2, 2, 2, 0, 4, 4, 6, 0], #E
+		[2, 5, 5, 0, 0, 4, 6, 0, 2, 4, 4, 0, 0, 4, 7, 0]  #F
+	]
+
+VARIANTS = {"6502": cpu, "nmos": nmos, "65c02": cmos}
@@ -0,0 +1,31 @@
+import os
+import shutil
+
+import batch as batchModule
+from batch import batch, engineVersion, resultcache
+
+def test_result_cache_round_trip(tmp_path):
+	cache = resultcache(str(tmp_path / "cache"))
+	runner = batch(cache)
+	job = {"binary": bytes([0xA9, 0x07, 0x85, 0x10, 0x02]), "address": 0x200, "state": {"_PC": 0x200}, "regions": {"out": (0x10, 0x11)}}
+	first = runner.runJob(job)
+	second = runner.runJob(job)
+	assert first["cached"] is False and second["cached"] is True
+	assert second["memory"] == first["memory"] == {"out": "07"}
+	assert (runner.hits, runner.misses) == (1, 1)
+
+def test_engine_version_hashes_the_engine_modules(tmp_path, monkeypatch):
+	source = os.path.join(os.path.dirname(__file__), "..", "src")
+	for name in os.listdir(source):
+		if name.endswith(".py"):
+			shutil.copy(os.path.join(source, name), str(tmp_path / name))
+	monkeypatch.setattr(batchModule, "__file__", str(tmp_path / "batch.py"))
+	version = engineVersion()
+	assert engineVersion("nmos") != version
+	assert engineVersion(engine="step") != version
+	with open(str(tmp_path / "runner.py"), "a") as file:
+		file.write("\n# Not part of the engine\n")
+	assert engineVersion() == version
+	with open(str(tmp_path / "bus.py"), "a") as file:
+		file.write("\n# Part of the engine\n")
+	assert engineVersion() != version
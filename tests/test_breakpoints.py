@@ -0,0 +1,50 @@
+from breakpoints import breakpoints
+from cpu import cpu
+
+def _machine():
+	CPU = cpu()
+	# LDA #$EA ; STA $0210 ; LDA $0220, then the unimplemented opcode $02
+	CPU._memory.load(0x200, bytes([0xA9, 0xEA, 0x8D, 0x10, 0x02, 0xAD, 0x20, 0x02, 0x02]))
+	CPU._memory.Data[0x220] = 0x60
+	CPU._PC = 0x200
+	return CPU
+
+def test_breakpoints_leave_guest_memory_alone():
+	CPU = _machine()
+	points = breakpoints(CPU)
+	points.addBreakpoint(0x210)
+	points.addBreakpoint(0x220)
+	assert points.run() is None
+	assert CPU._memory.Data[0x210] == 0xEA
+	assert CPU._memory.Data[0x220] == 0x60
+	# The guest reads its own data on a breakpoint address
+	assert CPU._Acc == 0x60
+
+def test_run_loop_stops_on_breakpoints():
+	CPU = _machine()
+	# Only the run loop may execute up to the breakpoint
+	CPU.step = None
+	points = breakpoints(CPU)
+	points.addBreakpoint(0x205, "A == $EA")
+	assert points.run() == (0x205, 0x205, None)
+	assert CPU._memory.Data[0x205] == 0xAD
+	assert points.hits == {0x205: 1}
+
+def test_cpu_run_stops_on_breaks_with_and_without_hooks():
+	plain, hooked = _machine(), _machine()
+	hooked.addHook("test", "writeByte", lambda writeByte: writeByte)
+	for CPU in (plain, hooked):
+		CPU.run(breaks={0x205})
+		assert (CPU._PC, CPU._cycles, CPU._Acc) == (0x205, 6, 0xEA)
+		CPU.run(breaks=set())
+		assert (CPU._PC, CPU._Acc) == (0x208, 0x60)
+
+def test_hooks_removed_with_the_last_watch():
+	CPU = _machine()
+	points = breakpoints(CPU)
+	points.addWatch(0x210, 0x211)
+	CPU.counters.watch({"code": (0x200, 0x300)})
+	points.removeWatch(0x210, 0x211)
+	assert CPU._hooks["writeByte"][0][0] is CPU.counters
+	CPU.counters.unwatch()
+	assert not CPU._hooks and "writeByte" not in CPU.__dict__
@@ -0,0 +1,72 @@
+import io
+
+from console import console
+from cpu import cpu
+
+# LDA $F001 ; BEQ +6 ; STA $F000 ; JMP $01FF (lands on $0200) ; then the unimplemented opcode $02, 13 cycles a character
+_ECHO = bytes([0xAD, 0x01, 0xF0, 0xF0, 0x06, 0x8D, 0x00, 0xF0, 0x4C, 0xFF, 0x01, 0x02])
+
+def _noStep(self):
+	raise AssertionError("run() fell back to step()")
+
+def _echo(bufferSize=0x2000):
+	CPU = cpu()
+	CPU._memory.load(0x0200, _ECHO)
+	CPU._PC = 0x0200
+	output = io.BytesIO()
+	device = console(CPU, output=output, bufferSize=bufferSize)
+	# Device pages are served by the generated run loop, not by stepping
+	CPU.step = _noStep.__get__(CPU)
+	return CPU, device, output
+
+def test_run_echoes_input_to_output():
+	CPU, device, output = _echo()
+	device.feed("hello ")
+	device.feed(b"world")
+	CPU.run(cycles=10000)
+	assert CPU._PC == 0x020B
+	# Polling the empty input shows what was printed so far
+	assert output.getvalue() == b"hello world"
+
+def test_output_is_flushed_in_blocks():
+	CPU, device, output = _echo(bufferSize=4)
+	device.feed(b"abcdef")
+	CPU.run(cycles=5*13)
+	assert output.getvalue() == b"abcd"
+	CPU.run(cycles=10000)
+	assert output.getvalue() == b"abcdef"
+
+def test_status_and_plain_memory_on_a_device_page():
+	CPU = cpu()
+	device = console(CPU, output=io.BytesIO())
+	# LDA $F002 ; STA $10 ; STA $F010 ; LDA $F001 ; STA $11 ; LDA $F010 ; STA $12
+	CPU._memory.load(0x0200, bytes([0xAD, 0x02, 0xF0, 0x85, 0x10, 0x8D, 0x10, 0xF0, 0xAD, 0x01, 0xF0, 0x85, 0x11, 0xAD, 0x10, 0xF0, 0x85, 0x12, 0x02]))
+	CPU._PC = 0x0200
+	device.feed(b"x")
+	CPU.run()
+	assert CPU._memory.Data[0x10] == 0b011
+	assert CPU._memory.Data[0x11] == ord("x")
+	assert CPU._memory.Data[0x12] == 0b011
+	assert CPU._memory.Data[0xF010] == 0b011
+
+	device.feed(None)
+	assert device.read(0xF002) == 0b110
+
+def test_state_round_trip_and_close():
+	CPU = cpu()
+	cls = type(CPU)
+	device = console(CPU, output=io.BytesIO())
+	assert type(CPU) is not cls
+	device.feed(b"ab")
+	device.feed(None)
+	assert device.read(0xF001) == ord("a")
+	state = device.readState()
+	assert state == b"\x01b"
+
+	other = console(cpu(), output=io.BytesIO())
+	other.writeState(state)
+	assert other.read(0xF001) == ord("b")
+	assert other.read(0xF002) & 0b100
+
+	device.close()
+	assert type(CPU) is cls
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from cpu import cpu
+
+# LDA #$80 ; TAX ; TXS ; JSR $0300, then the unimplemented opcode $02
+_MOVE = bytes([0xA9, 0x80, 0xAA, 0x9A, 0x20, 0x00, 0x03, 0x02])
+# PHA, then the unimplemented opcode $02
+_PUSH = bytes([0x48, 0x02])
+
+def _machine(code):
+	CPU = cpu()
+	CPU._memory.load(0x0200, code)
+	CPU._memory.load(0x0300, _PUSH)
+	CPU._PC = 0x0200
+	return CPU
+
+@pytest.mark.parametrize("engine", ("run", "execute"))
+def test_stack_depth_from_a_moved_stack_pointer(engine):
+	CPU = _machine(_MOVE)
+	getattr(CPU, engine)()
+	# JSR pushes 2 bytes and PHA 1 below the stack pointer set by TXS
+	assert CPU._SP == 0x7D
+	assert CPU.counters.sample()["maxStackDepth"] == 3
+
+def test_stack_depth_from_a_written_state():
+	# JSR $0300, then the unimplemented opcode $02
+	CPU = _machine(bytes([0x20, 0x00, 0x03, 0x02]))
+	CPU.writeState((0x0200, 0x01F0) + CPU.readState()[2:])
+	CPU.run()
+	assert CPU.counters.sample()["maxStackDepth"] == 3
+	# A shallower stack later does not hide the deepest one
+	CPU.writeState((0x0300, 0x01F0) + CPU.readState()[2:])
+	CPU.run()
+	assert CPU.counters.sample()["maxStackDepth"] == 3
+
+def test_exports(tmp_path):
+	CPU = _machine(_MOVE)
+	CPU.counters.watch({"stack": (0x0000, 0x0100), 'say "hi"': (0x0200, 0x0208)})
+	CPU.run()
+	CPU.counters.unwatch()
+	sample = CPU.counters.sample()
+	assert sample["instructions"] == 5
+	assert sample["memory"]["stack"] == {"reads": 0, "writes": 3}
+
+	CPU.counters.saveJSON(str(tmp_path / "counters.json"))
+	with open(str(tmp_path / "counters.json")) as file:
+		assert json.load(file) == sample
+
+	CPU.counters.savePrometheus(str(tmp_path / "emu6502.prom"), labels={"instance": "worker-3"})
+	with open(str(tmp_path / "emu6502.prom")) as file:
+		lines = file.read().splitlines()
+	assert "# TYPE emu6502_instructions_total counter" in lines
+	assert 'emu6502_instructions_total{instance="worker-3"} 5' in lines
+	assert 'emu6502_branches_total{instance="worker-3",outcome="taken"} 0' in lines
+	assert 'emu6502_stack_depth_max{instance="worker-3"} 3' in lines
+	assert 'emu6502_memory_writes_total{instance="worker-3",region="stack"} 3' in lines
+	assert 'emu6502_memory_reads_total{instance="worker-3",region="say \\"hi\\""} 7' in lines
+	assert not (tmp_path / "emu6502.prom.tmp").exists()
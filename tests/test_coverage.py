@@ -0,0 +1,69 @@
+from coverage import coverage
+from cpu import cpu
+
+def _run(code, variant=None):
+	CPU = cpu(variant=variant)
+	CPU._memory.load(0x200, code)
+	CPU._PC = 0x200
+	collected = coverage(CPU)
+	collected.execute()
+	return collected
+
+def test_coverage_round_trip(tmp_path):
+	CPU = cpu()
+	CPU._memory.Data[0x200:0x205] = bytes([0xA9, 0x00, 0xF0, 0x00, 0x02])
+	CPU._PC = 0x200
+	collected = coverage(CPU)
+	collected.execute()
+	collected.save(str(tmp_path / "run.cov"))
+
+	loaded = coverage()
+	loaded.load(str(tmp_path / "run.cov"))
+	for name in ("executed", "taken", "notTaken", "opcodes"):
+		assert getattr(loaded, name) == getattr(collected, name)
+
+def test_branch_with_offset_zero_is_taken():
+	# LDA #$00 ; BEQ +0 ; BNE +0, then the unimplemented opcode $02
+	collected = _run(bytes([0xA9, 0x00, 0xF0, 0x00, 0xD0, 0x00, 0x02]))
+	assert (collected.taken[0x202], collected.notTaken[0x202]) == (1, 0)
+	assert (collected.taken[0x204], collected.notTaken[0x204]) == (0, 1)
+
+def test_reports_decode_the_variant_of_the_cpu():
+	# BRA +0, then the unimplemented opcode $02
+	collected = _run(bytes([0x80, 0x00, 0x02]), variant="65c02")
+	assert collected.report()["pairs"]["BRA Relative"] is True
+	assert "BRA" in collected.annotate(collected._cpu._memory.Data, 0x200, 0x201)
+	assert "BRA Relative" not in coverage().report()["pairs"]
+
+def _trapped():
+	CPU = cpu()
+	# LDA #$00 ; BEQ +0 ; BNE +0 ; JSR $0300 ; CMP #$01 ; BEQ +2 ; LDA #$01, then the unimplemented opcode $02
+	CPU._memory.load(0x200, bytes([0xA9, 0x00, 0xF0, 0x00, 0xD0, 0x00, 0x20, 0x00, 0x03, 0xC9, 0x01, 0xF0, 0x02, 0xA9, 0x01, 0x02]))
+	# NOP, replaced by a trap
+	CPU._memory.Data[0x300] = 0xEA
+	CPU.registerTrap(0x300, lambda CPU: None)
+	CPU._PC = 0x200
+	return CPU
+
+def test_run_loop_marks_like_step():
+	CPU = _trapped()
+	collected = coverage(CPU)
+	collected.execute()
+	assert "_coverCore" in type(CPU).__dict__
+
+	stepped = coverage(_trapped())
+	while stepped.step():
+		pass
+	for name in ("executed", "taken", "notTaken", "opcodes"):
+		assert getattr(collected, name) == getattr(stepped, name)
+	assert collected._cpu.readState() == stepped._cpu.readState()
+
+def test_traps_count_as_their_original_opcode():
+	collected = coverage(_trapped())
+	collected.execute()
+	stepped = coverage(_trapped())
+	while stepped.step():
+		pass
+	for marked in (collected, stepped):
+		assert marked.executed[0x300] == 1
+		assert marked.opcodes[0xEA] == 1 and marked.opcodes[0x02] == 0
@@ -0,0 +1,99 @@
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from banking import bankedmemory
+from cpu import cpu
+from sparse import sparsememory
+
+VARIANTS = ("6502", "nmos", "65c02")
+MEMORIES = {
+	"flat": lambda: None,
+	"banked": lambda: bankedmemory(0x2000),
+	"sparse": lambda: sparsememory()
+}
+
+def _programs(cls, count, seed):
+	"""
+	Random memory images with mostly implemented opcodes at $0200 and random initial states.
+	"""
+	rnd = random.Random(seed)
+	implemented = [opCode for opCode in range(0x100) if cls._handlers[opCode] is not None]
+	for _ in range(count):
+		image = bytearray(rnd.randrange(0x100) for _ in range(0x10000))
+		for address in range(0x200, 0x300):
+			if rnd.random() < 0.7:
+				image[address] = rnd.choice(implemented)
+		state = (0x200, 0x1F0, rnd.randrange(0x100), rnd.randrange(0x100), rnd.randrange(0x100)) + tuple(rnd.random() < 0.5 for _ in range(7)) + (0,)
+		yield image, state
+
+def _methods(CPU):
+	"""
+	Execute through the handler methods in `_instructions`, as step() did before the handlers were generated.
+	"""
+	cls = type(CPU)
+	opCode = CPU.readByte(CPU._PC)
+	instruction = cls._instructions[opCode >> 4][opCode & 0x0F]
+	if instruction is None:
+		return False
+	CPU._cycles += cls._instructionCycles[opCode >> 4][opCode & 0x0F]
+	instruction(CPU, opCode)
+	return True
+
+def _outcome(CPU, image, state, engine):
+	"""
+	Error, state, memory and dirty pages after running a program for 1000 cycles on an engine.
+	"""
+	CPU._memory.Data[:] = image
+	CPU._memory.Dirty[:] = bytes(len(CPU._memory.Dirty))
+	CPU.writeState(state)
+	error = None
+	try:
+		if engine == "run":
+			CPU.run(cycles=1000)
+		else:
+			step = _methods if engine == "methods" else type(CPU).step
+			while CPU._cycles < 1000 and step(CPU):
+				pass
+	except Exception as exception:
+		error = type(exception).__name__
+	return (error, CPU.readState(), bytes(CPU._memory.Data), bytes(CPU._memory.Dirty))
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_handlers_match_methods(variant):
+	CPU = cpu(variant=variant)
+	for image, state in _programs(type(CPU), 30, 7):
+		assert _outcome(CPU, image, state, "methods") == _outcome(CPU, image, state, "step")
+
+@pytest.mark.parametrize("memory", sorted(MEMORIES))
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_run_matches_step(variant, memory):
+	CPU = cpu(variant=variant, ram=MEMORIES[memory]())
+	for image, state in _programs(type(CPU), 30, 7):
+		assert _outcome(CPU, image, state, "step") == _outcome(CPU, image, state, "run")
+
+def test_run_stops_on_cycle_budget():
+	CPU = cpu()
+	# LDA #$05 ; JMP $01FF, the jump lands on $0200
+	CPU._memory.Data[0x200:0x205] = bytes([0xA9, 0x05, 0x4C, 0xFF, 0x01])
+	CPU._PC = 0x200
+	CPU.run(cycles=1000)
+	assert 1000 <= CPU._cycles < 1010
+
+def test_variants_generate_on_first_use():
+	# A fresh interpreter, other tests have made cpus of every variant already
+	script = "\n".join((
+		"from cpu import cpu",
+		"from variants import nmos, cmos",
+		"assert not any(name in cls.__dict__ for cls in (nmos, cmos) for name in ('_handlers', '_handlerCycles', '_runCore'))",
+		"CPU = cpu(variant='nmos')",
+		"assert type(CPU) is nmos and nmos._handlers is not cpu._handlers and nmos._handlers[0xA7] is not None",
+		"assert '_runCore' not in cmos.__dict__",
+		"assert type(cmos()) is cmos and cmos._handlers[0x80] is not None"
+	))
+	result = subprocess.run((sys.executable, "-c", script), cwd=os.path.join(os.path.dirname(__file__), "..", "src"),
+		capture_output=True, text=True, timeout=60)
+	assert result.returncode == 0, result.stderr
@@ -0,0 +1,52 @@
+import zlib
+
+from framebuffer import framebuffer
+from memory import memory
+
+def test_first_frame_is_all_changed():
+	data = memory()
+	screen = framebuffer(data, 0x2000, 64, 8)
+	assert screen.changes() == [(0, 0, 64, 8)]
+	assert screen.changes() == []
+
+def test_bitmap_changes_merge_rows():
+	data = memory()
+	screen = framebuffer(data, 0x2000, 64, 8)
+	screen.changes()
+	# 8 bytes per row, byte 1 on rows 2 and 3 and bytes 4 to 5 on row 2
+	data.load(0x2000 + 2*8 + 1, b"\xFF")
+	data.load(0x2000 + 3*8 + 1, b"\xFF")
+	data.load(0x2000 + 2*8 + 4, b"\x01\x80")
+	assert sorted(screen.changes()) == [(8, 2, 8, 2), (32, 2, 16, 1)]
+	assert screen.changes() == []
+
+def test_changes_reaching_the_last_row():
+	data = memory()
+	screen = framebuffer(data, 0x2000, 16, 4, depth=8)
+	screen.changes()
+	data.load(0x2000 + 2*16 + 3, b"\x10")
+	data.load(0x2000 + 3*16 + 3, b"\x20")
+	assert screen.changes() == [(3, 2, 1, 2)]
+
+def test_character_changes_are_cells():
+	data = memory()
+	screen = framebuffer(data, 0x0400, 4, 2, mode="character")
+	screen.changes()
+	data.load(0x0400 + 1*4 + 2, b"A")
+	assert screen.changes() == [(16, 8, 8, 8)]
+
+def test_pixels_and_images():
+	data = memory()
+	screen = framebuffer(data, 0x2000, 8, 2)
+	data.load(0x2000, b"\x81\x00")
+	screen.changes()
+	white, black = b"\xFF\xFF\xFF", b"\x00\x00\x00"
+	assert screen.pixels((0, 0, 8, 1)) == white + black*6 + white
+	assert screen.pixels((7, 0, 1, 2)) == white + black
+	assert screen.ppm((0, 1, 2, 1)) == b"P6\n2 1\n255\n" + black*2
+
+	image = screen.png()
+	assert image.startswith(b"\x89PNG\r\n\x1a\n")
+	start = image.index(b"IDAT") + 4
+	raw = zlib.decompress(image[start:])
+	assert raw == b"\x00" + white + black*6 + white + b"\x00" + black*8
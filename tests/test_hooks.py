@@ -0,0 +1,79 @@
+from cpu import cpu
+from rewind import rewind
+
+# LDA #$07 ; STA $10 ; LDA $F000 ; STA $11 ; STA $F001, then the unimplemented opcode $02
+_PROGRAM = bytes([0xA9, 0x07, 0x85, 0x10, 0xAD, 0x00, 0xF0, 0x85, 0x11, 0x8D, 0x01, 0xF0, 0x02])
+
+class _device:
+	"""
+	Port returning the cycle count of each read and logging writes with theirs.
+	"""
+
+	def __init__(self, cpu):
+		self._cpu = cpu
+		self.log = list()
+
+	def read(self, address):
+		self.log.append(("read", address, self._cpu._cycles))
+		return self._cpu._cycles
+
+	def write(self, address, value):
+		self.log.append(("write", address, value, self._cpu._cycles))
+
+def _machine():
+	CPU = cpu()
+	CPU._memory.load(0x200, _PROGRAM)
+	CPU._PC = 0x200
+	return CPU
+
+def _hooked(CPU):
+	return sorted(name for name in ("readByte", "readWord", "writeByte", "writeWord") if name in CPU.__dict__)
+
+def test_hooks_removed_out_of_order():
+	CPU = _machine()
+	history = rewind(CPU)
+	CPU.counters.watch({"zero page": (0x0000, 0x0100)})
+	history.close()
+	assert _hooked(CPU) == ["readByte", "readWord", "writeByte", "writeWord"]
+	CPU.execute()
+	assert CPU.counters.sample()["memory"]["zero page"]["writes"] == 2
+	assert not history._writes
+	CPU.counters.unwatch()
+	assert _hooked(CPU) == []
+	history.close()
+	CPU.counters.unwatch()
+	assert _hooked(CPU) == []
+
+def test_hooks_stack_in_order():
+	CPU = _machine()
+	calls = list()
+	CPU.addHook("first", "writeByte", lambda inner: lambda a, v: (calls.append("first"), inner(a, v)))
+	CPU.addHook("second", "writeByte", lambda inner: lambda a, v: (calls.append("second"), inner(a, v)))
+	CPU.writeByte(0x10, 1)
+	assert calls == ["second", "first"]
+	assert CPU.removeHook("first") == 1
+	assert CPU.removeHook("first") == 0
+	CPU.writeByte(0x10, 2)
+	assert calls[2:] == ["second"] and CPU._memory.Data[0x10] == 2
+
+def test_device_served_from_run():
+	stepped, ran = _machine(), _machine()
+	for CPU in (stepped, ran):
+		CPU.attachDevice(_device(CPU), 0xF000, 0xF002)
+	while stepped.step():
+		pass
+	ran.run()
+	assert "readByte" not in ran.__dict__
+	assert ran.readState() == stepped.readState()
+	assert ran._memory.Data[0x10:0x12] == stepped._memory.Data[0x10:0x12] == bytes([7, 9])
+	assert ran._ports[0xF000].log == stepped._ports[0xF000].log == [("read", 0xF000, 9), ("write", 0xF001, 9, 16)]
+
+def test_device_attached_under_hooks():
+	CPU = _machine()
+	CPU.counters.watch({"ports": (0xF000, 0xF002)})
+	CPU.attachDevice(_device(CPU), 0xF000, 0xF002)
+	CPU.run()
+	assert CPU.counters.sample()["memory"]["ports"] == {"reads": 1, "writes": 1}
+	CPU.counters.unwatch()
+	CPU.detachDevice(CPU._ports[0xF000])
+	assert type(CPU) is cpu and _hooked(CPU) == []
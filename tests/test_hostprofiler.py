@@ -0,0 +1,58 @@
+import json
+
+from cpu import cpu
+from hostprofiler import hostprofiler
+
+# LDA #$05 ; STA $10 ; LDA $0300,X ; JSR $0400 (trapped), then the unimplemented opcode $02
+_PROGRAM = bytes([0xA9, 0x05, 0x85, 0x10, 0xBD, 0x00, 0x03, 0x20, 0x00, 0x04, 0x02])
+
+def _machine():
+	CPU = cpu()
+	CPU._memory.load(0x0200, _PROGRAM)
+	CPU._memory.load(0x0300, b"\x2A")
+	CPU._PC = 0x0200
+	CPU.registerTrap(0x0400, lambda CPU: None)
+	return CPU
+
+def test_counts_handlers_helpers_and_traps():
+	CPU = _machine()
+	profiler = hostprofiler(CPU)
+	profiler.run()
+	assert (CPU._Acc, CPU._memory.Data[0x10], CPU._PC) == (0x2A, 0x05, 0x020A)
+	# The instance is left without the helper timers
+	assert not any(name in CPU.__dict__ for name in hostprofiler._HELPERS)
+
+	report = profiler.report()
+	entries = {entry["name"]: entry for entry in report["entries"]}
+	assert entries["_Lda"]["calls"] == 2
+	assert entries["_Sta"]["calls"] == 1
+	assert entries["_Jsr"]["calls"] == 1
+	assert entries["_readImmediate"]["calls"] == 1
+	assert entries["_readZeroPage"]["calls"] == 1
+	assert entries["_readAbsoluteX"]["calls"] == 1
+	assert entries["dispatch"]["calls"] == 4
+	assert report["opcodes"]["A9"] == {"name": "_Lda", "calls": 1, "seconds": report["opcodes"]["A9"]["seconds"]}
+	assert abs(sum(entry["share"] for entry in report["entries"]) - 1) < 1e-9
+	seconds = [entry["seconds"] for entry in report["entries"]]
+	assert seconds == sorted(seconds, reverse=True)
+
+def test_count_and_reset():
+	CPU = _machine()
+	profiler = hostprofiler(CPU)
+	profiler.run(count=2)
+	assert CPU._PC == 0x0204
+	assert sum(entry["calls"] for entry in profiler.report()["entries"] if entry["kind"] == "handler") == 2
+	profiler.reset()
+	assert [entry["name"] for entry in profiler.report()["entries"]] == ["dispatch"]
+
+def test_table_and_json(tmp_path):
+	CPU = _machine()
+	profiler = hostprofiler(CPU)
+	profiler.run()
+	lines = profiler.table(limit=2).splitlines()
+	assert lines[0].split() == ["name", "share", "seconds", "calls", "ns/call"]
+	assert len(lines) == 3
+	profiler.saveJSON(str(tmp_path / "host.json"))
+	with open(str(tmp_path / "host.json")) as file:
+		saved = json.load(file)
+	assert [entry["name"] for entry in saved["entries"]] == [entry["name"] for entry in profiler.report()["entries"]]
@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+from cpu import cpu
+from generator import registerEffects
+from memoiser import memoiser
+
+def _machine(routine):
+	CPU = cpu()
+	# JSR $0300 ; JSR $0300, then the unimplemented opcode $02
+	CPU._memory.load(0x200, bytes([0x20, 0x00, 0x03, 0x20, 0x00, 0x03, 0x02]))
+	CPU._memory.load(0x300, routine)
+	CPU._memory.Data[0x10] = 0x2A
+	CPU._PC = 0x200
+	return CPU
+
+def test_repeated_call_is_replayed():
+	# LDA $10 ; STA $11 ; RTS
+	CPU = _machine(bytes([0xA5, 0x10, 0x85, 0x11, 0x60]))
+	cache = memoiser(CPU)
+	cache.addTarget(0x300)
+	CPU.execute()
+	assert (cache.misses, cache.hits) == (1, 1)
+	assert CPU._PC == 0x206 and CPU._SP == 0x100
+	assert CPU._memory.Data[0x11] == 0x2A
+
+def test_halting_call_is_not_cached():
+	# LDA $10, then the unimplemented opcode $02
+	CPU = _machine(bytes([0xA5, 0x10, 0x02]))
+	cache = memoiser(CPU)
+	cache.addTarget(0x300)
+	CPU.execute()
+	assert CPU._PC == 0x302 and CPU._SP == 0xFE
+	assert CPU._Acc == 0x2A
+	assert cache.misses == 1 and not cache._targets[0x300][1]
+
+def test_call_over_the_limit_is_not_cached():
+	# LDX #$01 ; JMP $0301, which lands one byte further in this emulator, on itself
+	CPU = _machine(bytes([0xA2, 0x01, 0x4C, 0x01, 0x03]))
+	cache = memoiser(CPU, limit=100)
+	cache.addTarget(0x300)
+	CPU.run(cycles=1000)
+	assert CPU._PC == 0x302 and CPU._SP == 0xFE
+	assert cache.misses == 1 and not cache._targets[0x300][1]
+
+def test_inputs_are_the_registers_read():
+	# STA $11 ; RTS
+	CPU = _machine(bytes([0x85, 0x11, 0x60]))
+	# LDA #$01 ; TAX ; LDA #$09 ; JSR $0300 ; LDA #$02 ; TAX ; LDA #$09 ; JSR $0300 ; LDA #$07 ; JSR $0300, then the unimplemented opcode $02
+	CPU._memory.load(0x200, bytes([
+		0xA9, 0x01, 0xAA, 0xA9, 0x09, 0x20, 0x00, 0x03,
+		0xA9, 0x02, 0xAA, 0xA9, 0x09, 0x20, 0x00, 0x03,
+		0xA9, 0x07, 0x20, 0x00, 0x03, 0x02
+	]))
+	cache = memoiser(CPU)
+	cache.addTarget(0x300)
+	CPU.execute()
+	assert (cache.misses, cache.hits) == (2, 1)
+	assert [registers for registers, reads in cache._targets[0x300][1]] == [("_Acc",)]
+	assert CPU._Reg_X == 2 and CPU._memory.Data[0x11] == 7
+
+def test_nested_target_adds_its_reads():
+	CPU = _machine(bytes([0x20, 0x00, 0x04, 0xA5, 0x10, 0x60]))
+	# JSR $0300 ; STA $11 ; LDA #$05 ; STA $10 ; JSR $0300 ; STA $12 ; JSR $0300, then the unimplemented opcode $02
+	CPU._memory.load(0x200, bytes([0x20, 0x00, 0x03, 0x85, 0x11, 0xA9, 0x05, 0x85, 0x10, 0x20, 0x00, 0x03, 0x85, 0x12, 0x20, 0x00, 0x03, 0x02]))
+	# $0300: JSR $0400 ; LDA $10 ; RTS, $0400: LDA #$03 ; STA $13 ; RTS
+	CPU._memory.load(0x400, bytes([0xA9, 0x03, 0x85, 0x13, 0x60]))
+	CPU._memory.Data[0x10] = 1
+	cache = memoiser(CPU)
+	cache.addTarget(0x300)
+	cache.addTarget(0x400)
+	CPU.execute()
+	assert CPU._memory.Data[0x11:0x14] == bytes([1, 5, 3])
+	assert CPU._Acc == 5
+	assert (cache.misses, cache.hits) == (3, 2)
+
+@pytest.mark.parametrize("variant", ("6502", "nmos", "65c02"))
+def test_register_effects_cover_the_handlers(variant):
+	# Registers an opcode does not read must not change what it does, except the ones it always writes
+	registers = memoiser._REGISTERS
+	CPU = cpu(variant=variant)
+	rnd = random.Random(3)
+	image = bytes(rnd.randrange(0x100) for _ in range(0x10000))
+
+	def outcome(opCode, state):
+		CPU._memory.Data[:] = image
+		CPU._memory.Data[0x200] = opCode
+		for register, value in zip(registers, state):
+			setattr(CPU, register, value)
+		CPU._PC = 0x200
+		try:
+			CPU.step()
+		except Exception as exception:
+			return type(exception).__name__, None
+		return {register: getattr(CPU, register) for register in registers + ("_PC",)}, bytes(CPU._memory.Data)
+
+	for opCode, effect in enumerate(registerEffects(type(CPU))):
+		if effect is None:
+			continue
+		reads, writes, changes = effect
+		for _ in range(4):
+			state = [rnd.randrange(0x100) for _ in range(3)] + [rnd.randrange(0x80, 0x100)] + [rnd.random() < 0.5 for _ in range(6)]
+			result, memory = outcome(opCode, state)
+			for index, register in enumerate(registers):
+				if register in reads:
+					continue
+				other = list(state)
+				other[index] = rnd.randrange(0x80, 0x100) if register == "_SP" else (not state[index] if index > 3 else state[index] ^ 0x5A)
+				again, again_memory = outcome(opCode, other)
+				assert again_memory == memory
+				if isinstance(result, str) or isinstance(again, str):
+					assert again == result
+					continue
+				for name in result:
+					if name != register or register in writes:
+						assert again[name] == result[name], (opCode, register, name)
@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from banking import bankedmemory
+from memory import memory
+from sparse import sparsememory
+
+def test_memory_incremental_dump(tmp_path):
+	source = memory()
+	source.load(0x1234, b"base")
+	source.dumpPages(str(tmp_path / "base.bin"))
+	marker = source.setMarker()
+	source.load(0x8000, b"delta")
+	source.memoryDumpIncremental(str(tmp_path / "delta.bin"), marker)
+
+	copy = memory()
+	copy.loadIncremental(str(tmp_path / "base.bin"), str(tmp_path / "delta.bin"))
+	assert copy.Data == source.Data
+	assert copy.dirtyPages() == [page for page in range(0x100)]
+
+def test_memory_dump_rejects_other_files(tmp_path):
+	path = tmp_path / "other.bin"
+	path.write_bytes(b"nope" + bytes(16))
+	with pytest.raises(ValueError):
+		memory().loadIncremental(str(path))
+
+def test_snapshot_waits_for_update():
+	shared = memory(size=0x100, shared=True)
+	try:
+		entered = threading.Event()
+
+		def write():
+			with shared.update():
+				shared.Data[0] = 1
+				entered.set()
+				time.sleep(0.02)
+				shared.Data[1] = 2
+
+		writer = threading.Thread(target=write)
+		writer.start()
+		entered.wait()
+		assert shared.snapshot(0, 2) == b"\x01\x02"
+		writer.join()
+	finally:
+		shared.close()
+
+@pytest.mark.parametrize("make", (lambda: bankedmemory(0x2000), sparsememory))
+def test_paged_view(make):
+	paged = make()
+	view = paged.view(0x1210, 0x1220)
+	view[0] = 0x55
+	assert paged.Data[0x1210] == 0x55
+	paged.load(0x1300, b"\x01\x02")
+	assert paged.compare(0x12FF, 0x1300, 2) == 0
+	with pytest.raises(ValueError):
+		paged.view(0x12F0, 0x1310)
+
+def test_load_fill_copy():
+	data = memory()
+	data.load(0x0200, b"\x01\x02\x03\x04")
+	assert data.read(0x0200, 4) == b"\x01\x02\x03\x04"
+	data.fill(0x0300, 0x0310, 0x1AA)
+	assert data.read(0x0300, 0x10) == b"\xAA" * 0x10
+	data.copy(0x0200, 0x0202, 4)
+	assert data.read(0x0200, 6) == b"\x01\x02\x01\x02\x03\x04"
+	assert data.dirtyPages() == [0x02, 0x03]
+
+def test_find_and_find_all():
+	data = memory()
+	data.load(0x1000, b"\xEA\xEA\xEA")
+	data.load(0x2000, b"\xEA\xEA")
+	assert data.find(b"\xEA\xEA") == 0x1000
+	assert data.find(b"\xEA\xEA", 0x1002) == 0x2000
+	assert data.find(b"\x60") == -1
+	assert data.findAll(b"\xEA\xEA") == [0x1000, 0x1001, 0x2000]
+	assert data.findAll(b"\xEA\xEA", end=0x2000) == [0x1000, 0x1001]
+
+@pytest.mark.parametrize("change", (
+	lambda data: data.load(0xFFFE, b"abcd"),
+	lambda data: data.fill(0xFFF0, 0x10010),
+	lambda data: data.fill(-1, 0x10),
+	lambda data: data.copy(0, 0xFFF0, 0x20),
+	lambda data: data.copy(0xFFF0, 0, 0x20),
+	lambda data: data.read(0xFFFF, 2)
+))
+def test_ranges_outside_memory_are_refused(change):
+	data = memory()
+	with pytest.raises(ValueError):
+		change(data)
+	assert len(data.Data) == 0x10000
+	assert data.dirtyPages() == []
+
+def test_attach_in_the_creating_process():
+	# The resource tracker reports problems from its own process at exit, so run in a fresh interpreter
+	script = "\n".join((
+		"from memory import memory",
+		"shared = memory(size=0x100, shared=True)",
+		"attached = memory.attach(shared.sharedName)",
+		"attached.Data[0] = 0x42",
+		"assert shared.Data[0] == 0x42",
+		"attached.close()",
+		"shared.close()"
+	))
+	result = subprocess.run((sys.executable, "-c", script), cwd=os.path.join(os.path.dirname(__file__), "..", "src"),
+		capture_output=True, text=True, timeout=60)
+	assert result.returncode == 0, result.stderr
+	assert "KeyError" not in result.stderr
+	assert "leaked" not in result.stderr
@@ -0,0 +1,49 @@
+import copy
+import json
+
+import pytest
+
+from microbench import microbench
+from variants import nmos
+
+def test_program_lays_out_blocks_that_run_through():
+	bench = microbench(count=10, repeat=1)
+	assert bench.program(0xA9) == (0, 0x4000 + 2*10)
+	data = bench._cpu._memory.Data
+	assert bytes(data[0x4000:0x4004]) == bytes([0xA9, 0x80, 0xA9, 0x80])
+	assert data[0x4000 + 2*10] == 0x02
+	# Jumps leave the block
+	assert bench.program(0x4C) is None
+
+def test_measure_table_and_compare(tmp_path):
+	bench = microbench(count=10, repeat=1)
+	matrix = bench.measure(opCodes=[0xA9, 0xEA, 0x4C])
+	assert sorted(matrix["opcodes"]) == ["A9", "EA"]
+	assert sorted(matrix["opcodes"]["A9"]["ns"]) == sorted(microbench.ENGINES)
+	assert all(ns > 0 for ns in matrix["opcodes"]["EA"]["ns"].values())
+	assert list(matrix["skipped"]) == ["4C"]
+
+	lines = bench.table().splitlines()
+	assert lines[0].split() == ["op", "instruction", "run", "execute", "step", "fastest"]
+	assert lines[-1].startswith("4C") and lines[-1].endswith("skipped")
+
+	bench.save(str(tmp_path / "now.json"))
+	with open(str(tmp_path / "now.json")) as file:
+		assert json.load(file) == matrix
+	assert bench.compare(str(tmp_path / "now.json")) == []
+	# A baseline twice as fast makes every timed opcode slower
+	baseline = copy.deepcopy(matrix)
+	for entry in baseline["opcodes"].values():
+		entry["ns"] = {engine: ns / 2 for engine, ns in entry["ns"].items()}
+	slower = bench.compare(baseline)
+	assert len(slower) == 2 * len(microbench.ENGINES)
+	assert all(ratio == pytest.approx(2) for *_, ratio in slower)
+
+def test_variant_and_engines():
+	bench = microbench(nmos, count=10, repeat=1)
+	# LAX $80 is undocumented
+	matrix = bench.measure(engines=("run",), opCodes=[0xA7])
+	assert matrix["variant"] == "nmos"
+	assert list(matrix["opcodes"]["A7"]["ns"]) == ["run"]
+	with pytest.raises(ValueError):
+		bench.measure(engines=("jit",))
@@ -0,0 +1,51 @@
+import json
+
+from cpu import cpu
+from profiler import profiler
+
+def _machine():
+	"""
+	main calls outer at $0300, which calls inner at $0400.
+	"""
+	CPU = cpu()
+	# JSR $0300, then the unimplemented opcode $02
+	CPU._memory.load(0x0200, bytes([0x20, 0x00, 0x03, 0x02]))
+	# JSR $0400 ; RTS
+	CPU._memory.load(0x0300, bytes([0x20, 0x00, 0x04, 0x60]))
+	# NOP ; RTS
+	CPU._memory.load(0x0400, bytes([0xEA, 0x60]))
+	CPU._PC = 0x0200
+	return CPU
+
+def test_folded_stacks_of_a_nested_call(tmp_path):
+	CPU = _machine()
+	profile = profiler(CPU, names={0x0300: "outer"})
+	profile.execute()
+	assert CPU._PC == 0x0203
+	# JSR and RTS take 6 cycles, NOP 2
+	assert profile.folded() == "main 6\nmain;outer 12\nmain;outer;sub_0400 8\n"
+	profile.saveFolded(str(tmp_path / "stacks.folded"))
+	with open(str(tmp_path / "stacks.folded")) as file:
+		assert file.read() == profile.folded()
+
+def test_report_of_a_nested_call(tmp_path):
+	CPU = _machine()
+	profile = profiler(CPU, names={0x0300: "outer", 0x0400: "inner"})
+	profile.execute()
+	report = profile.report()
+	assert list(report) == ["main", "outer", "inner"]
+	assert report["main"] == {"calls": 0, "inclusive": 26, "exclusive": 6}
+	assert report["outer"] == {"calls": 1, "inclusive": 20, "exclusive": 12}
+	assert report["inner"] == {"calls": 1, "inclusive": 8, "exclusive": 8}
+	profile.saveJSON(str(tmp_path / "profile.json"))
+	with open(str(tmp_path / "profile.json")) as file:
+		assert json.load(file) == report
+	assert profile.table(limit=1).splitlines()[1].split() == ["main", "0", "26", "6"]
+
+def test_routines_on_the_stack_count_up_to_now():
+	CPU = _machine()
+	profile = profiler(CPU)
+	# Both JSR and the NOP, a routine starts counting after the JSR that called it
+	profile.execute(count=3)
+	assert profile.report()["sub_0300"]["inclusive"] == 8
+	assert profile.report()["sub_0400"]["inclusive"] == 2
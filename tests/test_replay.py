@@ -0,0 +1,115 @@
+import pytest
+
+from cpu import cpu
+from replay import recorder, replayer
+
+# LDA $F000 ; STA $10 ; LDA $F000 ; STA $11, then the unimplemented opcode $02
+_READER = bytes([0xAD, 0x00, 0xF0, 0x85, 0x10, 0xAD, 0x00, 0xF0, 0x85, 0x11, 0x02])
+
+def _attach(CPU, read):
+	"""
+	Serve reads of $F000 from a function.
+	"""
+	memory = CPU.readByte
+	CPU.readByte = lambda address: read() if address == 0xF000 else memory(address)
+
+def test_replay_round_trip(tmp_path):
+	values = iter([0x41, 0x42])
+	CPU = cpu()
+	CPU._memory.Data[0x200:0x200+len(_READER)] = _READER
+	CPU._PC = 0x200
+	log = recorder(CPU)
+	_attach(CPU, log.input("key", lambda: next(values)))
+	CPU.execute()
+	log.save(str(tmp_path / "inputs.rec"))
+
+	again = cpu()
+	again._memory.Data[0x200:0x200+len(_READER)] = _READER
+	again._PC = 0x200
+	replay = replayer(again, str(tmp_path / "inputs.rec"))
+	_attach(again, replay.input("key"))
+	replay.execute()
+	assert again._memory.Data[0x10:0x12] == b"AB"
+	assert again.readState() == CPU.readState()
+
+def test_replay_channel_limit():
+	log = recorder(cpu())
+	for number in range(0xFF - 2):
+		log.input("port{}".format(number), lambda: 0)
+	assert log._channel("port0") == 2
+	assert log._channel("port252") == 0xFE
+	with pytest.raises(ValueError):
+		log.input("one too many", lambda: 0)
+
+class _counter:
+	"""
+	Device returning 1, 2, 3 and so on, and keeping what is written to it.
+	"""
+
+	def __init__(self):
+		self.value = 0
+		self.written = list()
+
+	def read(self, address):
+		self.value += 1
+		return self.value
+
+	def write(self, address, value):
+		self.written.append(value)
+
+def _interrupted():
+	"""
+	Cpu running a loop that reads a device, with interrupt handlers marking that they ran.
+	"""
+	CPU = cpu()
+	# LDA $F000 ; STA $23 ; STA $F000 ; INC $20 ; JMP $01FF, the jump lands on $0200
+	CPU._memory.load(0x200, bytes([0xAD, 0x00, 0xF0, 0x85, 0x23, 0x8D, 0x00, 0xF0, 0xE6, 0x20, 0x4C, 0xFF, 0x01]))
+	# Interrupt request: LDA #$AA ; STA $21 ; RTI, non-maskable interrupt: LDA #$BB ; STA $22 ; RTI
+	CPU._memory.load(0x300, bytes([0xA9, 0xAA, 0x85, 0x21, 0x40]))
+	CPU._memory.load(0x310, bytes([0xA9, 0xBB, 0x85, 0x22, 0x40]))
+	CPU._memory.load(0xFFFA, bytes([0x10, 0x03]))
+	CPU._memory.load(0xFFFE, bytes([0x00, 0x03]))
+	CPU._PC = 0x200
+	return CPU
+
+@pytest.mark.parametrize("engine", ("step", "run"))
+def test_replay_interrupts_and_devices(tmp_path, engine):
+	CPU = _interrupted()
+	log = recorder(CPU)
+	recorded = _counter()
+	log.attachDevice(recorded, 0xF000, 0xF001)
+	start = CPU._cycles
+	for cycles, interrupt in ((100, log.irq), (57, log.nmi), (31, log.irq), (45, None)):
+		CPU.run(cycles=cycles)
+		if interrupt is not None:
+			interrupt()
+	log.save(str(tmp_path / "inputs.rec"))
+	assert CPU._memory.Data[0x21:0x23] == bytes([0xAA, 0xBB])
+
+	again = _interrupted()
+	replay = replayer(again, str(tmp_path / "inputs.rec"))
+	device = _counter()
+	replay.attachDevice(device, 0xF000, 0xF001)
+	if engine == "run":
+		replay.run(cycles=CPU._cycles - start)
+	else:
+		while again._cycles < CPU._cycles and replay.step():
+			pass
+	assert device.value == 0 and device.written == recorded.written
+	assert again.readState() == CPU.readState()
+	assert again._memory.Data == CPU._memory.Data
+
+def test_replay_detects_divergence(tmp_path):
+	CPU = _interrupted()
+	log = recorder(CPU)
+	log.attachDevice(_counter(), 0xF000, 0xF001)
+	CPU.run(cycles=100)
+	log.save(str(tmp_path / "inputs.rec"))
+
+	again = _interrupted()
+	# Reads happen one cycle later than recorded
+	again._cycles += 1
+	replay = replayer(again, str(tmp_path / "inputs.rec"))
+	replay.attachDevice(_counter(), 0xF000, 0xF001)
+	with pytest.raises(RuntimeError):
+		replay.run(cycles=100)
@@ -0,0 +1,55 @@
+import pytest
+
+from cpu import cpu
+from rewind import rewind
+
+def _machine():
+	CPU = cpu()
+	# LDA #n ; STA $40+n ; PHA ; TAX, for n from 0 to 11, then the unimplemented opcode $02
+	code = bytearray()
+	for n in range(12):
+		code += bytes([0xA9, n + 1, 0x85, 0x40 + n, 0x48, 0xAA])
+	CPU._memory.load(0x200, bytes(code) + b"\x02")
+	CPU._PC = 0x200
+	return CPU
+
+def _record(CPU, history, count):
+	"""
+	State and memory before each instruction, indexed by position.
+	"""
+	seen = dict()
+	for _ in range(count):
+		seen[history.position] = (CPU.readState(), bytes(CPU._memory.Data))
+		history.step()
+	seen[history.position] = (CPU.readState(), bytes(CPU._memory.Data))
+	return seen
+
+def test_rewind_restores_registers_and_memory():
+	CPU = _machine()
+	history = rewind(CPU, interval=5)
+	seen = _record(CPU, history, 40)
+	for position in (37, 30, 26, 25, 11, 0):
+		history.rewindTo(position)
+		assert history.position == position
+		assert (CPU.readState(), bytes(CPU._memory.Data)) == seen[position]
+
+def test_step_back_then_run_again():
+	CPU = _machine()
+	history = rewind(CPU, interval=4)
+	seen = _record(CPU, history, 20)
+	history.stepBack(3)
+	assert (CPU.readState(), bytes(CPU._memory.Data)) == seen[17]
+	history.run(3)
+	assert (CPU.readState(), bytes(CPU._memory.Data)) == seen[20]
+	history.stepBack(9)
+	assert (CPU.readState(), bytes(CPU._memory.Data)) == seen[11]
+
+def test_history_is_trimmed_to_the_limit():
+	CPU = _machine()
+	history = rewind(CPU, interval=4, limit=3 * 0x10000)
+	history.run(20)
+	history.rewindTo(16)
+	with pytest.raises(ValueError):
+		history.rewindTo(0)
+	history.close()
+	assert "writeByte" not in CPU.__dict__
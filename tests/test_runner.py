@@ -0,0 +1,62 @@
+import time
+
+from cpu import cpu
+from runner import runner
+
+def _machine(code):
+	CPU = cpu()
+	CPU._memory.load(0x0200, code)
+	CPU._PC = 0x0200
+	return CPU
+
+def _looping():
+	# LDA #$01 ; JMP $01FF, the jump lands on $0200
+	return _machine(bytes([0xA9, 0x01, 0x4C, 0xFF, 0x01]))
+
+def _cycles(worker):
+	return worker.inspect().result(timeout=5)["state"][-1]
+
+def test_pause_resume_and_stop():
+	worker = runner(_looping(), quantum=1000)
+	thread = worker.start()
+	try:
+		first = _cycles(worker)
+		while _cycles(worker) == first:
+			time.sleep(0.001)
+		paused = worker.pause().result(timeout=5)
+		assert not worker.running
+		assert _cycles(worker) == paused[-1] == _cycles(worker)
+		assert worker.resume().result(timeout=5) is True
+		while _cycles(worker) == paused[-1]:
+			time.sleep(0.001)
+		assert worker.call(lambda CPU: CPU._Acc).result(timeout=5) == 0x01
+	finally:
+		worker.stop(timeout=5)
+	assert not thread.is_alive()
+	assert worker.error is None and not worker.halted
+
+def test_step_while_paused():
+	worker = runner(_looping())
+	worker.start(paused=True)
+	try:
+		state = worker.inspect(regions={"code": (0x0200, 0x0202)}).result(timeout=5)
+		assert state["memory"] == {"code": b"\xA9\x01"}
+		assert not state["running"] and state["state"][-1] == 0
+		assert worker.step().result(timeout=5)[0] == 0x0202
+		state = worker.step(2).result(timeout=5)
+		assert (state[0], state[-1]) == (0x0202, 7)
+	finally:
+		worker.stop(timeout=5)
+
+def test_halt():
+	# LDA #$01, then the unimplemented opcode $02
+	worker = runner(_machine(bytes([0xA9, 0x01, 0x02])))
+	worker.start()
+	try:
+		while not worker.inspect().result(timeout=5)["halted"]:
+			time.sleep(0.001)
+		assert not worker.running
+		assert worker.resume().result(timeout=5) is False
+		assert worker.inspect().result(timeout=5)["state"][0] == 0x0202
+	finally:
+		worker.stop(timeout=5)
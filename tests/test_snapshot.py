@@ -0,0 +1,79 @@
+import struct
+
+import pytest
+
+from banking import bankedmemory
+from cpu import cpu
+from snapshot import snapshot
+
+@pytest.mark.parametrize("compress", (False, True))
+def test_snapshot_round_trip(tmp_path, compress):
+	CPU = cpu()
+	CPU._memory.load(0x1000, bytes(range(0x100)))
+	CPU.writeState((0x200, 0x1F0, 1, 2, 3, 1, 0, 0, 0, 1, 0, 1, 123456))
+	CPU.registerTrap(0x1010, lambda CPU: None)
+	path = str(tmp_path / "boot.snap")
+	snapshot.capture(CPU).save(path, compress=compress)
+
+	loaded = snapshot.load(path)
+	again = cpu()
+	loaded.restore(again)
+	assert again.readState() == CPU.readState()
+	assert again._memory.Data[0x1010] == 0x10
+	assert bytes(again._memory.Data[0x1000:0x1100]) == bytes(range(0x100))
+	loaded.close()
+
+def test_snapshot_rejects_other_variant(tmp_path):
+	path = str(tmp_path / "boot.snap")
+	snapshot.capture(cpu()).save(path)
+	with pytest.raises(ValueError):
+		snapshot.load(path).restore(cpu(variant="nmos"))
+
+def _banked():
+	store = bytes(bank for bank in range(4) for _ in range(0x2000))
+	CPU = cpu(ram=bankedmemory(store))
+	CPU._memory.Ram[0x8000] = 0x11
+	CPU._memory.mapBank(4, 2)
+	CPU._memory.mapBank(5, 3, writable=True)
+	CPU.writeByte(0xA000, 0x33)
+	CPU._PC = 0x1234
+	return CPU
+
+@pytest.mark.parametrize("compress", (False, True))
+def test_snapshot_restores_banks(tmp_path, compress):
+	CPU = _banked()
+	path = str(tmp_path / "banked.snap")
+	snapshot.capture(CPU).save(path, compress=compress)
+
+	loaded = snapshot.load(path)
+	again = cpu(ram=bankedmemory(0x8000))
+	loaded.restore(again)
+	memory = again._memory
+	assert [memory.bank(window) for window in range(8)] == [None] * 4 + [2, 3, None, None]
+	assert memory.Data[0x8000] == 2 and memory.Ram[0x8000] == 0x11
+	assert memory.Data[0xA000] == 0x33 and memory.Store[0x6000] == 0x33
+	again.writeByte(0x8001, 0x44)
+	assert memory.Data[0x8001] == 2
+	assert again.readState() == CPU.readState()
+	loaded.close()
+
+def test_snapshot_needs_matching_memory(tmp_path):
+	banked, flat = str(tmp_path / "banked.snap"), str(tmp_path / "flat.snap")
+	snapshot.capture(_banked()).save(banked)
+	snapshot.capture(cpu()).save(flat)
+	with pytest.raises(ValueError):
+		snapshot.load(banked).restore(cpu())
+	with pytest.raises(ValueError):
+		snapshot.load(flat).restore(cpu(ram=bankedmemory(0x8000)))
+
+def test_snapshot_reads_version_1(tmp_path):
+	path = tmp_path / "old.snap"
+	image = bytes(range(0x100)) * 0x100
+	header = struct.Struct("<4sBB16s5q7BQHII")
+	path.write_bytes(header.pack(b"EMUS", 1, 0, b"6502", 0x200, 0x100, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 99, 0, len(image), len(image)) + image)
+	loaded = snapshot.load(str(path))
+	assert loaded.memory is None and bytes(loaded.image) == image
+	again = cpu()
+	loaded.restore(again)
+	assert again._PC == 0x200 and again._cycles == 99
+	loaded.close()
@@ -0,0 +1,27 @@
+import json
+
+from coverage import coverage
+from cpu import cpu
+from disassembler import disassemble
+from symbols import symbols
+
+def test_operands_without_symbol_keep_the_width_of_their_mode():
+	table = symbols({0x0080: "pointer", 0xC000: "reset"}, reach=0x10)
+	# LDA $10 ; LDA $82 ; LDA $2000 ; JMP $C003
+	code = bytes([0xA5, 0x10, 0xA5, 0x82, 0xAD, 0x00, 0x20, 0x4C, 0x03, 0xC0])
+	assert disassemble(code, 0, symbols=table)[0] == "LDA $10"
+	assert disassemble(code, 2, symbols=table)[0] == "LDA pointer+2"
+	assert disassemble(code, 4, symbols=table)[0] == "LDA $2000"
+	assert disassemble(code, 7, symbols=table)[0] == "JMP reset+3"
+	assert table.name(0x10) == "$0010"
+
+def test_coverage_json_names_branches(tmp_path):
+	CPU = cpu()
+	# LDA #$00 ; BEQ +0, then the unimplemented opcode $02
+	CPU._memory.load(0x200, bytes([0xA9, 0x00, 0xF0, 0x00, 0x02]))
+	CPU._PC = 0x200
+	collected = coverage(CPU)
+	collected.execute()
+	collected.saveJSON(str(tmp_path / "coverage.json"), symbols({0x200: "main"}))
+	with open(str(tmp_path / "coverage.json")) as file:
+		assert json.load(file)["branches"]["0202"]["symbol"] == "main+2"
@@ -0,0 +1,66 @@
+import pytest
+
+from cpu import cpu
+from system import system
+
+class _register:
+	"""
+	Shared register logging the system time of every access.
+	"""
+
+	def __init__(self):
+		self.value = 0
+		self.log = list()
+		self.clock = None
+
+	def read(self, address):
+		self.log.append(("read", address, self.clock(address)))
+		return self.value
+
+	def write(self, address, value):
+		self.log.append(("write", address, self.clock(address)))
+		self.value = value
+
+def _machine(code):
+	CPU = cpu()
+	CPU._memory.load(0x0200, code + b"\x02")
+	CPU._PC = 0x0200
+	return CPU
+
+@pytest.mark.parametrize("writerFirst", (True, False))
+def test_shared_device_sees_accesses_in_time_order(writerFirst):
+	# LDA #k ; STA $F000 for k from 1 to 10, writes on cycles 6, 12, ... 60
+	writer = _machine(b"".join(bytes([0xA9, k, 0x8D, 0x00, 0xF0]) for k in range(1, 11)))
+	# 11 NOPs ; LDA $F100 ; STA $10, the read is on cycle 26
+	reader = _machine(b"\xEA" * 11 + bytes([0xAD, 0x00, 0xF1, 0x85, 0x10]))
+	machines = system(quantum=1000)
+	for CPU in (writer, reader) if writerFirst else (reader, writer):
+		machines.add(CPU)
+	register = _register()
+	register.clock = lambda address: machines.time(writer if address < 0xF100 else reader)
+	machines.share(register, 0xF000, 0xF001, [writer])
+	machines.share(register, 0xF100, 0xF101, [reader])
+	machines.run()
+
+	times = [time for _, _, time in register.log]
+	assert times == sorted(times)
+	assert register.log[3:5] == [("write", 0xF000, 24), ("read", 0xF100, 26)]
+	# Read between the fourth and fifth write, within one quantum
+	assert reader._memory.Data[0x10] == 4
+	assert machines.sample() == {
+		"cpu0": {"cycles": 60 if writerFirst else 29, "halted": True},
+		"cpu1": {"cycles": 29 if writerFirst else 60, "halted": True}
+	}
+
+def test_unshare_restores_memory():
+	first, second = _machine(bytes([0xA9, 0x07, 0x8D, 0x00, 0xF0])), _machine(b"")
+	machines = system()
+	machines.add(first)
+	machines.add(second)
+	register = _register()
+	machines.share(register, 0xF000, 0xF001)
+	machines.unshare(register)
+	machines.run()
+	assert register.value == 0
+	assert first._memory.Data[0xF000] == 0x07
+	assert not first._ports and not second._ports
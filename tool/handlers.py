@@ -0,0 +1,18 @@
+"""
+Print the straight-line handlers generated for each opcode, or the
+register-in-locals run loop with `--core`.
+"""
+
+import os
+import sys
+
+# Replace this folder on the path, tool/opcode.py would shadow the standard library module
+sys.path[0] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+from cpu import cpu
+from generator import generateCoreSource, generateSource
+
+if "--core" in sys.argv:
+	print(generateCoreSource(cpu))
+else:
+	print(generateSource(cpu))
@@ -0,0 +1,40 @@
+"""
+Time every opcode on every engine and print the ns per instruction matrix.
+
+	python tool/microbench.py [--variant nmos] [--save now.json] [--baseline before.json] [--threshold 0.1]
+
+With `--baseline`, opcodes that got slower are listed and the exit status is 1.
+"""
+
+import argparse
+import os
+import sys
+
+# Replace this folder on the path, tool/opcode.py would shadow the standard library module
+sys.path[0] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+from microbench import microbench
+from variants import VARIANTS
+
+parser = argparse.ArgumentParser(description="Per opcode micro benchmark")
+parser.add_argument("--variant", default="6502", choices=sorted(VARIANTS))
+parser.add_argument("--engines", default=",".join(microbench.ENGINES), help="comma separated engines")
+parser.add_argument("--count", type=int, default=1000, help="instructions per block")
+parser.add_argument("--repeat", type=int, default=5, help="runs per opcode and engine, the fastest is kept")
+parser.add_argument("--save", help="write the matrix as JSON")
+parser.add_argument("--baseline", help="matrix to compare with")
+parser.add_argument("--threshold", type=float, default=0.1, help="slowdown to report")
+arguments = parser.parse_args()
+
+bench = microbench(VARIANTS[arguments.variant], arguments.count, arguments.repeat)
+bench.measure(arguments.engines.split(","))
+print(bench.table())
+if arguments.save:
+	bench.save(arguments.save)
+if arguments.baseline:
+	slower = bench.compare(arguments.baseline, arguments.threshold)
+	print()
+	print("{} slower than the baseline".format(len(slower) or "Nothing"))
+	for key, name, engine, old, new, ratio in slower:
+		print("{:<3} {:<20} {:<8} {:>8.1f} -> {:>8.1f} ns  {:+.0%}".format(key, name, engine, old, new, ratio - 1))
+	sys.exit(1 if slower else 0)